@@ -0,0 +1,234 @@
+import numpy as np
+import libpysal
+from numba import njit, prange
+from scipy import sparse
+
+
+def _matriz_esparsa(w) -> sparse.csr_matrix:
+    if isinstance(w, libpysal.weights.W):
+        return w.sparse.tocsr()
+    return sparse.csr_matrix(w)
+
+
+def _p_sim(maiores: np.ndarray, permutacoes: int) -> np.ndarray:
+    # Pseudo p-valor unicaudal na direção do valor observado (como no esda)
+    maiores = np.where(permutacoes - maiores < maiores, permutacoes - maiores, maiores)
+    return (maiores + 1.0) / (permutacoes + 1.0)
+
+
+@njit(cache=True)
+def _permutacoes_condicionais(max_card: int, n: int, permutacoes: int, semente: int) -> np.ndarray:
+    """
+    Sorteios de vizinhos sem o próprio local, compartilhados por todos os
+    locais (mesmo esquema de `esda.crand.vec_permutations`).
+    """
+    np.random.seed(semente)
+    resultado = np.empty((permutacoes, max_card), dtype=np.int64)
+    for p in range(permutacoes):
+        resultado[p] = np.random.choice(n - 1, size=max_card, replace=False)
+    return resultado
+
+
+@njit(parallel=True, cache=True)
+def _local_permutado(
+    z: np.ndarray,
+    indptr: np.ndarray,
+    pesos: np.ndarray,
+    pesos_proprios: np.ndarray,
+    escala: np.ndarray,
+    observado: np.ndarray,
+    sorteios: np.ndarray
+) -> np.ndarray:
+    n, m = z.shape
+    maiores = np.zeros((n, m), dtype=np.int64)
+
+    for i in prange(n):
+        inicio = indptr[i]
+        card = indptr[i + 1] - inicio
+        defasagem = np.empty(m)
+        for p in range(sorteios.shape[0]):
+            for c in range(m):
+                defasagem[c] = pesos_proprios[i] * z[i, c]
+            for k in range(card):
+                j = sorteios[p, k]
+                # os sorteios indexam z sem a linha i
+                if j >= i:
+                    j += 1
+                for c in range(m):
+                    defasagem[c] += pesos[inicio + k] * z[j, c]
+            for c in range(m):
+                if z[i, c] * defasagem[c] * escala[c] >= observado[i, c]:
+                    maiores[i, c] += 1
+
+    return maiores
+
+
+@njit(parallel=True, cache=True)
+def _global_permutado(
+    z: np.ndarray,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    pesos: np.ndarray,
+    ordens: np.ndarray,
+    escala: np.ndarray
+) -> np.ndarray:
+    n, m = z.shape
+    simulados = np.empty((ordens.shape[0], m))
+
+    for p in prange(ordens.shape[0]):
+        ordem = ordens[p]
+        soma = np.zeros(m)
+        defasagem = np.empty(m)
+        for i in range(n):
+            defasagem[:] = 0.0
+            for k in range(indptr[i], indptr[i + 1]):
+                j = ordem[indices[k]]
+                for c in range(m):
+                    defasagem[c] += pesos[k] * z[j, c]
+            for c in range(m):
+                soma[c] += z[ordem[i], c] * defasagem[c]
+        for c in range(m):
+            simulados[p, c] = soma[c] * escala[c]
+
+    return simulados
+
+
+def moran_global_matriz(
+    y: np.ndarray,
+    w,
+    permutacoes: int = 999,
+    semente: int | None = None
+) -> dict[str, np.ndarray]:
+    """
+    I de Moran global para todas as colunas de uma matriz de variáveis.
+
+    As permutações (a mesma ordem sorteada para todas as colunas) são
+    avaliadas em paralelo por um kernel compilado sobre a matriz esparsa
+    de pesos. O I e seus momentos seguem `esda.Moran`, e as ordens são as
+    que ele sorteia depois de `np.random.seed(semente)`.
+
+    Parâmetros
+    ----------
+    y : np.ndarray
+        Matriz (unidades x variáveis), ou um vetor para uma só variável.
+    w : libpysal.weights.W | scipy.sparse
+        Pesos espaciais, já transformados (ex: padronizados por linha).
+    permutacoes : int, padrão 999
+        Número de permutações (0: sem pseudo p-valor).
+    semente : int | None
+        Semente do sorteio, para resultados reproduzíveis.
+
+    Retorna
+    -------
+    dict[str, np.ndarray]
+        'I', 'EI', 'p_sim', 'EI_sim' e 'z_sim', um valor por variável.
+    """
+    matriz = _matriz_esparsa(w)
+    y = np.asarray(y, dtype=np.float64)
+    y = y.reshape(len(y), -1)
+    n, m = y.shape
+
+    z = np.ascontiguousarray(y - y.mean(axis=0))
+    escala = n / matriz.sum() / (z * z).sum(axis=0)
+    observado = (z * (matriz @ z)).sum(axis=0) * escala
+
+    resultado = {
+        "I": observado,
+        "EI": np.full(m, -1.0 / (n - 1)),
+        "p_sim": np.full(m, np.nan),
+        "EI_sim": np.full(m, np.nan),
+        "z_sim": np.full(m, np.nan),
+    }
+
+    if permutacoes:
+        # As mesmas ordens do esda.Moran após np.random.seed(semente)
+        rng = np.random.RandomState(semente)
+        ordens = np.array([rng.permutation(n) for _ in range(permutacoes)])
+        simulados = _global_permutado(
+            z, matriz.indptr, matriz.indices, matriz.data.astype(np.float64), ordens, escala
+        )
+        resultado["p_sim"] = _p_sim((simulados >= observado).sum(axis=0), permutacoes)
+        resultado["EI_sim"] = simulados.mean(axis=0)
+        resultado["z_sim"] = (observado - resultado["EI_sim"]) / simulados.std(axis=0)
+
+    return resultado
+
+
+def moran_local_matriz(
+    y: np.ndarray,
+    w,
+    permutacoes: int = 999,
+    semente: int | None = None
+) -> dict[str, np.ndarray]:
+    """
+    Moran local (LISA) para todas as colunas de uma matriz de variáveis.
+
+    Usa permutação condicional: para cada unidade, os valores dos vizinhos
+    são sorteados entre as demais unidades, mantido o valor da própria.
+    Os sorteios são os mesmos do `esda.Moran_Local` (com a mesma semente,
+    os pseudo p-valores coincidem) e são reaproveitados entre as colunas;
+    as unidades são processadas em paralelo.
+
+    Parâmetros
+    ----------
+    y : np.ndarray
+        Matriz (unidades x variáveis), ou um vetor para uma só variável.
+    w : libpysal.weights.W | scipy.sparse
+        Pesos espaciais, já transformados (ex: padronizados por linha).
+    permutacoes : int, padrão 999
+        Número de permutações (0: sem pseudo p-valor).
+    semente : int | None
+        Semente do sorteio, para resultados reproduzíveis.
+
+    Retorna
+    -------
+    dict[str, np.ndarray]
+        Matrizes (unidades x variáveis) 'Is', 'q' (quadrante: 1 Alto-Alto,
+        2 Baixo-Alto, 3 Baixo-Baixo, 4 Alto-Baixo) e 'p_sim'.
+    """
+    matriz = _matriz_esparsa(w)
+    y = np.asarray(y, dtype=np.float64)
+    y = y.reshape(len(y), -1)
+    n, m = y.shape
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.ascontiguousarray((y - y.mean(axis=0)) / y.std(axis=0))
+    escala = (n - 1) / (z * z).sum(axis=0)
+
+    defasagem = matriz @ z
+    observado = z * defasagem * escala
+
+    positivo = z > 0
+    vizinhos_positivos = defasagem > 0
+    q = np.select(
+        [positivo & vizinhos_positivos, ~positivo & vizinhos_positivos, ~positivo & ~vizinhos_positivos],
+        [1, 2, 3],
+        default=4
+    )
+
+    resultado = {"Is": observado, "q": q, "p_sim": np.full((n, m), np.nan)}
+
+    if permutacoes:
+        pesos_proprios = matriz.diagonal().astype(np.float64)
+        vizinhanca = matriz.copy()
+        vizinhanca.setdiag(0)
+        vizinhanca.eliminate_zeros()
+
+        if semente is None:
+            semente = np.random.randint(12345, 12345000)
+
+        cardinalidades = np.diff(vizinhanca.indptr)
+        sorteios = _permutacoes_condicionais(max(cardinalidades.max(), 1), n, permutacoes, semente)
+
+        maiores = _local_permutado(
+            z,
+            vizinhanca.indptr,
+            vizinhanca.data.astype(np.float64),
+            pesos_proprios,
+            escala,
+            observado,
+            sorteios
+        )
+        resultado["p_sim"] = _p_sim(maiores, permutacoes)
+
+    return resultado
@@ -0,0 +1,10 @@
+from pathlib import Path
+
+# --- Local Directories ---
+PASTA_VIZINHANCAS = Path("data/vizinhancas")
+PASTA_MALHAS = Path("data/malhas")
+
+# --- Geometry store ---
+# Tolerâncias (em graus, SIRGAS 2000) das variantes simplificadas das malhas
+TOLERANCIAS_MALHA = (0.001, 0.01)
+TOLERANCIA_PADRAO = 0.001
@@ -0,0 +1,205 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import polars as pl
+import geopandas as gpd
+import pyarrow.parquet as pq
+import shapely
+from pathlib import Path
+from functools import lru_cache
+from .config import PASTA_MALHAS, TOLERANCIAS_MALHA
+
+logger = logging.getLogger(__name__)
+
+NIVEIS_MALHA = ("municipio", "uf")
+
+# Municípios instalados em 2013 (código novo -> município de origem), com
+# 6 dígitos. Em malhas anteriores à instalação, seus nascimentos são
+# atribuídos ao município de origem.
+MUNICIPIOS_DESMEMBRADOS = {
+    150475: 150680,  # Mojuí dos Campos (PA) <- Santarém
+    421265: 420940,  # Pescaria Brava (SC) <- Laguna
+    422000: 420700,  # Balneário Rincão (SC) <- Içara
+    431454: 430210,  # Pinto Bandeira (RS) <- Bento Gonçalves
+    500627: 500325,  # Paraíso das Águas (MS) <- Costa Rica
+}
+
+
+def caminho_malha(ano: int, nivel: str, tolerancia: float = 0, pasta: Path = PASTA_MALHAS) -> Path:
+    """
+    Arquivo GeoParquet de uma malha (tolerância 0: geometria original).
+    """
+    return Path(pasta) / f"{nivel}_{ano}_{tolerancia:g}.parquet"
+
+
+def _baixar_malha(ano: int, nivel: str) -> gpd.GeoDataFrame:
+    import geobr
+
+    if nivel == "municipio":
+        return geobr.read_municipality(year=ano, simplified=False)
+    return geobr.read_state(year=ano, simplified=False)
+
+
+def _simplificar(geometria: gpd.GeoSeries, tolerancia: float) -> gpd.GeoSeries:
+    # coverage_simplify (shapely >= 2.1) simplifica as fronteiras compartilhadas
+    # uma única vez, sem abrir buracos nem sobreposições entre vizinhos
+    if hasattr(shapely, "coverage_simplify"):
+        return gpd.GeoSeries(
+            shapely.coverage_simplify(geometria.values, tolerancia),
+            index=geometria.index,
+            crs=geometria.crs
+        )
+    return geometria.simplify(tolerancia, preserve_topology=True)
+
+
+def _gravar(gdf: gpd.GeoDataFrame, destino: Path) -> None:
+    tmp = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+    gdf.to_parquet(tmp, index=False, write_covering_bbox=True)
+    os.replace(tmp, destino)
+
+
+def importar_malha(
+    ano: int,
+    nivel: str = "municipio",
+    origem: gpd.GeoDataFrame | Path | None = None,
+    tolerancias: tuple[float, ...] = TOLERANCIAS_MALHA,
+    pasta: Path = PASTA_MALHAS
+) -> list[Path]:
+    """
+    Importa uma malha do IBGE para o armazenamento local de geometrias.
+
+    A malha é gravada em GeoParquet na resolução original e em uma variante
+    simplificada por tolerância. As colunas de código (code_muni,
+    code_state, code_region) são gravadas como inteiros e as linhas ficam
+    ordenadas pelo código, de modo que os joins não precisam de conversões
+    e as estatísticas dos row groups servem de índice.
+
+    Parâmetros
+    ----------
+    ano : int
+        Ano da malha.
+    nivel : str, padrão "municipio"
+        "municipio" ou "uf".
+    origem : gpd.GeoDataFrame | Path | None
+        A malha já carregada ou um arquivo legível pelo geopandas
+        (shapefile, GeoPackage...). None: baixa com o geobr.
+    tolerancias : tuple[float, ...], padrão TOLERANCIAS_MALHA
+        Tolerâncias das variantes simplificadas.
+    pasta : Path, padrão PASTA_MALHAS
+        Pasta do armazenamento.
+
+    Retorna
+    -------
+    list[Path]
+        Os arquivos gravados, começando pela malha original.
+    """
+    if nivel not in NIVEIS_MALHA:
+        raise ValueError("nivel deve ser 'municipio' ou 'uf'")
+
+    if origem is None:
+        logger.info("Importing the %s %s mesh from geobr", nivel, ano, extra={"ano_malha": ano, "nivel": nivel})
+        gdf = _baixar_malha(ano, nivel)
+    elif isinstance(origem, gpd.GeoDataFrame):
+        gdf = origem.copy()
+    else:
+        gdf = gpd.read_file(origem)
+
+    codigos = [col for col in gdf.columns if col.startswith("code_")]
+    for col in codigos:
+        gdf[col] = pd.to_numeric(gdf[col]).astype("int32")
+
+    chave = "code_muni" if nivel == "municipio" else "code_state"
+    gdf = gdf.sort_values(chave, ignore_index=True)
+
+    Path(pasta).mkdir(parents=True, exist_ok=True)
+    arquivos = []
+    for tolerancia in (0, *tolerancias):
+        destino = caminho_malha(ano, nivel, tolerancia, pasta)
+        variante = gdf
+        if tolerancia:
+            variante = gdf.set_geometry(_simplificar(gdf.geometry, tolerancia))
+        _gravar(variante, destino)
+        arquivos.append(destino)
+
+    return arquivos
+
+
+def ler_malha(
+    ano: int,
+    nivel: str = "municipio",
+    tolerancia: float = 0,
+    colunas: list[str] | None = None,
+    pasta: Path = PASTA_MALHAS
+) -> gpd.GeoDataFrame:
+    """
+    Lê uma malha do armazenamento local, importando-a na primeira vez.
+
+    Só as colunas pedidas (mais a geometria) são lidas do GeoParquet. Uma
+    tolerância sem variante gravada é simplificada a partir da original e
+    guardada para as próximas leituras.
+    """
+    destino = caminho_malha(ano, nivel, tolerancia, pasta)
+
+    if not caminho_malha(ano, nivel, 0, pasta).exists():
+        importar_malha(ano, nivel, pasta=pasta)
+
+    if not destino.exists():
+        # Tolerância fora das variantes pré-calculadas
+        original = gpd.read_parquet(caminho_malha(ano, nivel, 0, pasta))
+        _gravar(original.set_geometry(_simplificar(original.geometry, tolerancia)), destino)
+
+    if colunas is not None:
+        colunas = list(dict.fromkeys([*colunas, "geometry"]))
+
+    return gpd.read_parquet(destino, columns=colunas)
+
+
+def codigo_6_digitos(coluna: str) -> pl.Expr:
+    """
+    Código IBGE de 6 dígitos (sem o verificador) como inteiro, a partir de
+    códigos de 6 ou 7 dígitos, numéricos ou em texto.
+    """
+    codigo = pl.col(coluna).cast(pl.Int64, strict=False)
+    return pl.when(codigo >= 1_000_000).then(codigo // 10).otherwise(codigo).cast(pl.Int32)
+
+
+@lru_cache(maxsize=8)
+def _harmonizacao(caminho: Path, versao: int) -> pl.DataFrame:
+    codigos = pq.read_table(caminho, columns=["code_muni"])["code_muni"].to_numpy() // 10
+    linhas = pd.Index(codigos)
+
+    tabela = {
+        "_chave": codigos,
+        "_linha": np.arange(len(codigos)),
+        "_cod_malha": codigos,
+    }
+    for novo, origem in MUNICIPIOS_DESMEMBRADOS.items():
+        if novo not in linhas and origem in linhas:
+            tabela["_chave"] = np.append(tabela["_chave"], novo)
+            tabela["_linha"] = np.append(tabela["_linha"], linhas.get_loc(origem))
+            tabela["_cod_malha"] = np.append(tabela["_cod_malha"], origem)
+
+    return pl.DataFrame(tabela, schema={"_chave": pl.Int32, "_linha": pl.UInt32, "_cod_malha": pl.Int32})
+
+
+def tabela_harmonizacao(ano: int, pasta: Path = PASTA_MALHAS) -> pl.DataFrame:
+    """
+    Tabela de harmonização dos códigos municipais de 6 dígitos com a malha
+    de `ano`.
+
+    Cada código da malha (code_muni sem o dígito verificador) aponta para a
+    sua linha na malha; municípios ainda não instalados naquele ano (ver
+    MUNICIPIOS_DESMEMBRADOS) apontam para o município de origem. Calculada
+    uma vez por malha, a partir só da coluna de códigos.
+
+    Retorna
+    -------
+    pl.DataFrame
+        '_chave' (código de 6 dígitos), '_linha' (posição na malha) e
+        '_cod_malha' (código de 6 dígitos do município da malha).
+    """
+    caminho = caminho_malha(ano, "municipio", 0, pasta)
+    if not caminho.exists():
+        importar_malha(ano, "municipio", pasta=pasta)
+    return _harmonizacao(caminho, caminho.stat().st_mtime_ns)
@@ -0,0 +1,171 @@
+import numpy as np
+from numba import njit, prange
+from scipy.stats import norm
+
+
+@njit(cache=True)
+def _postos(x: np.ndarray) -> np.ndarray:
+    """
+    Postos com média nos empates (como `scipy.stats.rankdata`).
+    """
+    n = len(x)
+    ordem = np.argsort(x, kind="mergesort")
+    postos = np.empty(n)
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and x[ordem[j + 1]] == x[ordem[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            postos[ordem[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return postos
+
+
+@njit(cache=True)
+def _mann_kendall_serie(y: np.ndarray, hamed_rao: bool, lag: int, limite_acf: float):
+    """
+    S, Var(S), Tau, inclinação e intercepto de Sen de uma série, ignorando
+    NaNs (mesmas convenções do pymannkendall).
+    """
+    t = np.arange(len(y)).astype(np.float64)
+    observado = ~np.isnan(y)
+    x = y[observado]
+    tx = t[observado]
+    n = len(x)
+
+    if n < 2:
+        return np.nan, np.nan, np.nan, np.nan, np.nan
+
+    s = 0.0
+    pares = np.empty(n * (n - 1) // 2)
+    p = 0
+    for i in range(n - 1):
+        for j in range(i + 1, n):
+            d = x[j] - x[i]
+            if d > 0:
+                s += 1.0
+            elif d < 0:
+                s -= 1.0
+            pares[p] = d / (tx[j] - tx[i])
+            p += 1
+
+    # Correção de empates na variância
+    ordenado = np.sort(x)
+    empates = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and ordenado[j + 1] == ordenado[i]:
+            j += 1
+        tp = j - i + 1
+        empates += tp * (tp - 1) * (2 * tp + 5)
+        i = j + 1
+    var_s = (n * (n - 1) * (2 * n + 5) - empates) / 18
+
+    tau = s / (0.5 * n * (n - 1))
+    inclinacao = np.median(pares)
+    intercepto = np.median(x) - np.median(tx) * inclinacao
+
+    if hamed_rao:
+        if n < 3:
+            return s, np.nan, tau, inclinacao, intercepto
+
+        # Autocorrelação dos postos da série sem tendência
+        postos = _postos(x - np.arange(1, n + 1) * inclinacao)
+        r = postos - postos.mean()
+        acov0 = (r * r).sum()
+        limite = limite_acf / np.sqrt(n)
+        sni = 0.0
+        # Postos todos iguais: autocorrelação indefinida, sem correção
+        for k in range(1, min(lag, n) if acov0 > 0 else 1):
+            acf = (r[:n - k] * r[k:]).sum() / acov0
+            if acf > limite or acf < -limite:
+                sni += (n - k) * (n - k - 1) * (n - k - 2) * acf
+        var_s *= 1 + 2 / (n * (n - 1) * (n - 2)) * sni
+
+    return s, var_s, tau, inclinacao, intercepto
+
+
+@njit(parallel=True, cache=True)
+def _mann_kendall_matriz(y: np.ndarray, hamed_rao: bool, lag: int, limite_acf: float) -> np.ndarray:
+    resultado = np.empty((y.shape[0], 5))
+    for linha in prange(y.shape[0]):
+        s, var_s, tau, inclinacao, intercepto = _mann_kendall_serie(
+            y[linha], hamed_rao, lag, limite_acf
+        )
+        resultado[linha, 0] = s
+        resultado[linha, 1] = var_s
+        resultado[linha, 2] = tau
+        resultado[linha, 3] = inclinacao
+        resultado[linha, 4] = intercepto
+    return resultado
+
+
+def mann_kendall_matriz(
+    y: np.ndarray,
+    alpha: float = 0.05,
+    metodo: str = "original",
+    lag: int | None = None
+) -> dict[str, np.ndarray]:
+    """
+    Teste de Mann-Kendall para todas as linhas de uma matriz grupo x tempo.
+
+    As séries são processadas em paralelo por um kernel compilado (numba),
+    que calcula S, a variância com correção de empates, Tau e a inclinação e
+    o intercepto de Sen; Z, p-valor e a tendência são derivados de forma
+    vetorizada. Valores ausentes são ignorados em cada série.
+
+    Parâmetros
+    ----------
+    y : np.ndarray
+        Matriz (grupos x tempo) com as séries nas linhas.
+    alpha : float, padrão 0.05
+        Nível de significância.
+    metodo : str, padrão "original"
+        "original" (Mann 1945, Kendall 1975) ou "hamed_rao", que corrige a
+        variância pela autocorrelação dos postos (Hamed e Rao 1998).
+    lag : int | None
+        Número de defasagens usadas na correção de Hamed-Rao (None: todas).
+
+    Retorna
+    -------
+    dict[str, np.ndarray]
+        Arrays 'tendencia', 'h', 'p', 'z', 'tau', 's', 'var_s',
+        'inclinacao' e 'intercepto', um valor por linha.
+    """
+    if metodo not in ("original", "hamed_rao"):
+        raise ValueError(f"Método de Mann-Kendall desconhecido: {metodo!r}")
+
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if y.ndim != 2:
+        raise ValueError("Esperada uma matriz grupo x tempo (2 dimensões).")
+
+    lag = y.shape[1] if lag is None else lag + 1
+    critico = norm.ppf(1 - alpha / 2)
+
+    s, var_s, tau, inclinacao, intercepto = _mann_kendall_matriz(
+        y, metodo == "hamed_rao", lag, critico
+    ).T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(s > 0, (s - 1) / np.sqrt(var_s), np.where(s < 0, (s + 1) / np.sqrt(var_s), 0.0))
+    z = np.where(np.isnan(s), np.nan, z)
+
+    p = 2 * (1 - norm.cdf(np.abs(z)))
+    h = np.abs(z) > critico
+    tendencia = np.where(
+        h & (z < 0), "decreasing", np.where(h & (z > 0), "increasing", "no trend")
+    )
+
+    return {
+        "tendencia": tendencia,
+        "h": h,
+        "p": p,
+        "z": z,
+        "tau": tau,
+        "s": s,
+        "var_s": var_s,
+        "inclinacao": inclinacao,
+        "intercepto": intercepto,
+    }
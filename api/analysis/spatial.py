@@ -1,16 +1,20 @@
+import re
 import libpysal
 import numpy as np
-from esda.moran import Moran
-from esda.moran import Moran_Local
-from esda.smoothing import Empirical_Bayes
 import pandas as pd
+import polars as pl
 import geopandas as gpd
-import geobr
+from .autocorrelacao import moran_global_matriz, moran_local_matriz
+from .config import TOLERANCIA_PADRAO
+from .malhas import codigo_6_digitos, ler_malha, tabela_harmonizacao
+from .suavizacao import bayes_empirico_espacial, bayes_empirico_global
+from .vizinhanca import COLUNAS_CODIGO, subconjunto_vizinhanca
 
 def criar_matriz_vizinhanca(
     gdf,
     metodo: str = "queen",
-    k: int = 8
+    k: int = 8,
+    ano_malha: int | None = None
 ):
     """
     Cria uma matriz de vizinhança espacial.
@@ -18,9 +22,18 @@ def criar_matriz_vizinhanca(
     metodo:
         - 'queen' : contiguidade
         - 'knn'   : k-vizinhos mais próximos
+
+    Se `ano_malha` for dado e `gdf` vier da malha do IBGE daquele ano (com
+    'code_muni' ou 'code_state'), a vizinhança é recortada da matriz
+    guardada da malha inteira (ver `subconjunto_vizinhanca`) em vez de ser
+    reconstruída a partir dos polígonos.
     """
 
-    if metodo == "queen":
+    nivel = next((n for n, col in COLUNAS_CODIGO.items() if col in gdf.columns), None)
+
+    if ano_malha is not None and nivel is not None:
+        w = subconjunto_vizinhanca(gdf, ano=ano_malha, nivel=nivel, metodo=metodo, k=k)
+    elif metodo == "queen":
         w = libpysal.weights.Queen.from_dataframe(gdf, use_index=True)
     elif metodo == "knn":
         w = libpysal.weights.KNN.from_dataframe(gdf, k=k, use_index=True)
@@ -34,127 +47,274 @@ def criar_matriz_vizinhanca(
 
 def calcular_moran_global(
     gdf,
-    coluna: str,
-    w
+    coluna: str | list[str],
+    w,
+    permutacoes: int = 999,
+    semente: int | None = None
 ):
     """
     Calcula o I de Moran Global.
+
+    Com uma lista de colunas, todas são avaliadas na mesma chamada (ver
+    `moran_global_matriz`) e o retorno é um DataFrame com o I e o p-valor
+    de cada coluna.
     """
-    values = gdf[coluna].fillna(0).values
-    mi = Moran(values, w)
+    colunas = [coluna] if isinstance(coluna, str) else list(coluna)
+    values = gdf[colunas].fillna(0).values
+    mi = moran_global_matriz(values, w, permutacoes=permutacoes, semente=semente)
 
-    return mi.I, mi.p_sim
+    if isinstance(coluna, str):
+        return mi["I"][0], mi["p_sim"][0]
+
+    return pd.DataFrame({"I": mi["I"], "p_sim": mi["p_sim"]}, index=colunas)
 
 def calcular_lisa_local(
     gdf,
-    coluna: str,
-    w
+    coluna: str | list[str],
+    w,
+    permutacoes: int = 999,
+    semente: int | None = None
 ):
     """
     Calcula o LISA (Moran Local).
+
+    Com uma lista de colunas, todas são avaliadas na mesma chamada (ver
+    `moran_local_matriz`) e cada uma ganha sua coluna 'lisa_cluster_{coluna}'.
     """
-    values = gdf[coluna].values
-    lisa = Moran_Local(values, w)
+    colunas = [coluna] if isinstance(coluna, str) else list(coluna)
+    values = gdf[colunas].values
+    lisa = moran_local_matriz(values, w, permutacoes=permutacoes, semente=semente)
 
     # Identificar clusters significantes (p < 0.05)
-    sig = lisa.p_sim < 0.05
+    sig = lisa["p_sim"] < 0.05
     
     # Categorias de clusters
-    categories = {
-        1: 'Alto-Alto',
-        2: 'Baixo-Alto',
-        3: 'Baixo-Baixo',
-        4: 'Alto-Baixo'
-    }
-    
-    gdf['lisa_cluster'] = 'Não significante'
-    gdf.loc[sig, 'lisa_cluster'] = [categories[q] for q in lisa.q[sig]]
+    categories = np.array([
+        'Não significante',
+        'Alto-Alto',
+        'Baixo-Alto',
+        'Baixo-Baixo',
+        'Alto-Baixo'
+    ], dtype=object)
+
+    clusters = categories[np.where(sig, lisa["q"], 0)]
+
+    if isinstance(coluna, str):
+        gdf['lisa_cluster'] = clusters[:, 0]
+    else:
+        for i, col in enumerate(colunas):
+            gdf[f'lisa_cluster_{col}'] = clusters[:, i]
 
     return gdf
 
 def suavizar_taxa(
     gdf,
-    coluna_casos: str,
-    coluna_populacao: str,
-    nome_saida: str = "taxa_suavizada"
+    coluna_casos: str | list[str],
+    coluna_populacao: str | list[str],
+    nome_saida: str = "taxa_suavizada",
+    multiplicador: int = 100_000,
+    w=None
 ):
     """
     Suavização Bayesiana Empírica clássica.
+
+    Sem `w`, a suavização é global; com `w` (ex: de
+    `criar_matriz_vizinhanca`), cada taxa é encolhida em direção à média da
+    sua vizinhança (Bayes Empírico espacial). Com uma lista de colunas de
+    casos (e uma coluna de população comum ou uma por coluna de casos),
+    todas são suavizadas de uma vez e gravadas em '{nome_saida}_{coluna}'.
     """
+    colunas_casos = [coluna_casos] if isinstance(coluna_casos, str) else list(coluna_casos)
+    colunas_pop = [coluna_populacao] if isinstance(coluna_populacao, str) else list(coluna_populacao)
+
     # Tratamento para evitar divisão por zero
-    pop_vals = gdf[coluna_populacao].fillna(0).values
+    pop_vals = gdf[colunas_pop].fillna(0).values
     pop_vals = np.where(pop_vals == 0, 1, pop_vals)
+    casos_vals = gdf[colunas_casos].fillna(0).values
 
-    eb = Empirical_Bayes(
-        gdf[coluna_casos].fillna(0).values,
-        pop_vals
-    )
+    if w is None:
+        taxas = bayes_empirico_global(casos_vals, pop_vals)
+    else:
+        taxas = bayes_empirico_espacial(casos_vals, pop_vals, w)
+
+    # Multiplica pelo multiplicador para manter a escala da taxa
+    taxas = taxas * multiplicador
 
-    # Multiplica por 100.000 para manter a escala da taxa
-    gdf[nome_saida] = eb.r * 100000
+    if isinstance(coluna_casos, str):
+        gdf[nome_saida] = taxas[:, 0]
+    else:
+        for i, col in enumerate(colunas_casos):
+            gdf[f"{nome_saida}_{col}"] = taxas[:, i]
     return gdf
 
 
 def obter_geometria_municipios(
     ano: int = 2022,
-    simplificado: bool = True
+    simplificado: bool = True,
+    colunas: list[str] | None = None
 ) -> gpd.GeoDataFrame:
     """
-    Baixa (ou carrega do cache) a malha municipal do IBGE.
+    Carrega a malha municipal do IBGE do armazenamento local de geometrias
+    (importada com o geobr só na primeira vez; ver `ler_malha`).
     """
-    gdf = geobr.read_municipality(
-        year=ano,
-        simplified=simplificado
+    return ler_malha(
+        ano,
+        "municipio",
+        tolerancia=TOLERANCIA_PADRAO if simplificado else 0,
+        colunas=colunas
     )
 
-    # Padronização de colunas
-    gdf["code_muni"] = gdf["code_muni"].astype(str)
+def obter_geometria_estados(
+    ano: int = 2022,
+    simplificado: bool = True,
+    colunas: list[str] | None = None
+) -> gpd.GeoDataFrame:
+    """
+    Carrega a malha estadual do IBGE do armazenamento local de geometrias.
+    """
+    return ler_malha(
+        ano,
+        "uf",
+        tolerancia=TOLERANCIA_PADRAO if simplificado else 0,
+        colunas=colunas
+    )
 
-    return gdf
+def _somar_desmembrados(dados: pl.DataFrame) -> pl.DataFrame:
+    """
+    Soma os agregados de municípios desmembrados aos do município de origem
+    e recalcula as taxas (só para tabelas no formato de `agregar`).
+    """
+    from api.sinasc.aggregate import combinar_parciais
+
+    taxas = [col for col in dados.columns if col.startswith("taxa_por_")]
+    if "n_nascidos_vivos" not in dados.columns or not taxas:
+        return dados
+
+    multiplicador = int(re.match(r"taxa_por_(\d+)", taxas[0]).group(1))
+    valores = {"n_nascidos_vivos", *taxas}
+    valores |= {col for col in dados.columns if col == "casos" or col.startswith("casos_")}
+    grupos = [col for col in dados.columns if col not in valores]
+
+    return combinar_parciais(dados.lazy(), grupos, multiplicador).collect()
 
 def juntar_com_geometria(
     df,
     coluna_codigo: str = "codmunres",
-    ano_malha: int = 2022
+    ano_malha: int = 2022,
+    malha: gpd.GeoDataFrame | None = None
 ):
     """
     Junta a tabela agregada do SINASC com a malha municipal ou estadual.
+
+    O join é feito no polars, com chaves inteiras: o código de 6 dígitos do
+    município (ou o da UF) contra a tabela de harmonização da malha (ver
+    `tabela_harmonizacao`), que também atribui municípios ainda não
+    instalados no ano da malha ao município de origem. O resultado passa
+    para o pandas uma única vez e a geometria é tomada da malha por
+    posição. `df` (pandas ou polars) não é modificado.
+
+    `malha` evita a leitura da malha em quem já a mantém em memória; deve
+    ser a de `obter_geometria_municipios` (ou `obter_geometria_estados`)
+    do mesmo `ano_malha`, na mesma ordem de linhas.
     """
     
     if coluna_codigo not in df.columns:
         raise KeyError(f"Coluna '{coluna_codigo}' não encontrada no DataFrame. Colunas disponíveis: {list(df.columns)}")
+
+    dados = df if isinstance(df, pl.DataFrame) else pl.from_pandas(df)
     
     # Lógica para Estados (UF)
     if coluna_codigo == "codufres":
-        gdf_shape = geobr.read_state(year=ano_malha, simplified=True)
-        col_geo = "code_state"
-        
-        # Padronização
-        gdf_shape[col_geo] = gdf_shape[col_geo].astype(str)
-        df[coluna_codigo] = df[coluna_codigo].astype(str)
-        
-        gdf = gdf_shape.merge(
-            df,
-            left_on=col_geo,
-            right_on=coluna_codigo,
-            how="left"
+        gdf_shape = malha if malha is not None else obter_geometria_estados(ano=ano_malha)
+        dados = dados.with_columns(
+            _linha=pl.col(coluna_codigo).cast(pl.Int32, strict=False).replace_strict(
+                gdf_shape["code_state"].to_numpy(),
+                np.arange(len(gdf_shape)),
+                default=None,
+                return_dtype=pl.UInt32
+            )
         )
-        return gdf
 
     # Lógica para Municípios (Padrão)
-    gdf_shape = obter_geometria_municipios(ano=ano_malha)
+    else:
+        gdf_shape = malha if malha is not None else obter_geometria_municipios(ano=ano_malha)
+        dados = (
+            dados
+            .with_columns(codigo_6_digitos(coluna_codigo).alias("_chave"))
+            .join(tabela_harmonizacao(ano_malha), on="_chave", how="left")
+        )
 
-    # Padroniza para 6 dígitos para garantir o join (SINASC costuma ser 6, Geobr 7)
-    df[coluna_codigo] = df[coluna_codigo].astype(str)
-    df["_cod_join"] = df[coluna_codigo].str.slice(0, 6)
-    
-    gdf_shape["code_muni"] = gdf_shape["code_muni"].astype(str)
-    gdf_shape["_cod_join"] = gdf_shape["code_muni"].str.slice(0, 6)
+        harmonizados = dados["_chave"] != dados["_cod_malha"]
+        if harmonizados.any():
+            dados = (
+                dados
+                .with_columns(
+                    pl.when(harmonizados)
+                    .then(pl.col("_cod_malha").cast(dados.schema[coluna_codigo]))
+                    .otherwise(pl.col(coluna_codigo))
+                    .alias(coluna_codigo)
+                )
+                .drop("_chave", "_cod_malha")
+                .pipe(_somar_desmembrados)
+            )
+        dados = dados.drop("_chave", "_cod_malha", strict=False)
+
+    atributos = pl.from_pandas(pd.DataFrame(gdf_shape.drop(columns=gdf_shape.geometry.name)))
+    juntos = (
+        atributos
+        .with_row_index("_linha")
+        .join(dados, on="_linha", how="left", maintain_order="left")
+    )
 
-    gdf = gdf_shape.merge(
-        df,
-        on="_cod_join",
-        how="left"
+    gdf = gpd.GeoDataFrame(
+        juntos.drop("_linha").to_pandas(),
+        geometry=gdf_shape.geometry.values.take(juntos["_linha"].to_numpy()),
+        crs=gdf_shape.crs
     )
     
     return gdf
+
+def autocorrelacao_por_ano(
+    df,
+    colunas: list[str],
+    anos: list[int],
+    ano_malha: int = 2022,
+    metodo: str = "queen",
+    permutacoes: int = 999,
+    semente: int | None = None,
+    malha: gpd.GeoDataFrame | None = None
+) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """
+    I de Moran global e clusters LISA de cada ano de uma tabela municipal
+    do SINASC (estratos=["codmunres"]).
+
+    Em cada ano entram os municípios com todas as `colunas` preenchidas,
+    com a vizinhança recortada da guardada para a malha (ver
+    `criar_matriz_vizinhanca`).
+
+    Retorna
+    -------
+    tuple[pd.DataFrame | None, pd.DataFrame | None]
+        (taxa, I, p_sim, ano) e (code_muni, ano, lisa_cluster_{coluna}...),
+        ou (None, None) se nenhum ano tiver ao menos dois municípios.
+    """
+    morans, lisas = [], []
+    for ano in anos:
+        gdf = juntar_com_geometria(df.filter(pl.col("ano") == ano), "codmunres", ano_malha, malha=malha)
+        gdf = gdf[gdf[colunas].notna().all(axis=1)]
+        if len(gdf) < 2:
+            continue
+
+        w = criar_matriz_vizinhanca(gdf, metodo=metodo, ano_malha=ano_malha)
+
+        moran = calcular_moran_global(gdf, colunas, w, permutacoes=permutacoes, semente=semente)
+        morans.append(moran.rename_axis("taxa").reset_index().assign(ano=ano))
+
+        gdf = calcular_lisa_local(gdf, colunas, w, permutacoes=permutacoes, semente=semente)
+        lisa = pd.DataFrame(gdf[["code_muni"] + [f"lisa_cluster_{c}" for c in colunas]])
+        lisa.insert(1, "ano", ano)
+        lisas.append(lisa)
+
+    if not morans:
+        return None, None
+    return pd.concat(morans, ignore_index=True), pd.concat(lisas, ignore_index=True)
@@ -0,0 +1,99 @@
+import numpy as np
+from scipy import sparse
+from .autocorrelacao import _matriz_esparsa
+
+
+def _como_matrizes(casos, nascidos) -> tuple[np.ndarray, np.ndarray]:
+    casos = np.asarray(casos, dtype=np.float64)
+    casos = casos.reshape(len(casos), -1)
+    nascidos = np.asarray(nascidos, dtype=np.float64)
+    nascidos = nascidos.reshape(len(nascidos), -1)
+    return casos, np.broadcast_to(nascidos, casos.shape)
+
+
+def _encolher(taxa, media, variancia, nascidos) -> np.ndarray:
+    # Sem variância nem casos na referência, a taxa é a própria média
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peso = variancia / (variancia + media / nascidos)
+    return np.where(np.isfinite(peso), media + (taxa - media) * peso, media)
+
+
+def bayes_empirico_global(casos, nascidos) -> np.ndarray:
+    """
+    Suavização Bayesiana Empírica global para várias colunas de uma vez.
+
+    Cada coluna (um ano, um CID...) é encolhida em direção à sua taxa
+    global, com o mesmo estimador de momentos de
+    `esda.smoothing.Empirical_Bayes`.
+
+    Parâmetros
+    ----------
+    casos : np.ndarray
+        Matriz (unidades x colunas) de casos.
+    nascidos : np.ndarray
+        Matriz de nascidos vivos do mesmo formato, ou uma única coluna
+        comum a todas as colunas de casos.
+
+    Retorna
+    -------
+    np.ndarray
+        Taxas suavizadas (proporções), no formato de `casos`.
+    """
+    casos, nascidos = _como_matrizes(casos, nascidos)
+
+    media = casos.sum(axis=0) / nascidos.sum(axis=0)
+    taxa = casos / nascidos
+    variancia = (
+        (nascidos * (taxa - media) ** 2).sum(axis=0) / nascidos.sum(axis=0)
+        - media / nascidos.mean(axis=0)
+    )
+
+    return _encolher(taxa, media, variancia, nascidos)
+
+
+def bayes_empirico_espacial(casos, nascidos, w) -> np.ndarray:
+    """
+    Suavização Bayesiana Empírica espacial (local) para várias colunas.
+
+    A referência de cada unidade é a sua vizinhança em `w` (mais a própria
+    unidade), como em `esda.smoothing.Spatial_Empirical_Bayes`: a média e a
+    variância locais saem de produtos da matriz esparsa de vizinhança
+    (binária) pelas matrizes de casos e nascidos, sem laço por unidade.
+
+    Parâmetros
+    ----------
+    casos : np.ndarray
+        Matriz (unidades x colunas) de casos.
+    nascidos : np.ndarray
+        Matriz de nascidos vivos do mesmo formato, ou uma única coluna
+        comum a todas as colunas de casos.
+    w : libpysal.weights.W | scipy.sparse
+        Vizinhança das unidades (ex: de `criar_matriz_vizinhanca`), na ordem
+        das linhas das matrizes. Só a estrutura é usada, não os pesos.
+
+    Retorna
+    -------
+    np.ndarray
+        Taxas suavizadas (proporções), no formato de `casos`.
+    """
+    casos, nascidos = _como_matrizes(casos, nascidos)
+
+    vizinhanca = (_matriz_esparsa(w) != 0).astype(np.float64).tolil()
+    vizinhanca.setdiag(1.0)
+    vizinhanca = sparse.csr_matrix(vizinhanca)
+    n_vizinhos = np.diff(vizinhanca.indptr).reshape(-1, 1)
+
+    casos_locais = vizinhanca @ casos
+    nascidos_locais = vizinhanca @ nascidos
+    media = casos_locais / nascidos_locais
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxa = casos / nascidos
+        # sum_j (taxa_j - media_i)^2 * nascidos_j, expandido em produtos esparsos
+        dispersao = vizinhanca @ (casos * taxa) - media * casos_locais
+        variancia = np.maximum(
+            dispersao / nascidos_locais - media / (nascidos_locais / n_vizinhos),
+            0.0
+        )
+
+    return _encolher(taxa, media, variancia, nascidos)
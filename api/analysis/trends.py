@@ -1,11 +1,19 @@
+import numpy as np
 import pandas as pd
-import statsmodels.api as sm
-import pymannkendall as mk
+import polars as pl
+from scipy import stats
+from .mannkendall import mann_kendall_matriz
 
 def calcular_regressao_linear(df: pd.DataFrame) -> pd.DataFrame:
     """
     Realiza regressão linear simples em dados de série temporal.
 
+    Todas as séries são ajustadas de uma vez, em forma fechada, sobre a
+    matriz grupo x tempo. Valores ausentes são mascarados: cada série usa
+    apenas os pontos observados (com menos de três pontos, IC e p-valor
+    ficam NaN). A variação percentual compara o primeiro e o último valor
+    observados e é NaN quando o valor inicial é zero.
+
     Parâmetros
     ----------
     df : pd.DataFrame
@@ -16,74 +24,177 @@ def calcular_regressao_linear(df: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         DataFrame com resultados da regressão, incluindo coeficientes, R-quadrado e p-valor.
     """
-    results = []
+    years = df.columns.map(int).values.astype(float)
+    y = df.to_numpy(dtype=float)
+
+    mask = np.isfinite(y)
+    n = mask.sum(axis=1)
+    x = np.where(mask, years, 0.0)
+    y0 = np.where(mask, y, 0.0)
 
-    years = df.columns.map(int).values
-    years_len = len(years) - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = x.sum(axis=1) / n
+        y_mean = y0.sum(axis=1) / n
 
-    for group in df.index:
-        first = df.loc[group].iloc[0]
-        last = df.loc[group].iloc[years_len]
+        dx = np.where(mask, years - x_mean[:, None], 0.0)
+        dy = np.where(mask, y - y_mean[:, None], 0.0)
 
-        variation = ((last - first) / first) * 100
+        sxx = (dx ** 2).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+        syy = (dy ** 2).sum(axis=1)
 
-        data = df.loc[group].astype(float).values
-        X = sm.add_constant(years)
+        beta1 = sxy / sxx
+        beta0 = y_mean - beta1 * x_mean
 
-        mod = sm.OLS(data, X)
-        res = mod.fit()
+        sse = np.maximum(syy - beta1 * sxy, 0.0)
+        dof = n - 2
+        se_beta1 = np.sqrt(sse / np.where(dof > 0, dof, np.nan) / sxx)
+        t_crit = stats.t.ppf(0.975, np.where(dof > 0, dof, np.nan))
 
-        beta0, beta1 = res.params
-        b1_lower, b1_upper = res.conf_int(alpha=0.05)[1]
+        t_stat = beta1 / se_beta1
+        p_value = 2 * stats.t.sf(np.abs(t_stat), np.where(dof > 0, dof, np.nan))
+        r2 = 1 - sse / syy
 
-        results.append({
-            "Grupo": group,
-            "Valor Inicial": first,
-            "Valor Final": last,
-            "Intercepto": beta0,
-            "Inclinacao": beta1,
-            "Inclinacao IC inferior": b1_lower.round(2),
-            "Inclinacao IC superior": b1_upper.round(2),
-            "R^2": res.rsquared.round(2),
-            "p-valor": res.pvalues[1].round(5)
-            if len(res.pvalues) > 1 else None,
-            "Variacao(%)": variation.round(2)
-        })
+        # Primeiro e último valores observados de cada série
+        idx = np.arange(len(y))
+        first = np.where(n > 0, y[idx, mask.argmax(axis=1)], np.nan)
+        last = np.where(n > 0, y[idx, y.shape[1] - 1 - mask[:, ::-1].argmax(axis=1)], np.nan)
+        variation = np.where(first != 0, (last - first) / first * 100, np.nan)
 
-    df_results = pd.DataFrame(results)
-    return df_results
+    return pd.DataFrame({
+        "Grupo": df.index,
+        "Valor Inicial": first,
+        "Valor Final": last,
+        "Intercepto": beta0,
+        "Inclinacao": beta1,
+        "Inclinacao IC inferior": (beta1 - t_crit * se_beta1).round(2),
+        "Inclinacao IC superior": (beta1 + t_crit * se_beta1).round(2),
+        "R^2": r2.round(2),
+        "p-valor": p_value.round(5),
+        "Variacao(%)": variation.round(2),
+    })
 
-def calcular_mann_kendall(df: pd.DataFrame) -> pd.DataFrame:
+def calcular_mann_kendall(
+    df: pd.DataFrame,
+    alpha: float = 0.05,
+    metodo: str = "original",
+    lag: int | None = None
+) -> pd.DataFrame:
     """
     Realiza o teste de tendência de Mann-Kendall em séries temporais.
 
+    Todas as séries são testadas de uma vez (ver `mann_kendall_matriz`),
+    com os mesmos resultados do pymannkendall.
+
     Parâmetros
     ----------
     df : pd.DataFrame
         DataFrame onde o índice representa grupos e as colunas representam pontos no tempo (ex: anos).
+    alpha : float, padrão 0.05
+        Nível de significância.
+    metodo : str, padrão "original"
+        "original" ou "hamed_rao" (variância corrigida pela autocorrelação).
+    lag : int | None
+        Defasagens consideradas na correção de Hamed-Rao (None: todas).
 
     Retorna
     -------
     pd.DataFrame
         DataFrame com resultados do teste de Mann-Kendall.
     """
-    results = df.apply(
-        lambda row: mk.original_test(row.astype(float)),
-        axis=1
-    ).apply(pd.Series)
-    
-    results.columns = ['Tendencia', 'h', 'p-valor', 'z', 'Tau', 'Score', 'Variancia', 'Inclinacao', 'Intercepto']
-    
+    res = mann_kendall_matriz(df.to_numpy(dtype=float), alpha=alpha, metodo=metodo, lag=lag)
+
+    results = pd.DataFrame({
+        'Tendencia': res['tendencia'],
+        'h': res['h'],
+        'p-valor': res['p'],
+        'z': res['z'],
+        'Tau': res['tau'],
+        'Score': res['s'],
+        'Variancia': res['var_s'],
+        'Inclinacao': res['inclinacao'],
+        'Intercepto': res['intercepto'],
+    }, index=df.index)
+
     # Adiciona valores iniciais e finais
     results['Valor Inicial'] = df.iloc[:, 0]
     results['Valor Final'] = df.iloc[:, -1]
-    
+
     return results
 
-def hamed_rao(data: pd.Series) -> dict:
+def hamed_rao(data: pd.Series, alpha: float = 0.05, lag: int | None = None) -> dict:
     """
-    Performs Hamed-Rao modified Mann-Kendall trend test.
-    (Placeholder - actual implementation needs to be added)
+    Teste de Mann-Kendall modificado de Hamed e Rao (1998) para uma série.
+
+    A variância de S é corrigida pela autocorrelação significativa dos
+    postos da série sem tendência (removida pela inclinação de Sen).
+
+    Parâmetros
+    ----------
+    data : pd.Series
+        Série temporal.
+    alpha : float, padrão 0.05
+        Nível de significância.
+    lag : int | None
+        Defasagens consideradas na correção (None: todas).
+
+    Retorna
+    -------
+    dict
+        Tendencia, h, p-valor, z, Tau, Score, Variancia, Inclinacao e Intercepto.
+    """
+    return (
+        calcular_mann_kendall(data.to_frame().T, alpha=alpha, metodo="hamed_rao", lag=lag)
+        .drop(columns=['Valor Inicial', 'Valor Final'])
+        .iloc[0]
+        .to_dict()
+    )
+
+def calcular_tendencias(
+    df: pl.DataFrame,
+    estratos: list[str],
+    colunas: list[str]
+) -> tuple[pd.DataFrame, pd.DataFrame | None]:
     """
-    # TODO: Implement Hamed-Rao test
-    return {"result": "Hamed-Rao placeholder"}
\ No newline at end of file
+    Regressão linear e Mann-Kendall de cada coluna de taxa de uma tabela
+    anual do SINASC (como a de `obter_taxa_sinasc(retorno="polars")`).
+
+    Cada combinação de estratos é uma série, rotulada por "a|b|..." (ou
+    "total" sem estratos). A regressão usa todas as séries; o Mann-Kendall,
+    só as que têm todos os anos.
+
+    Retorna
+    -------
+    tuple[pd.DataFrame, pd.DataFrame | None]
+        Regressão e Mann-Kendall, com a coluna 'taxa' indicando a coluna de
+        origem (None se nenhuma série estiver completa).
+    """
+    if not estratos:
+        grupo = pl.lit("total")
+    else:
+        grupo = pl.concat_str(
+            [pl.col(e).cast(pl.String) for e in estratos], separator="|", ignore_nulls=True
+        )
+    df = df.with_columns(grupo.alias("_grupo"))
+
+    regressoes, testes = [], []
+    for coluna in colunas:
+        tabela = (
+            df.pivot(on="ano", index="_grupo", values=coluna, sort_columns=True)
+            .to_pandas()
+            .set_index("_grupo")
+            .rename_axis(None)
+        )
+        regressoes.append(calcular_regressao_linear(tabela).assign(taxa=coluna))
+
+        completas = tabela.dropna()
+        if len(completas):
+            testes.append(
+                calcular_mann_kendall(completas)
+                .rename_axis("Grupo")
+                .reset_index()
+                .assign(taxa=coluna)
+            )
+
+    regressao = pd.concat(regressoes, ignore_index=True)
+    return regressao, pd.concat(testes, ignore_index=True) if testes else None
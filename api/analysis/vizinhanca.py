@@ -0,0 +1,161 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import libpysal
+from pathlib import Path
+from functools import lru_cache
+from scipy import sparse
+from .config import PASTA_VIZINHANCAS
+
+logger = logging.getLogger(__name__)
+
+# Coluna de código de cada nível de malha
+COLUNAS_CODIGO = {
+    "municipio": "code_muni",
+    "uf": "code_state",
+}
+
+
+def _carregar_malha(ano: int, nivel: str):
+    from .spatial import obter_geometria_municipios, obter_geometria_estados
+
+    if nivel == "municipio":
+        return obter_geometria_municipios(ano=ano)
+    return obter_geometria_estados(ano=ano)
+
+
+def _codigos_inteiros(codigos) -> np.ndarray:
+    # geobr traz os códigos como float (ou string, depois de padronizados)
+    return pd.to_numeric(pd.Series(codigos)).astype("int64").to_numpy()
+
+
+def _construir(malha, metodo: str, k: int):
+    if metodo == "queen":
+        w = libpysal.weights.Queen.from_dataframe(malha, use_index=False, silence_warnings=True)
+    elif metodo == "knn":
+        w = libpysal.weights.KNN.from_dataframe(malha, k=k, use_index=False)
+    else:
+        raise ValueError("metodo deve ser 'queen' ou 'knn'")
+
+    return w.sparse.tocsr()
+
+
+def caminho_vizinhanca(
+    ano: int,
+    nivel: str,
+    metodo: str,
+    k: int = 8,
+    pasta: Path = PASTA_VIZINHANCAS
+) -> Path:
+    """
+    Arquivo da vizinhança de uma malha (o k só entra na chave do KNN).
+    """
+    sufixo = f"_k{k}" if metodo == "knn" else ""
+    return Path(pasta) / f"{nivel}_{ano}_{metodo}{sufixo}.npz"
+
+
+@lru_cache(maxsize=16)
+def _ler(caminho: Path) -> tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    with np.load(caminho) as arquivo:
+        n = len(arquivo["ids"])
+        matriz = sparse.csr_matrix(
+            (np.ones(len(arquivo["indices"])), arquivo["indices"], arquivo["indptr"]),
+            shape=(n, n)
+        )
+        return matriz, arquivo["ids"], arquivo["pontos"]
+
+
+def vizinhanca_malha(
+    ano: int,
+    nivel: str = "municipio",
+    metodo: str = "queen",
+    k: int = 8,
+    pasta: Path = PASTA_VIZINHANCAS
+) -> tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Vizinhança binária de uma malha inteira, calculada uma única vez.
+
+    Na primeira chamada a malha é lida e a vizinhança é construída a partir
+    dos polígonos; o resultado é gravado em disco como uma matriz esparsa
+    CSR acompanhada da ordem dos códigos e dos centroides. As chamadas
+    seguintes só leem esse arquivo (e ficam em memória no processo).
+
+    Parâmetros
+    ----------
+    ano : int
+        Ano da malha do IBGE.
+    nivel : str, padrão "municipio"
+        "municipio" ou "uf".
+    metodo : str, padrão "queen"
+        "queen" (contiguidade) ou "knn" (k-vizinhos mais próximos).
+    k : int, padrão 8
+        Número de vizinhos do KNN.
+    pasta : Path, padrão PASTA_VIZINHANCAS
+        Pasta onde as vizinhanças são guardadas.
+
+    Retorna
+    -------
+    tuple[sparse.csr_matrix, np.ndarray, np.ndarray]
+        A matriz (n x n), os códigos na ordem das linhas e os centroides.
+    """
+    if nivel not in COLUNAS_CODIGO:
+        raise ValueError("nivel deve ser 'municipio' ou 'uf'")
+
+    caminho = caminho_vizinhanca(ano, nivel, metodo, k, pasta)
+
+    if not caminho.exists():
+        logger.info(
+            "Building %s weights for the %s %s mesh",
+            metodo, nivel, ano,
+            extra={"ano_malha": ano, "nivel": nivel, "metodo": metodo}
+        )
+        malha = _carregar_malha(ano, nivel)
+        matriz = _construir(malha, metodo, k)
+
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                indptr=matriz.indptr,
+                indices=matriz.indices,
+                ids=_codigos_inteiros(malha[COLUNAS_CODIGO[nivel]]),
+                pontos=libpysal.weights.util.get_points_array(malha.geometry)
+            )
+        os.replace(tmp, caminho)
+
+    return _ler(caminho)
+
+
+def subconjunto_vizinhanca(
+    gdf,
+    ano: int,
+    nivel: str = "municipio",
+    metodo: str = "queen",
+    k: int = 8,
+    pasta: Path = PASTA_VIZINHANCAS
+) -> libpysal.weights.W:
+    """
+    Pesos espaciais para as unidades de `gdf`, a partir da vizinhança
+    guardada da malha inteira.
+
+    Na contiguidade, a vizinhança de um subconjunto é a submatriz das linhas
+    e colunas presentes. No KNN os vizinhos dependem de quem está presente,
+    então o KNN é refeito sobre os centroides guardados (sem geometria).
+    Os ids do W seguem o índice de `gdf`, como em `criar_matriz_vizinhanca`.
+    """
+    matriz, ids, pontos = vizinhanca_malha(ano, nivel, metodo, k, pasta)
+
+    posicoes = pd.Index(ids).get_indexer(_codigos_inteiros(gdf[COLUNAS_CODIGO[nivel]]))
+    if (posicoes < 0).any():
+        raise KeyError(f"Códigos ausentes da malha {nivel} de {ano}.")
+
+    id_order = gdf.index.tolist()
+
+    if metodo == "knn":
+        if len(posicoes) == len(ids) and (posicoes == np.arange(len(ids))).all():
+            return libpysal.weights.WSP(matriz, id_order=id_order).to_W()
+        return libpysal.weights.KNN(pontos[posicoes], k=k, ids=id_order)
+
+    return libpysal.weights.WSP(matriz[posicoes][:, posicoes], id_order=id_order).to_W()
@@ -0,0 +1,436 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import itertools
+import multiprocessing
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from api.sinasc.config import PASTA_LOTES
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_CONCLUIDO = "_concluido.json"
+ARQUIVO_RELATORIO = "relatorio.json"
+
+# Opções de um trabalho e seus valores padrão ("anos" é obrigatório)
+PADRAO_TRABALHO = {
+    "cid": None,
+    "estratos": [],
+    "unidade_tempo": "ano",
+    "multiplicador": 100_000,
+    "filtros": {},
+    "tendencias": True,
+    "espacial": False,
+    "ano_malha": 2022,
+    "metodo_vizinhanca": "queen",
+    "permutacoes": 999,
+    "semente": 0,
+}
+
+# Opções que não aparecem por extenso na partição: as que diferem do padrão
+# entram juntas num hash (opcoes=...)
+OPCOES_HASH = [
+    "multiplicador", "tendencias", "espacial", "ano_malha",
+    "metodo_vizinhanca", "permutacoes", "semente",
+]
+
+
+def ler_manifesto_lote(caminho: str | Path) -> dict:
+    """
+    Lê um manifesto de lote em JSON ou YAML (.yaml/.yml, requer PyYAML).
+    """
+    caminho = Path(caminho)
+    with open(caminho, encoding="utf-8") as f:
+        if caminho.suffix.lower() not in {".yaml", ".yml"}:
+            return json.load(f)
+
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("Manifestos em YAML precisam do PyYAML (pip install pyyaml)") from e
+        return yaml.safe_load(f)
+
+
+def _anos(valor) -> list[int]:
+    # 2019, "2015-2024" ou [2015, 2016, ...]
+    if isinstance(valor, int):
+        return [valor]
+    if isinstance(valor, str):
+        inicio, _, fim = valor.partition("-")
+        return list(range(int(inicio), int(fim or inicio) + 1))
+    return sorted({int(ano) for ano in valor})
+
+
+def _rotulo(valor) -> str:
+    if valor is None or valor == [] or valor == {}:
+        return "todos"
+    if isinstance(valor, dict):
+        # Grupos nomeados de CIDs: o nome e os prefixos de cada grupo
+        grupos = []
+        for nome, prefixos in valor.items():
+            prefixos = [prefixos] if isinstance(prefixos, str) else prefixos
+            grupos.append(f"{_rotulo(nome)}_{','.join(_rotulo(p) for p in prefixos)}")
+        return "+".join(grupos)
+    if isinstance(valor, list):
+        return "+".join(_rotulo(v) for v in valor)
+    return str(valor).replace(os.sep, "_")
+
+
+def _rotulo_anos(anos: list[int]) -> str:
+    if anos == list(range(anos[0], anos[-1] + 1)):
+        return f"{anos[0]}-{anos[-1]}"
+    return "_".join(str(ano) for ano in anos)
+
+
+def _chave(trabalho: dict) -> str:
+    texto = json.dumps(trabalho, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def expandir_trabalhos(manifesto: dict) -> list[dict]:
+    """
+    Expande um manifesto de lote na lista de trabalhos a executar.
+
+    O manifesto pode trazer uma `grade` (cada opção com uma lista de
+    valores; os trabalhos são todas as combinações) e uma lista explícita
+    de `trabalhos`. Opções ausentes vêm de `padrao` e, depois, de
+    `PADRAO_TRABALHO`. Por exemplo:
+
+        {
+            "saida": "data/lotes/malformacoes",
+            "padrao": {"anos": "2015-2024", "multiplicador": 10000},
+            "grade": {"cid": ["Q0", "Q2", "Q3"], "estratos": [["REGIAO"], ["codmunres"]]},
+            "trabalhos": [{"cid": "Q", "estratos": ["codmunres"], "espacial": true}]
+        }
+
+    Cada trabalho recebe a sua `particao` na saída
+    (cid=.../estratos=.../tempo=.../anos=.../filtros=.../opcoes=...) e uma
+    `chave`, o hash da sua especificação completa. `opcoes` é "padrao" ou o
+    hash das opções de `OPCOES_HASH` que diferem de `PADRAO_TRABALHO`, de
+    modo que trabalhos com resultados diferentes nunca dividem a partição.
+
+    Retorna
+    -------
+    list[dict]
+    """
+    padrao = manifesto.get("padrao", {})
+    especificacoes = []
+
+    grade = manifesto.get("grade") or {}
+    if grade:
+        opcoes = list(grade)
+        for valores in itertools.product(*(grade[opcao] for opcao in opcoes)):
+            especificacoes.append(dict(zip(opcoes, valores)))
+    especificacoes += manifesto.get("trabalhos", [])
+
+    trabalhos = []
+    particoes = set()
+    for especificacao in especificacoes:
+        trabalho = {**PADRAO_TRABALHO, **padrao, **especificacao}
+
+        desconhecidas = set(trabalho) - set(PADRAO_TRABALHO) - {"anos"}
+        if desconhecidas:
+            raise ValueError(f"Opções desconhecidas no manifesto: {sorted(desconhecidas)}")
+        if "anos" not in trabalho:
+            raise ValueError(f"Trabalho sem 'anos': {especificacao}")
+
+        trabalho["anos"] = _anos(trabalho["anos"])
+        trabalho["estratos"] = list(trabalho["estratos"] or [])
+        if trabalho["espacial"] and (trabalho["estratos"] != ["codmunres"] or trabalho["unidade_tempo"] != "ano"):
+            raise ValueError("Trabalhos espaciais exigem estratos=['codmunres'] e unidade_tempo='ano'")
+
+        opcoes = {o: trabalho[o] for o in OPCOES_HASH if trabalho[o] != PADRAO_TRABALHO[o]}
+        particao = "/".join([
+            f"cid={_rotulo(trabalho['cid'])}",
+            f"estratos={_rotulo(trabalho['estratos']) if trabalho['estratos'] else 'total'}",
+            f"tempo={trabalho['unidade_tempo']}",
+            f"anos={_rotulo_anos(trabalho['anos'])}",
+            f"filtros={_chave(trabalho['filtros'])[:8] if trabalho['filtros'] else 'todos'}",
+            f"opcoes={_chave(opcoes)[:8] if opcoes else 'padrao'}",
+        ])
+        if particao in particoes:
+            raise ValueError(f"Dois trabalhos do manifesto gravariam em {particao}")
+        particoes.add(particao)
+
+        trabalhos.append({**trabalho, "particao": particao, "chave": _chave(trabalho)})
+
+    return trabalhos
+
+
+def _concluido(trabalho: dict, saida: Path) -> dict | None:
+    """
+    O registro de conclusão do trabalho, se a partição dele já foi gravada
+    com a mesma especificação.
+    """
+    marcador = saida / trabalho["particao"] / ARQUIVO_CONCLUIDO
+    if not marcador.exists():
+        return None
+
+    with open(marcador, encoding="utf-8") as f:
+        registro = json.load(f)
+    return registro if registro.get("chave") == trabalho["chave"] else None
+
+
+@contextmanager
+def _cronometro(etapas: dict, etapa: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas[etapa] = round(time.perf_counter() - inicio, 3)
+
+
+@contextmanager
+def _threads_por_processo(threads: int):
+    """
+    Limita os threads do polars, do numba e do BLAS nos processos criados
+    dentro do bloco (que herdam o ambiente), para que `processos` workers
+    não disputem os mesmos núcleos.
+    """
+    variaveis = ["POLARS_MAX_THREADS", "NUMBA_NUM_THREADS", "OMP_NUM_THREADS"]
+    anteriores = {v: os.environ.get(v) for v in variaveis}
+    os.environ.update({v: str(threads) for v in variaveis})
+    try:
+        yield
+    finally:
+        for variavel, valor in anteriores.items():
+            if valor is None:
+                os.environ.pop(variavel, None)
+            else:
+                os.environ[variavel] = valor
+
+
+def _preparar_armazenamento(trabalhos: list[dict]) -> None:
+    """
+    Garante, no processo principal, tudo o que os workers vão ler: os
+    Parquets de todos os anos, as malhas e as vizinhanças guardadas. Os
+    workers só leem esses arquivos e nunca disputam a sua gravação.
+    """
+    from api.sinasc.load import garantir_arquivos
+
+    anos = sorted({ano for trabalho in trabalhos for ano in trabalho["anos"]})
+    garantir_arquivos(anos, paralelo=True)
+
+    malhas = sorted({(t["ano_malha"], t["metodo_vizinhanca"]) for t in trabalhos if t["espacial"]})
+    if malhas:
+        from api.analysis.spatial import obter_geometria_municipios
+        from api.analysis.vizinhanca import vizinhanca_malha
+
+        for ano_malha, metodo in malhas:
+            obter_geometria_municipios(ano=ano_malha)
+            vizinhanca_malha(ano_malha, "municipio", metodo)
+
+
+def _executar_trabalho(trabalho: dict, saida: str) -> dict:
+    """
+    Executa um trabalho num worker e grava os resultados na sua partição.
+
+    Tudo é gravado numa pasta temporária da saída, movida para a partição
+    com `os.replace` só ao final, junto do registro de conclusão: um
+    trabalho interrompido nunca deixa uma partição pela metade.
+    """
+    from api.sinasc.taxas import obter_taxa_sinasc
+    from api.analysis.trends import calcular_tendencias
+    from api.analysis.spatial import autocorrelacao_por_ano
+
+    inicio = time.perf_counter()
+    saida = Path(saida)
+    destino = saida / trabalho["particao"]
+    tmp = saida / ".tmp" / trabalho["chave"]
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    etapas = {}
+    with _cronometro(etapas, "taxas"):
+        # O armazenamento é lido por scans do polars, que mapeiam os
+        # Parquets locais em memória: os workers compartilham as páginas
+        # do cache do sistema, sem cópias por processo
+        df = obter_taxa_sinasc(
+            anos=trabalho["anos"],
+            cid=trabalho["cid"],
+            unidade_tempo=trabalho["unidade_tempo"],
+            estratos=trabalho["estratos"],
+            multiplicador=trabalho["multiplicador"],
+            retorno="polars",
+            **trabalho["filtros"]
+        )
+        df.write_parquet(tmp / "taxas.parquet")
+
+    colunas = [c for c in df.columns if c.startswith("taxa_por_")]
+
+    if trabalho["tendencias"] and trabalho["unidade_tempo"] == "ano" and len(trabalho["anos"]) >= 3:
+        with _cronometro(etapas, "tendencias"):
+            regressao, mann_kendall = calcular_tendencias(df, trabalho["estratos"], colunas)
+            regressao.to_parquet(tmp / "regressao.parquet", index=False)
+            if mann_kendall is not None:
+                mann_kendall.to_parquet(tmp / "mann_kendall.parquet", index=False)
+
+    if trabalho["espacial"]:
+        with _cronometro(etapas, "espacial"):
+            moran, lisa = autocorrelacao_por_ano(
+                df,
+                colunas,
+                trabalho["anos"],
+                ano_malha=trabalho["ano_malha"],
+                metodo=trabalho["metodo_vizinhanca"],
+                permutacoes=trabalho["permutacoes"],
+                semente=trabalho["semente"]
+            )
+            if moran is not None:
+                moran.to_parquet(tmp / "moran.parquet", index=False)
+                lisa.to_parquet(tmp / "lisa.parquet", index=False)
+
+    registro = {
+        "chave": trabalho["chave"],
+        "particao": trabalho["particao"],
+        "trabalho": {k: v for k, v in trabalho.items() if k not in {"chave", "particao"}},
+        "linhas": df.height,
+        "etapas": etapas,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "pid": os.getpid(),
+        "concluido_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(tmp / ARQUIVO_CONCLUIDO, "w", encoding="utf-8") as f:
+        json.dump(registro, f, indent=2, default=str)
+
+    shutil.rmtree(destino, ignore_errors=True)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp, destino)
+
+    return registro
+
+
+def executar_lote(
+    manifesto: dict | str | Path,
+    saida: str | Path | None = None,
+    processos: int | None = None,
+    refazer: bool = False
+) -> dict:
+    """
+    Executa um lote de trabalhos (taxas, tendências e análise espacial do
+    SINASC) num pool de processos.
+
+    Os dados de todos os anos, as malhas e as vizinhanças são preparados
+    uma vez no processo principal; os workers só leem o armazenamento. Cada
+    trabalho grava os seus resultados numa partição da saída
+    (cid=.../estratos=.../tempo=.../anos=.../filtros=.../opcoes=...) com um
+    registro de conclusão. Numa nova execução, os trabalhos cuja partição
+    já foi concluída com a mesma especificação são pulados.
+
+    Parâmetros
+    ----------
+    manifesto : dict | str | Path
+        O manifesto (ver `expandir_trabalhos`) ou o caminho de um arquivo
+        JSON/YAML com ele.
+    saida : str | Path | None
+        Pasta dos resultados (padrão: a `saida` do manifesto ou PASTA_LOTES).
+    processos : int | None
+        Número de processos (None usa o número de CPUs). Os threads do
+        polars e do numba de cada um são limitados a CPUs // processos.
+    refazer : bool, padrão False
+        Executa de novo também os trabalhos já concluídos.
+
+    Retorna
+    -------
+    dict
+        O relatório do lote (também gravado em relatorio.json na saída),
+        com a situação ('concluido', 'pulado' ou 'falha') e os tempos por
+        etapa de cada trabalho.
+    """
+    if not isinstance(manifesto, dict):
+        manifesto = ler_manifesto_lote(manifesto)
+
+    saida = Path(saida or manifesto.get("saida") or PASTA_LOTES).absolute()
+    trabalhos = expandir_trabalhos(manifesto)
+    inicio = time.perf_counter()
+
+    registros = {}
+    pendentes = []
+    for trabalho in trabalhos:
+        registro = None if refazer else _concluido(trabalho, saida)
+        if registro is not None:
+            registros[trabalho["particao"]] = {**registro, "situacao": "pulado"}
+            logger.info(
+                "Skipping completed job %s", trabalho["particao"],
+                extra={"particao": trabalho["particao"], "chave": trabalho["chave"]}
+            )
+        else:
+            pendentes.append(trabalho)
+
+    failures = {}
+    if pendentes:
+        _preparar_armazenamento(pendentes)
+
+        processos = min(processos or os.cpu_count() or 1, len(pendentes))
+        threads = max(1, (os.cpu_count() or 1) // processos)
+
+        with _threads_por_processo(threads), ProcessPoolExecutor(
+            max_workers=processos,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = {
+                pool.submit(_executar_trabalho, trabalho, str(saida)): trabalho
+                for trabalho in pendentes
+            }
+
+            for future in as_completed(futures):
+                trabalho = futures[future]
+                try:
+                    registro = future.result()
+                except Exception as e:
+                    failures[trabalho["particao"]] = e
+                    registros[trabalho["particao"]] = {
+                        "chave": trabalho["chave"],
+                        "particao": trabalho["particao"],
+                        "situacao": "falha",
+                        "erro": repr(e),
+                    }
+                    logger.error(
+                        "Job %s failed", trabalho["particao"],
+                        extra={"particao": trabalho["particao"], "erro": repr(e)}
+                    )
+                    continue
+
+                registros[trabalho["particao"]] = {**registro, "situacao": "concluido"}
+                logger.info(
+                    "Job %s finished in %.1fs", trabalho["particao"], registro["segundos"],
+                    extra={"particao": trabalho["particao"], "etapas": registro["etapas"]}
+                )
+
+        shutil.rmtree(saida / ".tmp", ignore_errors=True)
+
+    relatorio = {
+        "saida": str(saida),
+        "processos": processos if pendentes else 0,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "trabalhos": [registros[t["particao"]] for t in trabalhos],
+    }
+    saida.mkdir(parents=True, exist_ok=True)
+    tmp = saida / f"{ARQUIVO_RELATORIO}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, default=str)
+    os.replace(tmp, saida / ARQUIVO_RELATORIO)
+
+    if failures:
+        detalhes = "; ".join(f"{particao}: {e}" for particao, e in sorted(failures.items()))
+        raise RuntimeError(f"Falha em {len(failures)} trabalho(s) do lote - {detalhes}")
+
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa um lote de trabalhos do SINASC.")
+    parser.add_argument("manifesto", help="Manifesto do lote (JSON ou YAML)")
+    parser.add_argument("--saida", default=None, help="Pasta dos resultados")
+    parser.add_argument("--processos", type=int, default=None, help="Número de processos")
+    parser.add_argument("--refazer", action="store_true", help="Refaz os trabalhos já concluídos")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    executar_lote(args.manifesto, saida=args.saida, processos=args.processos, refazer=args.refazer)
@@ -0,0 +1,492 @@
+import json
+import asyncio
+import logging
+import argparse
+import threading
+from functools import partial
+from collections import OrderedDict
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+import numba
+import polars as pl
+import pyarrow as pa
+import geopandas as gpd
+
+from api.sinasc.load import carregar
+from api.sinasc.esquema import ESQUEMA_CANONICO
+from api.sinasc.dictionaries import DE_UF_CODIGO_PARA_SIGLA
+from api.sinasc.filtros import filtrar_sinasc
+from api.sinasc.indicadores import indicador_malformacao
+from api.sinasc.aggregate import agregar
+from api.analysis.trends import calcular_tendencias
+from api.analysis.spatial import (
+    juntar_com_geometria,
+    autocorrelacao_por_ano,
+    obter_geometria_municipios,
+    obter_geometria_estados,
+)
+
+logger = logging.getLogger(__name__)
+
+TIPOS = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "geojson": "application/geo+json",
+}
+
+# Parâmetros aceitos pelas rotas de consulta, além de "anos" (obrigatório)
+PARAMETROS = {
+    "cid", "estratos", "unidade_tempo", "multiplicador", "formato",
+    "ufs", "municipios", "meses", "idade_mae",
+    "teste", "tabela", "ano_malha", "metodo", "permutacoes", "semente",
+}
+
+# Colunas do esquema canônico aceitas como estratos: o tempo entra por
+# unidade_tempo e as demais são identificadores internos
+ESTRATOS = sorted(set(ESQUEMA_CANONICO) - {"DTNASC", "ano", "mes", "id_nascimento", "BLOCOS_ANOMALIA"})
+
+
+class ParametroInvalido(ValueError):
+    """
+    Consulta que não pode ser atendida com os parâmetros recebidos
+    (respondida com 400). Qualquer outra exceção é um erro interno.
+    """
+
+
+def _lista(valor: str) -> list[str]:
+    return [parte.strip() for parte in valor.split(",") if parte.strip()]
+
+
+def _intervalo(valor: str) -> tuple[int, int] | int:
+    inicio, _, fim = valor.partition("-")
+    return (int(inicio), int(fim)) if fim else int(inicio)
+
+
+def _anos(valor: str) -> list[int]:
+    # "2015-2024", "2019,2021" ou uma combinação ("2015-2017,2020")
+    anos = set()
+    for parte in _lista(valor):
+        intervalo = _intervalo(parte)
+        inicio, fim = intervalo if isinstance(intervalo, tuple) else (intervalo, intervalo)
+        anos.update(range(inicio, fim + 1))
+    if not anos:
+        raise ParametroInvalido("anos não pode ser vazio")
+    return sorted(anos)
+
+
+def _cid(valor: str | None):
+    # "Q0", "Q0,Q2" ou grupos nomeados "snc:Q0,cardio:Q20-Q28"
+    if not valor:
+        return None
+    partes = _lista(valor)
+    if any(":" in parte for parte in partes):
+        return dict(parte.split(":", 1) for parte in partes)
+    return partes[0] if len(partes) == 1 else partes
+
+
+def ler_parametros(query_string: bytes) -> dict:
+    """
+    Converte a query string de uma consulta nos parâmetros normalizados,
+    que também servem de chave do cache de respostas: consultas
+    equivalentes ("anos=2019-2020" e "anos=2020,2019") têm a mesma chave.
+
+    Levanta `ParametroInvalido` para qualquer parâmetro ausente,
+    desconhecido ou mal formatado.
+    """
+    try:
+        brutos = {nome: valores[-1] for nome, valores in parse_qs(query_string.decode("utf-8")).items()}
+        return _normalizar(brutos)
+    except ParametroInvalido:
+        raise
+    except ValueError as e:
+        # Números mal formatados ("anos=abc", "permutacoes=1.5")
+        raise ParametroInvalido(str(e)) from e
+
+
+def _normalizar(brutos: dict[str, str]) -> dict:
+    if "anos" not in brutos:
+        raise ParametroInvalido("O parâmetro 'anos' é obrigatório")
+    desconhecidos = set(brutos) - PARAMETROS - {"anos"}
+    if desconhecidos:
+        raise ParametroInvalido(f"Parâmetros desconhecidos: {sorted(desconhecidos)}")
+
+    formato = brutos.get("formato", "json")
+    if formato not in TIPOS:
+        raise ParametroInvalido("formato deve ser 'json', 'arrow' ou 'geojson'")
+
+    unidade_tempo = brutos.get("unidade_tempo", "ano")
+    if unidade_tempo not in {"ano", "mes"}:
+        raise ParametroInvalido("unidade_tempo deve ser 'ano' ou 'mes'")
+
+    estratos = _lista(brutos.get("estratos", ""))
+    invalidos = [col for col in estratos if col not in ESTRATOS]
+    if invalidos:
+        raise ParametroInvalido(f"Estratos desconhecidos: {invalidos}; use {ESTRATOS}")
+
+    filtros = {}
+    if "ufs" in brutos:
+        filtros["ufs"] = [uf.upper() for uf in _lista(brutos["ufs"])]
+        desconhecidas = [
+            uf for uf in filtros["ufs"]
+            if uf not in DE_UF_CODIGO_PARA_SIGLA and uf not in DE_UF_CODIGO_PARA_SIGLA.values()
+        ]
+        if desconhecidas:
+            raise ParametroInvalido(f"UFs desconhecidas: {desconhecidas}")
+    if "municipios" in brutos:
+        filtros["municipios"] = [int(municipio) for municipio in _lista(brutos["municipios"])]
+    for nome in ("meses", "idade_mae"):
+        if nome in brutos:
+            filtros[nome] = _intervalo(brutos[nome])
+
+    return {
+        "anos": _anos(brutos["anos"]),
+        "cid": _cid(brutos.get("cid")),
+        "estratos": estratos,
+        "unidade_tempo": unidade_tempo,
+        "multiplicador": int(brutos.get("multiplicador", 100_000)),
+        "filtros": filtros,
+        "formato": formato,
+        "teste": brutos.get("teste", "regressao"),
+        "tabela": brutos.get("tabela", "lisa" if formato == "geojson" else "moran"),
+        "ano_malha": int(brutos.get("ano_malha", 2022)),
+        "metodo": brutos.get("metodo", "queen"),
+        "permutacoes": int(brutos.get("permutacoes", 999)),
+        "semente": int(brutos.get("semente", 0)),
+    }
+
+
+def _corpo(tabela, formato: str) -> bytes:
+    """
+    Serializa uma tabela polars ou pandas (ou um GeoDataFrame, em GeoJSON).
+    """
+    if formato == "geojson":
+        return tabela.to_json(na="null").encode("utf-8")
+
+    if formato == "arrow":
+        if isinstance(tabela, pl.DataFrame):
+            tabela = tabela.to_arrow()
+        else:
+            tabela = pa.Table.from_pandas(tabela, preserve_index=False)
+        saida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(saida, tabela.schema) as writer:
+            writer.write_table(tabela)
+        return saida.getvalue().to_pybytes()
+
+    if isinstance(tabela, pl.DataFrame):
+        return tabela.write_json().encode("utf-8")
+    return tabela.to_json(orient="records", force_ascii=False).encode("utf-8")
+
+
+class ServicoSinasc:
+    """
+    Serviço ASGI de consultas ao SINASC: taxas, tendências e estatísticas
+    espaciais para (anos, cid, estratos), em JSON, Arrow (IPC stream) ou
+    GeoJSON.
+
+    Os dados de cada ano são lidos uma única vez (`carregar`) e mantidos em
+    memória, assim como as malhas; as agregações e as análises rodam num
+    pool de threads, fora do event loop (o polars e os kernels numba
+    liberam o GIL), sobre esses dados compartilhados. As respostas ficam
+    num cache LRU e consultas idênticas simultâneas esperam o mesmo
+    cálculo, feito uma só vez.
+
+    Rotas (GET): /taxas, /tendencias, /espacial e /saude. Os parâmetros vão
+    na query string, por exemplo
+    /taxas?anos=2015-2024&cid=Q0,Q2&estratos=codmunres&formato=geojson.
+
+    Parâmetros
+    ----------
+    anos : list[int] | None
+        Anos carregados já na inicialização (os demais, na primeira
+        consulta que os pedir).
+    em_memoria : bool, padrão True
+        Mantém os registros de cada ano em memória. Se False, só os
+        LazyFrames dos scans são mantidos e cada consulta lê os Parquets
+        (mapeados em memória pelo polars).
+    max_workers : int | None
+        Threads do pool de cálculo (None usa o padrão do
+        ThreadPoolExecutor).
+    max_respostas : int, padrão 256
+        Número máximo de respostas no cache.
+    """
+
+    def __init__(
+        self,
+        anos: list[int] | None = None,
+        em_memoria: bool = True,
+        max_workers: int | None = None,
+        max_respostas: int = 256
+    ):
+        self.anos_iniciais = list(anos or [])
+        self.em_memoria = em_memoria
+        self.max_workers = max_workers
+        self.max_respostas = max_respostas
+
+        self._frames: dict[int, pl.LazyFrame] = {}
+        self._malhas: dict[tuple[int, str], gpd.GeoDataFrame] = {}
+        # A trava geral só protege os dicionários; a leitura de cada ano
+        # (e de cada malha) tem a sua, para não bloquear os demais
+        self._trava = threading.Lock()
+        self._travas: dict[tuple, threading.Lock] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+        self._respostas: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._em_andamento: dict[str, asyncio.Future] = {}
+        self.acertos = 0
+        self.calculos = 0
+        self.deduplicadas = 0
+
+        # Os threads do numba têm de nascer no thread principal: iniciados
+        # por um worker do pool, o TBB trava o encerramento do processo
+        numba.get_num_threads()
+
+    # --- Dados em memória ---
+
+    def _trava_de(self, chave: tuple) -> threading.Lock:
+        with self._trava:
+            return self._travas.setdefault(chave, threading.Lock())
+
+    def _dados(self, anos: list[int]) -> pl.LazyFrame:
+        """
+        Os registros dos anos pedidos, carregando (uma vez) os que faltarem.
+        Anos diferentes carregam em paralelo; consultas ao mesmo ano
+        esperam a primeira leitura.
+        """
+        for ano in anos:
+            if ano in self._frames:
+                continue
+            with self._trava_de(("ano", ano)):
+                if ano in self._frames:
+                    continue
+                lf = carregar([ano])
+                lf = lf.collect().lazy() if self.em_memoria else lf
+                with self._trava:
+                    self._frames[ano] = lf
+                logger.info("Year loaded into the service", extra={"ano": ano, "em_memoria": self.em_memoria})
+
+        with self._trava:
+            frames = [self._frames[ano] for ano in anos]
+        return pl.concat(frames, how="diagonal_relaxed")
+
+    def _malha(self, ano: int, nivel: str) -> gpd.GeoDataFrame:
+        chave = (ano, nivel)
+        if chave not in self._malhas:
+            with self._trava_de(("malha", *chave)):
+                if chave not in self._malhas:
+                    ler = obter_geometria_municipios if nivel == "municipio" else obter_geometria_estados
+                    malha = ler(ano=ano)
+                    with self._trava:
+                        self._malhas[chave] = malha
+        return self._malhas[chave]
+
+    def aquecer(self) -> None:
+        """
+        Carrega os anos iniciais e a malha municipal padrão.
+        """
+        if self.anos_iniciais:
+            self._dados(self.anos_iniciais)
+        self._malha(2022, "municipio")
+
+    # --- Consultas (rodam no pool) ---
+
+    def _taxas(self, p: dict) -> pl.DataFrame:
+        # O mesmo pipeline de `obter_taxa_sinasc`, sobre os dados em memória
+        group_cols = [p["unidade_tempo"]] + p["estratos"]
+        return (
+            filtrar_sinasc(self._dados(p["anos"]), p["anos"], **p["filtros"])
+            .pipe(indicador_malformacao, p["cid"], p["anos"])
+            .pipe(agregar, group_cols=group_cols, multiplicador=p["multiplicador"])
+            .sort(group_cols)
+            .collect()
+        )
+
+    def consultar_taxas(self, p: dict) -> bytes:
+        df = self._taxas(p)
+        if p["formato"] != "geojson":
+            return _corpo(df, p["formato"])
+
+        coluna = next((c for c in ("codmunres", "codufres") if c in p["estratos"]), None)
+        if coluna is None:
+            raise ParametroInvalido("GeoJSON exige 'codmunres' ou 'codufres' nos estratos")
+        nivel = "municipio" if coluna == "codmunres" else "uf"
+        malha = self._malha(p["ano_malha"], nivel)
+        return _corpo(juntar_com_geometria(df, coluna, p["ano_malha"], malha=malha), "geojson")
+
+    def consultar_tendencias(self, p: dict) -> bytes:
+        if p["unidade_tempo"] != "ano":
+            raise ParametroInvalido("Tendências exigem unidade_tempo='ano'")
+        if p["teste"] not in {"regressao", "mann_kendall"}:
+            raise ParametroInvalido("teste deve ser 'regressao' ou 'mann_kendall'")
+        if p["formato"] == "geojson":
+            raise ParametroInvalido("Tendências são devolvidas em JSON ou Arrow")
+
+        df = self._taxas(p)
+        colunas = [c for c in df.columns if c.startswith("taxa_por_")]
+        regressao, mann_kendall = calcular_tendencias(df, p["estratos"], colunas)
+        tabela = regressao if p["teste"] == "regressao" else mann_kendall
+        if tabela is None:
+            raise ParametroInvalido("Nenhuma série completa para o Mann-Kendall")
+        return _corpo(tabela, p["formato"])
+
+    def consultar_espacial(self, p: dict) -> bytes:
+        if p["estratos"] not in ([], ["codmunres"]) or p["unidade_tempo"] != "ano":
+            raise ParametroInvalido("A análise espacial é municipal e anual (estratos=codmunres)")
+        if p["tabela"] not in {"moran", "lisa"}:
+            raise ParametroInvalido("tabela deve ser 'moran' ou 'lisa'")
+        if p["metodo"] not in {"queen", "knn"}:
+            raise ParametroInvalido("metodo deve ser 'queen' ou 'knn'")
+        if p["formato"] == "geojson" and p["tabela"] != "lisa":
+            raise ParametroInvalido("GeoJSON só está disponível para tabela='lisa'")
+
+        p = {**p, "estratos": ["codmunres"]}
+        df = self._taxas(p)
+        colunas = [c for c in df.columns if c.startswith("taxa_por_")]
+        malha = self._malha(p["ano_malha"], "municipio")
+        moran, lisa = autocorrelacao_por_ano(
+            df,
+            colunas,
+            p["anos"],
+            ano_malha=p["ano_malha"],
+            metodo=p["metodo"],
+            permutacoes=p["permutacoes"],
+            semente=p["semente"],
+            malha=malha
+        )
+        if moran is None:
+            raise ParametroInvalido("Nenhum ano com municípios suficientes para a análise espacial")
+
+        if p["formato"] != "geojson":
+            return _corpo(moran if p["tabela"] == "moran" else lisa, p["formato"])
+
+        gdf = malha[["code_muni", malha.geometry.name]].merge(lisa, on="code_muni")
+        return _corpo(gdf, "geojson")
+
+    # --- Cache e deduplicação ---
+
+    def _guardar(self, chave: str, futuro: asyncio.Future) -> None:
+        self._em_andamento.pop(chave, None)
+        if futuro.cancelled() or futuro.exception() is not None:
+            return
+
+        self._respostas[chave] = futuro.result()
+        while len(self._respostas) > self.max_respostas:
+            self._respostas.popitem(last=False)
+
+    async def _resposta(self, chave: str, calcular) -> tuple[str, bytes]:
+        if chave in self._respostas:
+            self._respostas.move_to_end(chave)
+            self.acertos += 1
+            return self._respostas[chave]
+
+        futuro = self._em_andamento.get(chave)
+        if futuro is None:
+            self.calculos += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+            futuro = asyncio.get_running_loop().run_in_executor(self._executor, calcular)
+            futuro.add_done_callback(partial(self._guardar, chave))
+            self._em_andamento[chave] = futuro
+        else:
+            self.deduplicadas += 1
+
+        # Quem desistir da resposta não cancela o cálculo dos demais
+        return await asyncio.shield(futuro)
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            anos = sorted(self._frames)
+        return {
+            "anos_carregados": anos,
+            "em_memoria": self.em_memoria,
+            "respostas_em_cache": len(self._respostas),
+            "em_andamento": len(self._em_andamento),
+            "acertos": self.acertos,
+            "calculos": self.calculos,
+            "deduplicadas": self.deduplicadas,
+        }
+
+    # --- ASGI ---
+
+    async def _responder(self, scope: dict) -> tuple[int, str, bytes]:
+        if scope["method"] not in {"GET", "HEAD"}:
+            return 405, TIPOS["json"], b'{"erro": "metodo nao permitido"}'
+
+        if scope["path"] == "/saude":
+            return 200, TIPOS["json"], json.dumps(self.estatisticas()).encode("utf-8")
+
+        consulta = {
+            "/taxas": self.consultar_taxas,
+            "/tendencias": self.consultar_tendencias,
+            "/espacial": self.consultar_espacial,
+        }.get(scope["path"])
+        if consulta is None:
+            return 404, TIPOS["json"], b'{"erro": "rota desconhecida"}'
+
+        try:
+            p = ler_parametros(scope.get("query_string", b""))
+            chave = json.dumps([scope["path"], p], sort_keys=True)
+            tipo, corpo = await self._resposta(chave, lambda: (TIPOS[p["formato"]], consulta(p)))
+        except ParametroInvalido as e:
+            return 400, TIPOS["json"], json.dumps({"erro": str(e)}).encode("utf-8")
+        except Exception:
+            # O detalhe (plano do polars, caminhos) fica só no log
+            logger.exception("Query failed", extra={"rota": scope["path"]})
+            return 500, TIPOS["json"], b'{"erro": "erro interno"}'
+
+        return 200, tipo, corpo
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                try:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(self.max_workers)
+                    await asyncio.get_running_loop().run_in_executor(self._executor, self.aquecer)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": repr(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise NotImplementedError(f"Escopo ASGI não suportado: {scope['type']}")
+
+        status, tipo, corpo = await self._responder(scope)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", tipo.encode("latin1")),
+                (b"content-length", str(len(corpo)).encode("latin1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else corpo})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serviço de consultas ao SINASC.")
+    parser.add_argument("--anos", default=None, help="Anos carregados na inicialização (ex.: 2015-2024)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--sem-memoria", action="store_true", help="Lê os Parquets a cada consulta")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    servico = ServicoSinasc(
+        anos=_anos(args.anos) if args.anos else None,
+        em_memoria=not args.sem_memoria
+    )
+    uvicorn.run(servico, host=args.host, port=args.porta)
@@ -1 +1,4 @@
-from .taxas import obter_taxa_sinasc
\ No newline at end of file
+from .taxas import obter_taxa_sinasc
+from .painel import obter_painel_municipal, PainelMunicipal
+from .cache import CacheResultados, cache_padrao
+from .perfil import Perfil
@@ -1,5 +1,20 @@
 import polars as pl
 
+def _colunas_casos(df: pl.LazyFrame) -> list[str]:
+    return [
+        col for col in df.collect_schema().names()
+        if col == "casos" or col.startswith("casos_")
+    ]
+
+
+def _com_taxas(df: pl.LazyFrame, casos: list[str], multiplicador: int) -> pl.LazyFrame:
+    return df.with_columns([
+        (pl.col(col) / pl.col("n_nascidos_vivos") * multiplicador)
+        .alias(f"taxa_por_{multiplicador}{col[len('casos'):]}")
+        for col in casos
+    ])
+
+
 def agregar(
     df: pl.LazyFrame,
     group_cols: list[str],
@@ -9,6 +24,9 @@ def agregar(
     Agrega os dados do SINASC para calcular nascidos vivos, casos e taxas
     por colunas de agrupamento especificadas.
 
+    Cada coluna de casos ('casos' ou 'casos_{nome}', criadas por
+    `indicador_malformacao`) gera sua própria taxa, todas no mesmo group-by.
+
     Parâmetros
     ----------
     df : pl.LazyFrame
@@ -22,18 +40,55 @@ def agregar(
     -------
     pl.LazyFrame
         Um LazyFrame do Polars com dados agregados, incluindo 'n_nascidos_vivos',
-        'casos' e 'taxa_por_100000'.
+        'casos' e 'taxa_por_100000' (ou 'casos_{nome}' e
+        'taxa_por_100000_{nome}' para cada grupo de CID).
     """
+    casos = _colunas_casos(df)
+
     return (
         df
         .group_by(group_cols)
         .agg([
             pl.len().alias("n_nascidos_vivos"),
-            pl.col("casos").sum().alias("casos"),
+            *[pl.col(col).sum().alias(col) for col in casos],
+        ])
+        .pipe(_com_taxas, casos, multiplicador)
+        .sort(group_cols)
+    )
+
+
+def combinar_parciais(
+    df: pl.LazyFrame,
+    group_cols: list[str],
+    multiplicador: int = 100_000
+) -> pl.LazyFrame:
+    """
+    Soma agregados parciais (ex: um por ano) e recalcula as taxas.
+
+    Parâmetros
+    ----------
+    df : pl.LazyFrame
+        Agregados com 'n_nascidos_vivos' e as colunas de casos, num grão
+        igual ou mais fino que `group_cols`.
+    group_cols : list[str]
+        Colunas do resultado final.
+    multiplicador : int, padrão 100.000
+        A constante pela qual multiplicar a taxa.
+
+    Retorna
+    -------
+    pl.LazyFrame
+        O mesmo formato de `agregar`.
+    """
+    casos = _colunas_casos(df)
+
+    return (
+        df
+        .group_by(group_cols)
+        .agg([
+            pl.col("n_nascidos_vivos").sum().cast(pl.UInt32),
+            *[pl.col(col).sum() for col in casos],
         ])
-        .with_columns(
-            (pl.col("casos") / pl.col("n_nascidos_vivos") * multiplicador)
-            .alias(f"taxa_por_{multiplicador}")
-        )
+        .pipe(_com_taxas, casos, multiplicador)
         .sort(group_cols)
     )
\ No newline at end of file
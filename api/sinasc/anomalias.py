@@ -0,0 +1,96 @@
+import re
+import polars as pl
+from .dictionaries import BLOCOS_CAPITULO_Q
+
+# CODANOMAL concatena códigos CID-10 sem separador (ex: "Q699Q381", "Q05Q909")
+PADRAO_CID = r"[A-Z][0-9]{2}[0-9X]?"
+_PADRAO_INTERVALO = re.compile(r"^([A-Z])([0-9]{2})-\1([0-9]{2})$")
+
+# Bit de BLOCOS_ANOMALIA para códigos do capítulo Q fora dos blocos
+BIT_FORA_DOS_BLOCOS = 1 << len(BLOCOS_CAPITULO_Q)
+
+
+def expandir_prefixo(prefixo: str) -> list[str]:
+    """
+    Expande um intervalo de categorias ("Q20-Q28") nos seus prefixos de
+    três caracteres; outros prefixos são devolvidos como estão.
+    """
+    intervalo = _PADRAO_INTERVALO.match(prefixo)
+    if intervalo is None:
+        return [prefixo]
+
+    letra, inicio, fim = intervalo.group(1), int(intervalo.group(2)), int(intervalo.group(3))
+    return [f"{letra}{n:02d}" for n in range(inicio, fim + 1)]
+
+
+def codigos_anomalia() -> pl.Expr:
+    """
+    Lista dos códigos CID-10 contidos em CODANOMAL.
+    """
+    return pl.col("CODANOMAL").fill_null("").str.extract_all(PADRAO_CID)
+
+
+def blocos_anomalia() -> pl.Expr:
+    """
+    Bitset (UInt16) dos agrupamentos do capítulo Q presentes no registro: o
+    bit i indica um código no i-ésimo bloco de BLOCOS_CAPITULO_Q, e o bit
+    seguinte (`BIT_FORA_DOS_BLOCOS`) um código Q fora de todos eles (Q08,
+    Q19, Q46...), para que o capítulo inteiro seja um teste de bits.
+    """
+    categorias = codigos_anomalia().list.eval(
+        pl.when(pl.element().str.starts_with("Q"))
+        .then(pl.element().str.slice(1, 2).cast(pl.Int8, strict=False))
+    )
+
+    bits = pl.lit(0, dtype=pl.UInt16)
+    em_algum_bloco = pl.lit(False)
+    for i, (inicio, fim) in enumerate(BLOCOS_CAPITULO_Q.values()):
+        no_bloco = categorias.list.eval(pl.element().is_between(inicio, fim)).list.any()
+        bits = bits | (no_bloco.cast(pl.UInt16) * (1 << i)).cast(pl.UInt16)
+        em_algum_bloco = em_algum_bloco | pl.element().is_between(inicio, fim)
+
+    fora = categorias.list.eval(pl.element().is_not_null() & ~em_algum_bloco).list.any()
+    bits = bits | (fora.cast(pl.UInt16) * BIT_FORA_DOS_BLOCOS).cast(pl.UInt16)
+
+    return (
+        pl.when(pl.col("IDANOMAL") == "1")
+        .then(bits)
+        .otherwise(pl.lit(0, dtype=pl.UInt16))
+        .alias("BLOCOS_ANOMALIA")
+    )
+
+
+def indexar_anomalias(df: pl.DataFrame, year: int) -> pl.DataFrame:
+    """
+    Tabela auxiliar (ano, id_nascimento, cid) com uma linha por código de
+    anomalia, restrita aos nascidos com IDANOMAL == "1".
+    """
+    return (
+        df
+        .filter(pl.col("IDANOMAL") == "1")
+        .select(
+            pl.lit(year, dtype=pl.Int16).alias("ano"),
+            pl.col("id_nascimento"),
+            codigos_anomalia().alias("cid"),
+        )
+        .explode("cid")
+        .drop_nulls("cid")
+    )
+
+
+def tem_anomalia(prefixos: list[str]) -> pl.Expr:
+    """
+    Indicador (Int8) de algum código de CODANOMAL começar por um dos
+    prefixos, em qualquer posição da string.
+
+    Uma letra em CODANOMAL só aparece no início de um código (ou como 'X'
+    de preenchimento), então o prefixo é ancorado no início da string ou
+    logo após um dígito/'X'.
+    """
+    padrao = "|".join(p for prefixo in prefixos for p in expandir_prefixo(prefixo))
+    return (
+        (pl.col("IDANOMAL") == "1") &
+        pl.col("CODANOMAL")
+        .fill_null("")
+        .str.contains(f"(?:^|[0-9X])(?:{padrao})")
+    ).cast(pl.Int8)
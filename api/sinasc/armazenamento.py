@@ -0,0 +1,257 @@
+import os
+import json
+import shutil
+import polars as pl
+import pyarrow.parquet as pq
+from pathlib import Path
+from .config import (
+    PASTA_CANONICA,
+    ARQUIVO_MANIFESTO,
+    ORDENACAO_PARQUET,
+    LINHAS_POR_GRUPO,
+    COLUNAS_DICIONARIO,
+    COMPRESSAO_PARQUET,
+    NIVEL_COMPRESSAO,
+)
+from .esquema import ESQUEMA_CANONICO, aplicar_esquema_canonico
+from .anomalias import blocos_anomalia, indexar_anomalias
+
+# Tipos das colunas de partição lidas do caminho (ano=2020/codufres=35)
+ESQUEMA_PARTICOES = {c: ESQUEMA_CANONICO[c] for c in ("ano", "codufres")}
+
+# Incrementada a cada mudança no conteúdo gravado por ano; anos gravados com
+# uma versão anterior são regravados na próxima consulta que os usar.
+VERSAO_ARMAZENAMENTO = 3
+
+
+def ler_manifesto() -> dict | None:
+    """
+    Lê o manifesto do armazenamento particionado (None se ainda não existir).
+    """
+    caminho = PASTA_CANONICA / ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return None
+
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_manifesto(manifesto: dict) -> None:
+    caminho = PASTA_CANONICA / ARQUIVO_MANIFESTO
+    tmp = caminho.with_name(f"{caminho.name}.tmp")
+
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, sort_keys=True)
+
+    os.replace(tmp, caminho)
+
+
+def _gravar_ordenado(df: pl.DataFrame, arquivo: Path) -> None:
+    """
+    Grava `df` ordenado por ORDENACAO_PARQUET em row groups de
+    LINHAS_POR_GRUPO linhas, com dicionário nas colunas de códigos.
+
+    Com os dados ordenados, cada row group cobre uma faixa estreita de
+    municípios (e, dentro deles, de datas), e as estatísticas min/max
+    gravadas permitem ao scan pular os grupos fora de um filtro.
+    """
+    tabela = df.sort(ORDENACAO_PARQUET).to_arrow()
+    pq.write_table(
+        tabela,
+        arquivo,
+        row_group_size=LINHAS_POR_GRUPO,
+        use_dictionary=[c for c in COLUNAS_DICIONARIO if c in df.columns],
+        compression=COMPRESSAO_PARQUET,
+        compression_level=NIVEL_COMPRESSAO,
+        write_statistics=True
+    )
+
+
+def _gravar_ano(df: pl.DataFrame, destino: Path, por_uf: bool, ordenado: bool) -> list[dict]:
+    """
+    Grava as partições de um ano em `destino` e devolve a lista de arquivos.
+    """
+    if por_uf:
+        grupos = df.partition_by("codufres", as_dict=True, include_key=False)
+    else:
+        grupos = {(None,): df}
+
+    arquivos = []
+    for (uf,), parte in grupos.items():
+        pasta = destino
+        if por_uf:
+            valor = uf if uf is not None else "__HIVE_DEFAULT_PARTITION__"
+            pasta = destino / f"codufres={valor}"
+
+        pasta.mkdir(parents=True, exist_ok=True)
+        arquivo = pasta / "part-0.parquet"
+        if ordenado:
+            _gravar_ordenado(parte, arquivo)
+        else:
+            parte.write_parquet(arquivo)
+
+        arquivos.append({
+            "caminho": arquivo.relative_to(destino).as_posix(),
+            "linhas": parte.height,
+            "bytes": arquivo.stat().st_size,
+        })
+
+    return arquivos
+
+
+def particionar(years: list[int], por_uf: bool = False, ordenado: bool | None = None) -> dict:
+    """
+    Regrava os Parquets anuais (DNBR{ano}.parquet) no armazenamento
+    particionado em `PASTA_CANONICA`, no layout hive
+    `ano=YYYY/[codufres=NN/]part-0.parquet`, e atualiza o manifesto.
+
+    Os arquivos são gravados já no esquema canônico (ver
+    `aplicar_esquema_canonico`), de modo que as consultas não precisam mais
+    converter datas, códigos e faixas etárias. Cada nascimento recebe um
+    `id_nascimento` e o bitset `BLOCOS_ANOMALIA`, e os códigos de CODANOMAL
+    vão para a tabela auxiliar `ano=YYYY/anomalias.parquet` (ver
+    `indexar_anomalias`).
+
+    Parâmetros
+    ----------
+    years : list[int]
+        Anos a particionar.
+    por_uf : bool, padrão False
+        Se True, particiona também pela UF de residência (codufres).
+    ordenado : bool | None
+        Se True, grava cada arquivo ordenado por (CODMUNRES, DTNASC), em row
+        groups menores e com dicionário e compressão ajustados (ver
+        `_gravar_ordenado`), para que consultas filtradas por município ou
+        mês leiam poucos row groups. None mantém o layout já registrado no
+        manifesto (False num armazenamento novo).
+
+    Retorna
+    -------
+    dict
+        O manifesto atualizado.
+    """
+    from .load import _garantir_sinasc_parquet
+
+    manifesto = ler_manifesto() or {
+        "particoes": ["ano", "codufres"] if por_uf else ["ano"],
+        "anos": {},
+    }
+
+    # Os anos que entrarem depois (ver `garantir_arquivos`) seguem o layout
+    if ordenado is None:
+        ordenado = manifesto.get("ordenado", False)
+    manifesto["ordenado"] = ordenado
+
+    if ("codufres" in manifesto["particoes"]) != por_uf:
+        raise ValueError(
+            f"O armazenamento em '{PASTA_CANONICA}' já está particionado por "
+            f"{manifesto['particoes']}; remova-o para mudar o layout."
+        )
+
+    for year in years:
+        fonte = _garantir_sinasc_parquet(year)
+
+        # O ano vem do caminho da partição
+        df = (
+            pl.scan_parquet(fonte)
+            .pipe(aplicar_esquema_canonico)
+            .drop("ano", "birth_date")
+            .with_row_index("id_nascimento")
+            .with_columns(blocos_anomalia())
+            .collect()
+        )
+
+        destino = PASTA_CANONICA / f"ano={year}"
+        tmp = PASTA_CANONICA / ".tmp" / f"ano={year}"
+        antigo = PASTA_CANONICA / ".tmp" / f"ano={year}.antigo"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(antigo, ignore_errors=True)
+
+        arquivos = _gravar_ano(df, tmp, por_uf, ordenado)
+        indexar_anomalias(df, year).write_parquet(tmp / "anomalias.parquet")
+
+        # Troca a pasta do ano só depois de todas as partições gravadas
+        if destino.exists():
+            os.replace(destino, antigo)
+        os.replace(tmp, destino)
+        shutil.rmtree(antigo, ignore_errors=True)
+
+        stat = fonte.stat()
+        manifesto["anos"][str(year)] = {
+            "versao": VERSAO_ARMAZENAMENTO,
+            "fonte": fonte.name,
+            "fonte_bytes": stat.st_size,
+            "fonte_mtime": stat.st_mtime,
+            "linhas": df.height,
+            "ordenado": ordenado,
+            "arquivos": [
+                {**a, "caminho": f"ano={year}/{a['caminho']}"}
+                for a in arquivos
+            ],
+            "indice_anomalias": f"ano={year}/anomalias.parquet",
+        }
+        _gravar_manifesto(manifesto)
+
+    return manifesto
+
+
+def anos_pendentes(manifesto: dict, years: list[int]) -> list[int]:
+    """
+    Anos ausentes do armazenamento ou gravados numa versão anterior.
+    """
+    return [
+        y for y in years
+        if manifesto["anos"].get(str(y), {}).get("versao") != VERSAO_ARMAZENAMENTO
+    ]
+
+
+def arquivos_indice_anomalias(years: list[int]) -> list[Path] | None:
+    """
+    Tabelas auxiliares de anomalias dos anos pedidos (None se algum deles
+    não estiver no armazenamento ou tiver sido gravado numa versão anterior,
+    cujo BLOCOS_ANOMALIA pode não ter todos os bits).
+    """
+    manifesto = ler_manifesto()
+    if manifesto is None:
+        return None
+
+    anos = [manifesto["anos"].get(str(year), {}) for year in dict.fromkeys(years)]
+    if not all(
+        "indice_anomalias" in ano and ano.get("versao") == VERSAO_ARMAZENAMENTO
+        for ano in anos
+    ):
+        return None
+
+    return [PASTA_CANONICA / ano["indice_anomalias"] for ano in anos]
+
+
+def arquivos_particionados(years: list[int]) -> list[Path]:
+    """
+    Arquivos do armazenamento particionado que pertencem aos anos pedidos.
+    """
+    manifesto = ler_manifesto()
+    return [
+        PASTA_CANONICA / a["caminho"]
+        for year in years
+        for a in manifesto["anos"][str(year)]["arquivos"]
+    ]
+
+
+def escanear_particionado(years: list[int]) -> pl.LazyFrame:
+    """
+    Escaneia o armazenamento particionado com partições hive, filtrando
+    pelos anos pedidos para que o polars descarte as demais partições.
+
+    Só entram no scan os arquivos dos anos pedidos registrados no manifesto,
+    de modo que uma gravação em andamento em `.tmp/` nunca é lida e anos de
+    versões anteriores do armazenamento não se misturam ao esquema.
+    """
+    manifesto = ler_manifesto()
+    esquema = {c: ESQUEMA_PARTICOES[c] for c in manifesto["particoes"]}
+
+    return pl.scan_parquet(
+        arquivos_particionados(years),
+        hive_partitioning=True,
+        hive_schema=esquema,
+        extra_columns="ignore"
+    ).filter(pl.col("ano").is_in(years))
@@ -0,0 +1,200 @@
+import os
+import json
+import fcntl
+import hashlib
+import polars as pl
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from .config import PASTA_CACHE, LIMITE_CACHE_BYTES
+
+
+def impressao_digital(arquivo: Path) -> str:
+    """
+    Identifica a versão de um arquivo de origem pelo tamanho e mtime.
+    """
+    stat = Path(arquivo).stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+class CacheResultados:
+    """
+    Cache em disco de resultados agregados, gravados como Parquet.
+
+    A chave combina os parâmetros da consulta com a impressão digital de cada
+    arquivo de origem lido. Quando um ano é republicado, apenas as entradas
+    que leram aquele arquivo deixam de ser encontradas (e são removidas na
+    próxima gravação). O tamanho total é limitado a `limite_bytes`, com
+    descarte das entradas usadas há mais tempo (LRU).
+
+    Vários processos podem usar a mesma pasta: leituras e gravações do
+    índice são feitas sob um `flock` no arquivo `indice.lock` (compartilhado
+    para ler, exclusivo para alterar). Um acerto não regrava o índice; o
+    último acesso de cada entrada é o mtime do seu Parquet.
+
+    Parâmetros
+    ----------
+    pasta : Path, padrão PASTA_CACHE
+        Pasta onde ficam os Parquets e o índice do cache.
+    limite_bytes : int, padrão LIMITE_CACHE_BYTES
+        Tamanho máximo somado dos arquivos do cache.
+    """
+
+    ARQUIVO_INDICE = "indice.json"
+    ARQUIVO_TRAVA = "indice.lock"
+
+    def __init__(self, pasta: Path = PASTA_CACHE, limite_bytes: int = LIMITE_CACHE_BYTES):
+        self.pasta = Path(pasta)
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.falhas = 0
+        self.pasta.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _travado(self, exclusivo: bool):
+        with open(self.pasta / self.ARQUIVO_TRAVA, "a") as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _ultimo_acesso(self, entrada: dict) -> float:
+        try:
+            return (self.pasta / entrada["arquivo"]).stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def _ler_indice(self) -> dict:
+        caminho = self.pasta / self.ARQUIVO_INDICE
+        if not caminho.exists():
+            return {}
+
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _gravar_indice(self, indice: dict) -> None:
+        caminho = self.pasta / self.ARQUIVO_INDICE
+        tmp = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(indice, f, indent=2, sort_keys=True)
+
+        os.replace(tmp, caminho)
+
+    def _remover(self, indice: dict, chave: str) -> None:
+        entrada = indice.pop(chave)
+        (self.pasta / entrada["arquivo"]).unlink(missing_ok=True)
+
+    @staticmethod
+    def chave(parametros: dict, fontes: dict[str, str]) -> str:
+        """
+        Calcula a chave de uma consulta a partir dos parâmetros e das
+        impressões digitais dos arquivos de origem.
+        """
+        conteudo = json.dumps(
+            {"parametros": parametros, "fontes": fontes},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    def obter(self, chave: str) -> pl.DataFrame | None:
+        """
+        Devolve o resultado guardado para `chave` (None se não houver).
+        """
+        with self._travado(exclusivo=False):
+            entrada = self._ler_indice().get(chave)
+            arquivo = None if entrada is None else self.pasta / entrada["arquivo"]
+
+            if arquivo is None or not arquivo.exists():
+                self.falhas += 1
+                return None
+
+            df = pl.read_parquet(arquivo)
+            os.utime(arquivo)
+
+        self.acertos += 1
+        return df
+
+    def guardar(self, chave: str, df: pl.DataFrame, fontes: dict[str, str]) -> None:
+        """
+        Grava o resultado de uma consulta, invalida as entradas que leram
+        versões antigas dos mesmos arquivos e aplica o limite de tamanho.
+        """
+        arquivo = f"{chave}.parquet"
+        tmp = self.pasta / f"{arquivo}.{os.getpid()}.tmp"
+        df.write_parquet(tmp)
+
+        with self._travado(exclusivo=True):
+            os.replace(tmp, self.pasta / arquivo)
+            self._atualizar_indice(chave, arquivo, fontes)
+
+    def _atualizar_indice(self, chave: str, arquivo: str, fontes: dict[str, str]) -> None:
+        indice = self._ler_indice()
+
+        desatualizadas = [
+            c for c, entrada in indice.items()
+            if any(
+                caminho in fontes and fontes[caminho] != impressao
+                for caminho, impressao in entrada["fontes"].items()
+            )
+        ]
+        for c in desatualizadas:
+            self._remover(indice, c)
+
+        indice[chave] = {
+            "arquivo": arquivo,
+            "bytes": (self.pasta / arquivo).stat().st_size,
+            "fontes": fontes,
+        }
+
+        total = sum(entrada["bytes"] for entrada in indice.values())
+        for c in sorted(indice, key=lambda c: self._ultimo_acesso(indice[c])):
+            if total <= self.limite_bytes:
+                break
+            total -= indice[c]["bytes"]
+            self._remover(indice, c)
+
+        self._gravar_indice(indice)
+
+    def limpar(self) -> None:
+        """
+        Remove todas as entradas do cache.
+        """
+        with self._travado(exclusivo=True):
+            indice = self._ler_indice()
+            for c in list(indice):
+                self._remover(indice, c)
+            self._gravar_indice(indice)
+
+    def estatisticas(self) -> dict:
+        """
+        Acertos e falhas desta instância, com o número de entradas e o
+        tamanho atual do cache.
+        """
+        with self._travado(exclusivo=False):
+            indice = self._ler_indice()
+        consultas = self.acertos + self.falhas
+
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / consultas if consultas else None,
+            "entradas": len(indice),
+            "bytes": sum(entrada["bytes"] for entrada in indice.values()),
+        }
+
+
+@lru_cache(maxsize=None)
+def _cache_em(pasta: Path) -> CacheResultados:
+    return CacheResultados(pasta)
+
+
+def cache_padrao() -> CacheResultados:
+    """
+    O `CacheResultados` da pasta padrão compartilhado pelo processo (usado
+    por `obter_taxa_sinasc(cache=True)`), cujos acertos e falhas acumulam
+    entre as chamadas; ver `estatisticas()`.
+    """
+    return _cache_em(PASTA_CACHE.resolve())
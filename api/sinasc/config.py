@@ -2,12 +2,35 @@ from pathlib import Path
 
 # --- FTP Configuration ---
 CAMINHO_FTP = "ftp.datasus.gov.br"
+DIRETORIO_FTP_SINASC = "/dissemin/publicos/SINASC/1996_/Dados/DNRES"
 
 # --- Local Directories ---
 # Use Path for OS-independent path handling
 PASTA_DBC = Path("data/dbc")
 PASTA_PARQUET = Path("data/parquet")
+PASTA_CANONICA = Path("data/sinasc")
+ARQUIVO_MANIFESTO = "manifesto.json"
+PASTA_CACHE = Path("data/cache")
+PASTA_PARCIAIS = Path("data/parciais")
+PASTA_LOTES = Path("data/lotes")
+
+# --- Ingest ---
+MAX_DOWNLOADS = 4
+TAMANHO_LOTE = 250_000
+# "nativo" (api.sinasc.dbc) ou "qds" (quadrosdesaude.dbc2parquet)
+CONVERSOR_DBC = "nativo"
+
+# --- Sorted canonical layout (particionar(ordenado=True)) ---
+ORDENACAO_PARQUET = ["CODMUNRES", "DTNASC"]
+LINHAS_POR_GRUPO = 65_536
+COLUNAS_DICIONARIO = ["CODMUNRES", "codufres", "IDADEMAE", "faixa_etaria_mae", "REGIAO"]
+COMPRESSAO_PARQUET = "zstd"
+NIVEL_COMPRESSAO = 6
+
+# --- Result cache ---
+LIMITE_CACHE_BYTES = 1024 ** 3
 
 # Ensure directories exist
 PASTA_DBC.mkdir(parents=True, exist_ok=True)
-PASTA_PARQUET.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+PASTA_PARQUET.mkdir(parents=True, exist_ok=True)
+PASTA_CANONICA.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,253 @@
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import quadrosdesaude as qds
+from numba import njit, prange
+from pathlib import Path
+from typing import Iterator
+
+_REGISTRO_ATIVO = 0x20
+_FIM_REGISTROS = 0x1A
+
+
+def _ler_cabecalho(caminho_dbf: Path) -> tuple[int, int, int, list[tuple[str, int, int]]]:
+    """
+    Lê o cabeçalho do DBF: (número de registros, tamanho do cabeçalho,
+    tamanho do registro, [(campo, posição no registro, largura)]).
+    """
+    with open(caminho_dbf, "rb") as f:
+        fixo = f.read(32)
+        n_registros = int.from_bytes(fixo[4:8], "little")
+        tamanho_cabecalho = int.from_bytes(fixo[8:10], "little")
+        tamanho_registro = int.from_bytes(fixo[10:12], "little")
+
+        campos = []
+        posicao = 1  # o primeiro byte do registro é a marca de exclusão
+        while True:
+            descritor = f.read(32)
+            if not descritor or descritor[:1] in (b"\r", b"\n"):
+                break
+            largura = descritor[16]
+            # Campos de texto com mais de 255 bytes guardam o byte alto no de decimais
+            if descritor[11:12] == b"C":
+                largura |= descritor[17] << 8
+            nome = descritor[:11].split(b"\0")[0].decode("latin1")
+            campos.append((nome, posicao, largura))
+            posicao += largura
+
+    return n_registros, tamanho_cabecalho, tamanho_registro, campos
+
+
+@njit(cache=True)
+def _espaco(byte) -> bool:
+    # Os bytes que `bytes.strip()` remove: espaço, \t, \n, \v, \f e \r
+    return byte == 0x20 or (byte >= 0x09 and byte <= 0x0D)
+
+
+@njit(parallel=True, cache=True)
+def _recortar_campos(lote: np.ndarray, posicoes: np.ndarray, larguras: np.ndarray):
+    """
+    Início, fim (sem os espaços das pontas) e tamanho em UTF-8 de cada
+    campo de cada registro do lote; matrizes (registros x campos).
+    """
+    n = lote.shape[0]
+    m = len(posicoes)
+    # Registros do DBF têm no máximo 65.535 bytes
+    inicios = np.empty((n, m), dtype=np.uint16)
+    fins = np.empty((n, m), dtype=np.uint16)
+    tamanhos = np.empty((n, m), dtype=np.int32)
+
+    for i in prange(n):
+        for f in range(m):
+            a = posicoes[f]
+            b = a + larguras[f]
+            while a < b and _espaco(lote[i, a]):
+                a += 1
+            while b > a and _espaco(lote[i, b - 1]):
+                b -= 1
+            tamanho = b - a
+            for k in range(a, b):
+                # latin1 acima de 0x7F ocupa dois bytes em UTF-8
+                if lote[i, k] >= 0x80:
+                    tamanho += 1
+            inicios[i, f] = a
+            fins[i, f] = b
+            tamanhos[i, f] = tamanho
+
+    return inicios, fins, tamanhos
+
+
+@njit(parallel=True, cache=True)
+def _copiar_campos(
+    lote: np.ndarray,
+    inicios: np.ndarray,
+    fins: np.ndarray,
+    offsets: np.ndarray,
+    bases: np.ndarray,
+    dados: np.ndarray
+) -> None:
+    """
+    Copia o conteúdo de cada campo para `dados`, onde cada campo ocupa a
+    faixa que começa em `bases[f]`, recodificando latin1 em UTF-8.
+    """
+    n, m = inicios.shape
+    for i in prange(n):
+        for f in range(m):
+            j = bases[f] + offsets[i, f]
+            for k in range(inicios[i, f], fins[i, f]):
+                byte = lote[i, k]
+                if byte < 0x80:
+                    dados[j] = byte
+                    j += 1
+                else:
+                    dados[j] = 0xC0 | (byte >> 6)
+                    dados[j + 1] = 0x80 | (byte & 0x3F)
+                    j += 2
+
+
+def _colunas_texto(lote: np.ndarray, posicoes: np.ndarray, larguras: np.ndarray) -> list[pa.Array]:
+    """
+    Converte um lote (registros x bytes do registro) em colunas Arrow de
+    texto, com os espaços das pontas removidos e decodificadas de latin1,
+    como `bytes.strip().decode("latin1")` faria campo a campo.
+
+    Os dados de todos os campos vão para um único buffer, um campo após o
+    outro; cada coluna é uma fatia dele, sem cópia.
+    """
+    n = lote.shape[0]
+    inicios, fins, tamanhos = _recortar_campos(lote, posicoes, larguras)
+
+    offsets = np.zeros((n + 1, len(posicoes)), dtype=np.int32)
+    np.cumsum(tamanhos, axis=0, out=offsets[1:])
+    bases = np.zeros(len(posicoes) + 1, dtype=np.int64)
+    np.cumsum(offsets[-1], out=bases[1:])
+
+    dados = np.empty(bases[-1], dtype=np.uint8)
+    _copiar_campos(lote, inicios, fins, offsets, bases, dados)
+
+    return [
+        pa.StringArray.from_buffers(
+            n,
+            pa.py_buffer(np.ascontiguousarray(offsets[:, f])),
+            pa.py_buffer(dados[bases[f]:bases[f + 1]])
+        )
+        for f in range(len(posicoes))
+    ]
+
+
+def ler_dbf_em_lotes(caminho_dbf: str | Path, tamanho_lote: int) -> Iterator[pa.RecordBatch]:
+    """
+    Lê um DBF em lotes de `tamanho_lote` registros, com todas as colunas
+    como texto (o mesmo resultado do `StringFieldParser` do quadrosdesaude).
+
+    O arquivo é mapeado em memória e cada lote é visto como uma matriz
+    (registros x bytes do registro), percorrida por um kernel compilado
+    que escreve direto os buffers Arrow das colunas. Nenhum objeto Python
+    é criado por registro. Registros marcados como excluídos são
+    descartados e a leitura para na marca de fim de arquivo (0x1A).
+
+    Parâmetros
+    ----------
+    caminho_dbf : str | Path
+        O arquivo .dbf.
+    tamanho_lote : int
+        Número de registros por lote.
+
+    Retorna
+    -------
+    Iterator[pa.RecordBatch]
+    """
+    _, tamanho_cabecalho, tamanho_registro, campos = _ler_cabecalho(caminho_dbf)
+    schema = pa.schema([(nome, pa.string()) for nome, _, _ in campos])
+    posicoes = np.array([posicao for _, posicao, _ in campos], dtype=np.int64)
+    larguras = np.array([largura for _, _, largura in campos], dtype=np.int64)
+
+    tamanho = os.path.getsize(caminho_dbf)
+    n_completos = (tamanho - tamanho_cabecalho) // tamanho_registro
+    if n_completos <= 0:
+        return
+
+    registros = np.memmap(
+        caminho_dbf,
+        dtype=np.uint8,
+        mode="r",
+        offset=tamanho_cabecalho,
+        shape=(n_completos, tamanho_registro)
+    )
+
+    fins = np.flatnonzero(registros[:, 0] == _FIM_REGISTROS)
+    n_lidos = int(fins[0]) if len(fins) else n_completos
+
+    for inicio in range(0, n_lidos, tamanho_lote):
+        lote = np.asarray(registros[inicio:min(inicio + tamanho_lote, n_lidos)])
+        lote = lote[lote[:, 0] == _REGISTRO_ATIVO]
+        if not len(lote):
+            continue
+
+        yield pa.RecordBatch.from_arrays(_colunas_texto(lote, posicoes, larguras), schema=schema)
+
+
+def dbc_para_parquet(
+    caminho_dbc: str | Path,
+    destino: str | Path,
+    tamanho_lote: int,
+    pasta_temp: str | Path | None = None
+) -> int:
+    """
+    Converte um .dbc do DATASUS em Parquet, com todas as colunas como texto.
+
+    O .dbc é descomprimido (PKWARE implode) pelo descompressor em C do
+    quadrosdesaude num DBF temporário; os registros são então lidos em
+    lotes por `ler_dbf_em_lotes` e cada lote vira um row group do Parquet.
+    Substitui o `dbfread` registro a registro de `qds.dbc2parquet`, com o
+    mesmo resultado.
+
+    Parâmetros
+    ----------
+    caminho_dbc : str | Path
+        O arquivo .dbc.
+    destino : str | Path
+        O arquivo .parquet a gravar.
+    tamanho_lote : int
+        Número de registros por lote (e por row group).
+    pasta_temp : str | Path | None
+        Pasta do DBF temporário (padrão: a pasta de `destino`).
+
+    Retorna
+    -------
+    int
+        Número de registros gravados.
+    """
+    if qds.descomprimir_dbc is None:
+        raise RuntimeError("Descompressor de DBC do quadrosdesaude indisponível")
+
+    caminho_dbc = Path(caminho_dbc)
+    destino = Path(destino)
+    pasta_temp = Path(pasta_temp) if pasta_temp is not None else destino.parent
+    pasta_temp.mkdir(parents=True, exist_ok=True)
+    caminho_dbf = pasta_temp / f"{caminho_dbc.stem}.dbf"
+
+    try:
+        if qds.descomprimir_dbc(str(caminho_dbc), str(caminho_dbf)) != 0:
+            raise RuntimeError(f"Falha ao descomprimir {caminho_dbc.name}")
+
+        n_registros, *_, campos = _ler_cabecalho(caminho_dbf)
+        schema = pa.schema([(nome, pa.string()) for nome, _, _ in campos])
+
+        gravados = 0
+        with pq.ParquetWriter(destino, schema) as writer:
+            for lote in ler_dbf_em_lotes(caminho_dbf, tamanho_lote):
+                writer.write_batch(lote)
+                gravados += lote.num_rows
+    finally:
+        caminho_dbf.unlink(missing_ok=True)
+
+    # Mesma conferência do quadrosdesaude: registros gravados x cabeçalho
+    if gravados != n_registros:
+        raise RuntimeError(
+            f"{caminho_dbc.name}: {gravados} registros convertidos, "
+            f"{n_registros} no cabeçalho"
+        )
+
+    return gravados
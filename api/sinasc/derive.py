@@ -1,34 +1,62 @@
 import polars as pl
-from .dictionaries import DE_UF_CODIGO_PARA_SIGLA, DE_UF_SIGLA_PARA_REGIAO
+from .dictionaries import (
+    DE_UF_CODIGO_PARA_SIGLA,
+    DE_UF_SIGLA_PARA_REGIAO,
+    FAIXAS_ETARIAS_MAE,
+    REGIOES,
+)
 
 def derivar_variaveis(df: pl.LazyFrame) -> pl.LazyFrame:
     """
     Derives new variables from the raw SINASC data.
+
+    Só são calculadas as colunas ausentes: num LazyFrame já no esquema
+    canônico a função não acrescenta trabalho à consulta.
     """
+    schema = df.collect_schema()
     age = pl.col("IDADEMAE").cast(pl.Int32, strict=False)
 
-    return df.with_columns([
-        pl.when(age < 15).then(pl.lit("<15"))
-        .when(age < 20).then(pl.lit("15-19"))
-        .when(age < 25).then(pl.lit("20-24"))
-        .when(age < 30).then(pl.lit("25-29"))
-        .when(age < 35).then(pl.lit("30-34"))
-        .when(age < 40).then(pl.lit("35-39"))
-        .otherwise(pl.lit("40+"))
-        .alias("faixa_etaria_mae"),
+    # No armazenamento particionado por UF, codufres vem da partição hive;
+    # mantê-la permite que filtros por UF descartem partições inteiras.
+    if "codufres" in schema:
+        codufres = pl.col("codufres")
+    else:
+        codufres = pl.col("CODMUNRES").cast(pl.Utf8).str.slice(0, 2)
 
-        pl.col("CODMUNRES")
-        .cast(pl.Utf8)
-        .alias("codmunres"),
+    if schema.get("CODMUNRES") == pl.Int32:
+        codmunres = pl.col("CODMUNRES")
+    else:
+        codmunres = pl.col("CODMUNRES").cast(pl.Utf8)
 
+    colunas = {
+        "faixa_etaria_mae": (
+            pl.when(age < 15).then(pl.lit("<15"))
+            .when(age < 20).then(pl.lit("15-19"))
+            .when(age < 25).then(pl.lit("20-24"))
+            .when(age < 30).then(pl.lit("25-29"))
+            .when(age < 35).then(pl.lit("30-34"))
+            .when(age < 40).then(pl.lit("35-39"))
+            .otherwise(pl.lit("40+"))
+            .cast(pl.Enum(FAIXAS_ETARIAS_MAE))
+        ),
+        "codmunres": codmunres,
         # UF derived from the municipality
-        pl.col("CODMUNRES")
-        .cast(pl.Utf8)
-        .str.slice(0, 2)
-        .alias("codufres"),
-    ]).with_columns(
-        pl.col("codufres")
-        .replace(DE_UF_CODIGO_PARA_SIGLA)
-        .replace(DE_UF_SIGLA_PARA_REGIAO)
-        .alias("REGIAO")
-    )
+        "codufres": codufres,
+    }
+    novas = [expr.alias(nome) for nome, expr in colunas.items() if nome not in schema]
+    if novas:
+        df = df.with_columns(novas)
+
+    if "REGIAO" not in schema:
+        df = df.with_columns(
+            pl.col("codufres")
+            .replace(DE_UF_CODIGO_PARA_SIGLA)
+            .replace_strict(
+                DE_UF_SIGLA_PARA_REGIAO,
+                default=None,
+                return_dtype=pl.Enum(REGIOES)
+            )
+            .alias("REGIAO")
+        )
+
+    return df
@@ -28,3 +28,23 @@ DE_UF_SIGLA_PARA_REGIAO = {
     'RS': 'Sul', 'RO': 'Norte', 'RR': 'Norte', 'SC': 'Sul',
     'SP': 'Sudeste', 'SE': 'Nordeste', 'TO': 'Norte'
 }
+
+
+FAIXAS_ETARIAS_MAE = ["<15", "15-19", "20-24", "25-29", "30-34", "35-39", "40+"]
+
+REGIOES = ["Norte", "Nordeste", "Sudeste", "Sul", "Centro-Oeste"]
+
+# Agrupamentos do capítulo XVII da CID-10 (malformações congênitas)
+BLOCOS_CAPITULO_Q = {
+    "Q00-Q07": (0, 7),
+    "Q10-Q18": (10, 18),
+    "Q20-Q28": (20, 28),
+    "Q30-Q34": (30, 34),
+    "Q35-Q37": (35, 37),
+    "Q38-Q45": (38, 45),
+    "Q50-Q56": (50, 56),
+    "Q60-Q64": (60, 64),
+    "Q65-Q79": (65, 79),
+    "Q80-Q89": (80, 89),
+    "Q90-Q99": (90, 99),
+}
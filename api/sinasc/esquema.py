@@ -0,0 +1,46 @@
+import polars as pl
+from .tempo import padronizar_tempo
+from .derive import derivar_variaveis
+from .dictionaries import FAIXAS_ETARIAS_MAE, REGIOES
+
+# Tipos do esquema canônico gravado na ingestão
+ESQUEMA_CANONICO = {
+    "DTNASC": pl.Date,
+    "ano": pl.Int16,
+    "mes": pl.Int8,
+    "IDADEMAE": pl.Int8,
+    "CODMUNRES": pl.Int32,
+    "codmunres": pl.Int32,
+    "codufres": pl.Utf8,
+    "faixa_etaria_mae": pl.Enum(FAIXAS_ETARIAS_MAE),
+    "REGIAO": pl.Enum(REGIOES),
+    "id_nascimento": pl.UInt32,
+    "BLOCOS_ANOMALIA": pl.UInt16,
+}
+
+
+def aplicar_esquema_canonico(df: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Converte o LazyFrame bruto do SINASC para o esquema canônico: datas e
+    códigos tipados e as variáveis derivadas já calculadas.
+
+    É idempotente; aplicada a um LazyFrame já canônico (como o lido do
+    armazenamento particionado) não acrescenta nenhuma operação.
+    """
+    schema = df.collect_schema()
+
+    # A UF sai dos dois primeiros dígitos, antes de CODMUNRES virar inteiro
+    if "codufres" not in schema:
+        df = df.with_columns(
+            pl.col("CODMUNRES").cast(pl.Utf8).str.slice(0, 2).alias("codufres")
+        )
+
+    casts = [
+        pl.col(col).cast(ESQUEMA_CANONICO[col], strict=False)
+        for col in ("IDADEMAE", "CODMUNRES")
+        if schema.get(col) != ESQUEMA_CANONICO[col]
+    ]
+    if casts:
+        df = df.with_columns(casts)
+
+    return df.pipe(padronizar_tempo).pipe(derivar_variaveis)
@@ -0,0 +1,124 @@
+import datetime
+import calendar
+import polars as pl
+from .dictionaries import DE_UF_CODIGO_PARA_SIGLA
+
+_DE_UF_SIGLA_PARA_CODIGO = {sigla: codigo for codigo, sigla in DE_UF_CODIGO_PARA_SIGLA.items()}
+
+# Até quantos municípios o filtro vira uma disjunção de igualdades, que o
+# scan compara com o min/max de cada row group (o `is_in` não é comparado)
+_MAX_IGUALDADES = 64
+
+
+def _codigo_uf(uf: str | int) -> str:
+    uf = str(uf).upper()
+    codigo = _DE_UF_SIGLA_PARA_CODIGO.get(uf, uf)
+    if codigo not in DE_UF_CODIGO_PARA_SIGLA:
+        raise ValueError(f"UF desconhecida: {uf!r}")
+    return codigo
+
+
+def _codigo_municipio(municipio: str | int) -> int:
+    # Aceita o código de 6 ou de 7 dígitos (com o verificador)
+    codigo = int(municipio)
+    return codigo // 10 if codigo >= 1_000_000 else codigo
+
+
+def _intervalo(valores: tuple[int, int] | int) -> tuple[int, int]:
+    if isinstance(valores, int):
+        return valores, valores
+    inicio, fim = valores
+    return inicio, fim
+
+
+def filtrar_sinasc(
+    df: pl.LazyFrame,
+    anos: list[int],
+    ufs: list[str | int] | None = None,
+    municipios: list[str | int] | None = None,
+    meses: tuple[int, int] | int | None = None,
+    idade_mae: tuple[int, int] | int | None = None
+) -> pl.LazyFrame:
+    """
+    Restringe o SINASC logo após o scan, antes de qualquer conversão.
+
+    Os filtros são escritos sobre as colunas como estão nos arquivos: em
+    texto nos Parquets brutos e tipadas no armazenamento canônico. Assim o
+    polars os leva ao `scan_parquet` como predicados; no armazenamento
+    canônico, as faixas de CODMUNRES e DTNASC usam as estatísticas min/max
+    para pular row groups, e a UF descarta partições quando o armazenamento
+    é particionado por UF.
+
+    Parâmetros
+    ----------
+    df : pl.LazyFrame
+        O scan do SINASC (bruto ou canônico).
+    anos : list[int]
+        Anos lidos (para traduzir `meses` em intervalos de datas).
+    ufs : list[str | int] | None
+        UFs de residência, por código IBGE ("35", 35) ou sigla ("SP").
+    municipios : list[str | int] | None
+        Municípios de residência, por código IBGE de 6 ou 7 dígitos.
+    meses : tuple[int, int] | int | None
+        Mês ou intervalo de meses de nascimento (inclusivo), em cada ano.
+    idade_mae : tuple[int, int] | int | None
+        Idade ou intervalo de idades da mãe (inclusivo).
+
+    Retorna
+    -------
+    pl.LazyFrame
+    """
+    schema = df.collect_schema()
+    bruto = schema.get("CODMUNRES") == pl.Utf8
+    filtros = []
+
+    if ufs is not None:
+        codigos = [_codigo_uf(uf) for uf in ufs]
+        if "codufres" in schema:
+            filtros.append(pl.col("codufres").is_in(codigos))
+        if bruto:
+            filtros.append(pl.col("CODMUNRES").str.slice(0, 2).is_in(codigos))
+        else:
+            filtros.append(pl.any_horizontal([
+                pl.col("CODMUNRES").is_between(int(c) * 10_000, int(c) * 10_000 + 9_999)
+                for c in codigos
+            ]))
+
+    if municipios is not None:
+        codigos = sorted({_codigo_municipio(m) for m in municipios})
+        if bruto:
+            filtros.append(pl.col("CODMUNRES").is_in([str(c) for c in codigos]))
+        elif len(codigos) <= _MAX_IGUALDADES:
+            filtros.append(pl.any_horizontal([pl.col("CODMUNRES") == c for c in codigos]))
+        else:
+            filtros.append(
+                pl.col("CODMUNRES").is_between(codigos[0], codigos[-1])
+                & pl.col("CODMUNRES").is_in(codigos)
+            )
+
+    if meses is not None:
+        inicio, fim = _intervalo(meses)
+        if schema.get("DTNASC") == pl.Date:
+            filtros.append(pl.any_horizontal([
+                pl.col("DTNASC").is_between(
+                    datetime.date(ano, inicio, 1),
+                    datetime.date(ano, fim, calendar.monthrange(ano, fim)[1])
+                )
+                for ano in anos
+            ]))
+        else:
+            # DTNASC bruto vem como DDMMAAAA
+            mes = pl.col("DTNASC").str.slice(2, 2).cast(pl.Int8, strict=False)
+            filtros.append(mes.is_between(inicio, fim))
+
+    if idade_mae is not None:
+        inicio, fim = _intervalo(idade_mae)
+        idade = pl.col("IDADEMAE")
+        if schema.get("IDADEMAE") == pl.Utf8:
+            idade = idade.cast(pl.Int16, strict=False)
+        filtros.append(idade.is_between(inicio, fim))
+
+    if not filtros:
+        return df
+
+    return df.filter(*filtros)
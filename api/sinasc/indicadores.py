@@ -1,22 +1,110 @@
 import polars as pl
+from .anomalias import BIT_FORA_DOS_BLOCOS, expandir_prefixo, tem_anomalia
+from .armazenamento import arquivos_indice_anomalias
+from .dictionaries import BLOCOS_CAPITULO_Q
+
+_BITS_BLOCOS = {bloco: 1 << i for i, bloco in enumerate(BLOCOS_CAPITULO_Q)}
+_BITS_BLOCOS["Q"] = (BIT_FORA_DOS_BLOCOS << 1) - 1
+
+
+def _indicador_indexado(
+    df: pl.LazyFrame,
+    grupos: dict[str, list[str]],
+    anos: list[int],
+    indice: list
+) -> pl.LazyFrame:
+    """
+    Indicadores a partir do índice de anomalias gravado na ingestão.
+
+    Capítulo e agrupamentos inteiros ("Q", "Q20-Q28"...) viram um teste de
+    bits em BLOCOS_ANOMALIA; os demais prefixos são buscados na tabela
+    auxiliar (só os nascidos com IDANOMAL == "1") e trazidos por um único
+    join em (ano, id_nascimento). A tabela auxiliar é filtrada pelos anos
+    pedidos e pelos prefixos antes da agregação, de modo que só os códigos
+    que casam com algum prefixo chegam ao group-by.
+    """
+    mascaras = {}
+    buscas = {}
+    for col, prefixos in grupos.items():
+        mascaras[col] = 0
+        for prefixo in prefixos:
+            if prefixo in _BITS_BLOCOS:
+                mascaras[col] |= _BITS_BLOCOS[prefixo]
+            else:
+                buscas.setdefault(col, []).extend(expandir_prefixo(prefixo))
+
+    if buscas:
+        todos = "|".join(p for prefixos in buscas.values() for p in prefixos)
+        encontrados = (
+            pl.scan_parquet(indice)
+            .filter(
+                pl.col("ano").is_in(anos) &
+                pl.col("cid").str.contains(f"^(?:{todos})")
+            )
+            .group_by("ano", "id_nascimento")
+            .agg([
+                pl.col("cid").str.contains(f"^(?:{'|'.join(prefixos)})").any()
+                .alias(f"_{col}")
+                for col, prefixos in buscas.items()
+            ])
+        )
+        df = df.join(encontrados, on=["ano", "id_nascimento"], how="left")
+
+    colunas = []
+    for col, mascara in mascaras.items():
+        indicador = pl.lit(False)
+        if mascara:
+            indicador = (pl.col("BLOCOS_ANOMALIA") & mascara) != 0
+        if col in buscas:
+            indicador = indicador | pl.col(f"_{col}").fill_null(False)
+        colunas.append(indicador.cast(pl.Int8).alias(col))
+
+    return df.with_columns(colunas).drop([f"_{col}" for col in buscas])
+
 
 def indicador_malformacao(
     df: pl.LazyFrame,
-    cid: str | None = None
+    cid: str | list[str] | dict[str, str | list[str]] | None = None,
+    anos: list[int] | None = None
 ) -> pl.LazyFrame:
     """
     Creates a malformation indicator column.
+
+    `cid` pode ser:
+        - None          -> coluna 'casos' zerada
+        - str           -> coluna 'casos' para o prefixo
+        - list[str]     -> uma coluna 'casos_{prefixo}' por prefixo
+        - dict          -> uma coluna 'casos_{nome}' por grupo nomeado, cujo
+                           valor é um prefixo ou uma lista de prefixos
+
+    Prefixos podem ser intervalos de categorias ("Q20-Q28"). Um nascimento
+    conta como caso se qualquer um dos códigos de CODANOMAL (que pode trazer
+    vários) começar pelo prefixo. Todas as colunas são calculadas na mesma
+    passagem pelos dados; no armazenamento canônico a busca usa o índice de
+    anomalias dos `anos` do frame em vez de uma regex sobre todos os
+    registros. Sem `anos`, ou se algum deles não tiver índice, a regex é
+    usada.
     """
     if cid is None:
         return df.with_columns(pl.lit(0).alias("casos"))
 
-    return df.with_columns(
-        (
-            (pl.col("IDANOMAL") == "1") &
-            pl.col("CODANOMAL")
-            .fill_null("")
-            .str.contains(f"^{cid}")
-        )
-        .cast(pl.Int8)
-        .alias("casos")
-    )
+    if isinstance(cid, str):
+        grupos = {"casos": [cid]}
+    else:
+        if not isinstance(cid, dict):
+            cid = {prefixo: prefixo for prefixo in cid}
+        grupos = {
+            f"casos_{nome}": [prefixos] if isinstance(prefixos, str) else list(prefixos)
+            for nome, prefixos in cid.items()
+        }
+
+    schema = df.collect_schema()
+    if anos and "BLOCOS_ANOMALIA" in schema and "id_nascimento" in schema:
+        indice = arquivos_indice_anomalias(anos)
+        if indice is not None:
+            return _indicador_indexado(df, grupos, anos, indice)
+
+    return df.with_columns([
+        tem_anomalia(prefixos).alias(col)
+        for col, prefixos in grupos.items()
+    ])
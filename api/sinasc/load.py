@@ -1,49 +1,318 @@
+import os
+import shutil
+import logging
+import multiprocessing
 import polars as pl
 import quadrosdesaude as qds
+from ftplib import FTP
 from pathlib import Path
-from .config import CAMINHO_FTP, PASTA_DBC, PASTA_PARQUET
-from .derive import derivar_variaveis
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from .config import (
+    CAMINHO_FTP,
+    DIRETORIO_FTP_SINASC,
+    PASTA_DBC,
+    PASTA_PARQUET,
+    MAX_DOWNLOADS,
+    TAMANHO_LOTE,
+    CONVERSOR_DBC,
+)
+from .dbc import dbc_para_parquet
+from .esquema import aplicar_esquema_canonico
+from .filtros import filtrar_sinasc
+from .perfil import Perfil, medir
+from .armazenamento import (
+    ler_manifesto,
+    particionar,
+    escanear_particionado,
+    arquivos_particionados,
+    anos_pendentes,
+)
 
-def _garantir_sinasc_parquet(year: int) -> Path:
+logger = logging.getLogger(__name__)
+
+
+def _baixar_dbc(
+    year: int,
+    host: str = CAMINHO_FTP,
+    porta: int = 21,
+    diretorio: str = DIRETORIO_FTP_SINASC
+) -> Path:
+    """
+    Baixa o DNBR{year}.dbc do FTP, retomando um download parcial.
+
+    Os bytes são gravados em `DNBR{year}.dbc.part`; só depois de conferido o
+    tamanho remoto o arquivo é renomeado para o nome final.
+    """
+    dbc_file = PASTA_DBC / f"DNBR{year}.dbc"
+
+    if dbc_file.exists():
+        return dbc_file
+
+    partial = dbc_file.with_name(f"{dbc_file.name}.part")
+
+    with FTP() as ftp:
+        ftp.connect(host, porta)
+        ftp.login()
+        ftp.cwd(diretorio)
+        ftp.voidcmd("TYPE I")
+        total = ftp.size(dbc_file.name)
+
+        offset = partial.stat().st_size if partial.exists() else 0
+        if total is not None and offset > total:
+            offset = 0
+
+        if total is None or offset < total:
+            with open(partial, "ab" if offset else "wb") as f:
+                ftp.retrbinary(
+                    f"RETR {dbc_file.name}",
+                    f.write,
+                    rest=offset or None
+                )
+
+    if total is not None and partial.stat().st_size != total:
+        raise IOError(
+            f"Download incompleto de {dbc_file.name}: "
+            f"{partial.stat().st_size} de {total} bytes"
+        )
+
+    os.replace(partial, dbc_file)
+    return dbc_file
+
+
+def _converter_dbc(year: int, conversor: str = CONVERSOR_DBC) -> Path:
+    """
+    Converte DNBR{year}.dbc em Parquet numa pasta temporária e move o
+    resultado para PASTA_PARQUET com um rename atômico.
+
+    O conversor "nativo" (`dbc_para_parquet`) lê os registros em lotes
+    vetorizados; "qds" usa o `dbc2parquet` do quadrosdesaude. Os dois
+    produzem o mesmo Parquet.
+    """
+    name = f"DNBR{year}"
+    dbc_file = PASTA_DBC / f"{name}.dbc"
+    parquet_file = PASTA_PARQUET / f"{name}.parquet"
+
+    tmp = PASTA_PARQUET / ".tmp" / name
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    try:
+        if conversor == "nativo":
+            dbc_para_parquet(dbc_file, tmp / f"{name}.parquet", TAMANHO_LOTE, pasta_temp=tmp / "dbf")
+        else:
+            ok = qds.dbc2parquet(
+                caminho_dbc=str(dbc_file),
+                destino_parquet=str(tmp),
+                pasta_temp_dbf=str(tmp / "dbf"),
+                pasta_temp_parquet=str(tmp / "parquet"),
+                tamanho_lote=TAMANHO_LOTE
+            )
+            if not ok:
+                raise RuntimeError(f"Falha ao converter {dbc_file.name} para Parquet")
+
+        os.replace(tmp / f"{name}.parquet", parquet_file)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return parquet_file
+
+
+def _informar_progresso(year: int, etapa: str) -> None:
+    mensagens = {
+        "existente": "SINASC %s parquet already exists - using it directly",
+        "baixado": "SINASC %s downloaded",
+        "convertido": "SINASC %s converted to Parquet",
+        "falha": "SINASC %s ingest failed",
+    }
+    nivel = logging.ERROR if etapa == "falha" else logging.INFO
+    logger.log(nivel, mensagens[etapa], year, extra={"ano": year, "etapa": etapa})
+
+
+def _garantir_sinasc_parquet(year: int, perfil: Perfil | None = None) -> Path:
     name = f"DNBR{year}"
     parquet_file = PASTA_PARQUET / f"{name}.parquet"
 
     if parquet_file.exists():
-        print(f"✅ Parquet {year} already exists - using it directly")
+        _informar_progresso(year, "existente")
         return parquet_file
 
-    dbc_file = PASTA_DBC / f"{name}.dbc"
+    logger.info("Downloading SINASC %s", year, extra={"ano": year, "etapa": "download"})
+    with medir(perfil, "download", ano=year):
+        _baixar_dbc(year)
 
-    if not dbc_file.exists():
-        print(f"⬇️ Downloading SINASC {year}")
-        qds.ftp_download_arquivo(
-            ftp_path=CAMINHO_FTP,
-            filename=dbc_file.name,
-            destination_folder=str(PASTA_DBC)
-        )
+    logger.info("Converting SINASC %s to Parquet", year, extra={"ano": year, "etapa": "conversao"})
+    with medir(perfil, "conversao_dbc", ano=year):
+        return _converter_dbc(year)
 
-    print(f"🔄 Converting {year} to Parquet")
-    qds.dbc2parquet(
-        caminho_dbc=str(dbc_file),
-        destino_parquet=str(PASTA_PARQUET),
-        tamanho_lote=250_000
-    )
 
-    return parquet_file
+def ingerir(
+    years: list[int],
+    max_downloads: int = MAX_DOWNLOADS,
+    max_conversoes: int | None = None,
+    progresso: Callable[[int, str], None] | None = _informar_progresso,
+    host: str = CAMINHO_FTP,
+    porta: int = 21,
+    diretorio: str = DIRETORIO_FTP_SINASC
+) -> dict[int, Path]:
+    """
+    Garante os Parquets de vários anos em paralelo.
+
+    Os downloads rodam num pool de threads limitado a `max_downloads` e cada
+    ano segue para a conversão DBC -> Parquet num pool de processos assim que
+    seu download termina.
+
+    Parâmetros
+    ----------
+    years : list[int]
+        Anos a ingerir.
+    max_downloads : int, padrão MAX_DOWNLOADS
+        Número máximo de conexões FTP simultâneas.
+    max_conversoes : int | None
+        Número de processos de conversão (None usa o número de CPUs).
+    progresso : Callable[[int, str], None] | None
+        Chamado com (ano, etapa) para cada etapa concluída: 'existente',
+        'baixado', 'convertido' ou 'falha'.
+    host, porta, diretorio :
+        Servidor FTP de origem dos arquivos DNBR{ano}.dbc.
+
+    Retorna
+    -------
+    dict[int, Path]
+        Caminho do Parquet de cada ano.
+    """
+    if progresso is None:
+        progresso = lambda year, etapa: None
+
+    parquets = {}
+    pending = []
+
+    for year in dict.fromkeys(years):
+        parquet_file = PASTA_PARQUET / f"DNBR{year}.parquet"
+        if parquet_file.exists():
+            parquets[year] = parquet_file
+            progresso(year, "existente")
+        else:
+            pending.append(year)
+
+    if not pending:
+        return parquets
+
+    failures = {}
+
+    # Os processos de conversão nascem com os downloads (e os threads do
+    # polars) já rodando: com fork, herdariam travas presas
+    with ThreadPoolExecutor(max_workers=max_downloads) as downloads, \
+            ProcessPoolExecutor(
+                max_workers=max_conversoes,
+                mp_context=multiprocessing.get_context("spawn")
+            ) as conversions:
+        download_futures = {
+            downloads.submit(_baixar_dbc, year, host, porta, diretorio): year
+            for year in pending
+        }
+        conversion_futures = {}
+
+        for future in as_completed(download_futures):
+            year = download_futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failures[year] = e
+                progresso(year, "falha")
+                continue
+
+            progresso(year, "baixado")
+            conversion_futures[conversions.submit(_converter_dbc, year)] = year
 
-def _abrir_sinasc(years: list[int]) -> pl.LazyFrame:
-    parquets = [_garantir_sinasc_parquet(year) for year in years]
+        for future in as_completed(conversion_futures):
+            year = conversion_futures[future]
+            try:
+                parquets[year] = future.result()
+            except Exception as e:
+                failures[year] = e
+                progresso(year, "falha")
+                continue
+
+            progresso(year, "convertido")
+
+    if failures:
+        detalhes = "; ".join(f"{year}: {e}" for year, e in sorted(failures.items()))
+        raise RuntimeError(f"Falha na ingestão do SINASC - {detalhes}")
+
+    return parquets
+
+
+def garantir_arquivos(
+    years: list[int],
+    paralelo: bool = False,
+    perfil: Perfil | None = None
+) -> list[Path]:
+    """
+    Garante os dados dos anos pedidos e devolve os arquivos Parquet que uma
+    consulta a eles lê (os do armazenamento particionado, se existir).
+    """
+    manifesto = ler_manifesto()
+
+    # Com o armazenamento particionado, os anos que faltarem entram nele
+    if manifesto is not None:
+        faltantes = anos_pendentes(manifesto, years)
+        if faltantes:
+            if paralelo:
+                with medir(perfil, "ingestao", anos=faltantes):
+                    ingerir(faltantes)
+            with medir(perfil, "particionamento", anos=faltantes):
+                particionar(faltantes, por_uf="codufres" in manifesto["particoes"])
+        return arquivos_particionados(years)
+
+    if paralelo:
+        with medir(perfil, "ingestao", anos=years):
+            ingeridos = ingerir(years)
+        return [ingeridos[year] for year in years]
+
+    return [_garantir_sinasc_parquet(year, perfil) for year in years]
+
+
+def _abrir_sinasc(
+    years: list[int],
+    paralelo: bool = False,
+    perfil: Perfil | None = None
+) -> pl.LazyFrame:
+    parquets = garantir_arquivos(years, paralelo=paralelo, perfil=perfil)
+
+    if perfil is not None:
+        perfil.registrar_arquivos(parquets)
+
+    if ler_manifesto() is not None:
+        return escanear_particionado(years)
 
     return pl.scan_parquet(
         parquets,
         extra_columns="ignore"
     )
 
-def carregar(years: list[int]) -> pl.LazyFrame:
-    print("Starting SINASC loading...")
-    df = _abrir_sinasc(years)
-    df = derivar_variaveis(df)
-    # TODO: Implement canonical schema application and official dictionaries
+def carregar(
+    years: list[int],
+    paralelo: bool = False,
+    perfil: Perfil | None = None,
+    ufs: list[str | int] | None = None,
+    municipios: list[str | int] | None = None,
+    meses: tuple[int, int] | int | None = None,
+    idade_mae: tuple[int, int] | int | None = None
+) -> pl.LazyFrame:
+    logger.info("Starting SINASC loading", extra={"anos": years})
+    df = _abrir_sinasc(years, paralelo=paralelo, perfil=perfil)
+    # Filtros sobre as colunas como estão nos arquivos, para irem ao scan
+    df = filtrar_sinasc(
+        df,
+        years,
+        ufs=ufs,
+        municipios=municipios,
+        meses=meses,
+        idade_mae=idade_mae
+    )
+    df = aplicar_esquema_canonico(df)
+    # TODO: Implement official dictionaries
     # TODO: Implement deterministic cleaning
-    print("SINASC loading complete.")
-    return df
\ No newline at end of file
+    logger.info("SINASC loading complete", extra={"anos": years})
+    return df
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import polars as pl
+import geopandas as gpd
+from typing import Iterator
+
+from api.sinasc.taxas import obter_taxa_sinasc
+from api.analysis.spatial import obter_geometria_municipios
+from api.analysis.malhas import codigo_6_digitos, tabela_harmonizacao
+
+
+class PainelMunicipal:
+    """
+    Painel município x ano com a malha municipal carregada uma única vez.
+
+    Cada coluna de valores (n_nascidos_vivos, casos, taxas...) é guardada
+    como uma matriz (municípios na ordem da malha x anos). Os GeoDataFrames
+    de cada ano e a tabela larga são montados sob demanda a partir dessas
+    matrizes e reutilizam os mesmos objetos de geometria; nenhum polígono
+    é copiado, por mais anos que o painel tenha.
+
+    Parâmetros
+    ----------
+    malha : gpd.GeoDataFrame
+        A malha municipal (uma linha por município).
+    anos : list[int]
+        Os anos do painel, na ordem das colunas das matrizes.
+    valores : dict[str, np.ndarray]
+        Matriz (municípios x anos) de cada coluna de valores.
+    """
+
+    def __init__(self, malha: gpd.GeoDataFrame, anos: list[int], valores: dict[str, np.ndarray]):
+        self.atributos = pd.DataFrame(malha.drop(columns=malha.geometry.name))
+        self.geometria = malha.geometry.values
+        self.crs = malha.crs
+        self.anos = list(anos)
+        self.valores = valores
+
+    @property
+    def colunas(self) -> list[str]:
+        return list(self.valores)
+
+    def matriz(self, coluna: str) -> np.ndarray:
+        """
+        Matriz (municípios x anos) de uma coluna, sem geometria.
+        """
+        return self.valores[coluna]
+
+    def ano(self, ano: int) -> gpd.GeoDataFrame:
+        """
+        GeoDataFrame de um ano, como o de `obter_taxa_sinasc(anos=[ano],
+        estratos=["codmunres"], retorno="geopandas")`: todos os municípios
+        da malha, com NaN onde não houve nascimentos.
+        """
+        i = self.anos.index(ano)
+        dados = self.atributos.assign(
+            ano=ano,
+            **{col: matriz[:, i] for col, matriz in self.valores.items()}
+        )
+        return gpd.GeoDataFrame(dados, geometry=self.geometria, crs=self.crs)
+
+    def __iter__(self) -> Iterator[tuple[int, gpd.GeoDataFrame]]:
+        for ano in self.anos:
+            yield ano, self.ano(ano)
+
+    def largo(self, coluna: str) -> gpd.GeoDataFrame:
+        """
+        Tabela larga de uma coluna: uma linha por município e uma coluna
+        por ano.
+        """
+        dados = pd.concat(
+            [self.atributos, pd.DataFrame(self.valores[coluna], columns=self.anos)],
+            axis=1
+        )
+        return gpd.GeoDataFrame(dados, geometry=self.geometria, crs=self.crs)
+
+
+def obter_painel_municipal(
+    anos: list[int],
+    cid: str | list[str] | dict[str, str | list[str]] | None = None,
+    multiplicador: int = 100_000,
+    ano_malha: int = 2022,
+    simplificado: bool = True,
+    **opcoes
+) -> PainelMunicipal:
+    """
+    Monta o painel município x ano de taxas do SINASC numa só consulta.
+
+    Os anos são agregados por (ano, codmunres) numa única leitura dos
+    Parquets e o resultado é distribuído em matrizes alinhadas à malha,
+    pelo código de 6 dígitos do município (ver `tabela_harmonizacao`).
+
+    Parâmetros
+    ----------
+    anos : list[int]
+        Anos do painel.
+    cid :
+        Prefixo(s) CID-10, como em `obter_taxa_sinasc`.
+    multiplicador : int, padrão 100.000
+        A constante pela qual multiplicar a taxa.
+    ano_malha : int, padrão 2022
+        Ano da malha municipal do IBGE.
+    simplificado : bool, padrão True
+        Usa a variante simplificada da malha.
+    **opcoes
+        Repassadas a `obter_taxa_sinasc` (cache, incremental, perfil,
+        motor...).
+
+    Retorna
+    -------
+    PainelMunicipal
+    """
+    anos = list(dict.fromkeys(anos))
+
+    df = obter_taxa_sinasc(
+        anos=anos,
+        cid=cid,
+        estratos=["codmunres"],
+        multiplicador=multiplicador,
+        retorno="polars",
+        **opcoes
+    )
+
+    malha = obter_geometria_municipios(ano=ano_malha, simplificado=simplificado)
+
+    df = (
+        df
+        .with_columns(codigo_6_digitos("codmunres").alias("_chave"))
+        .join(tabela_harmonizacao(ano_malha), on="_chave", how="inner")
+    )
+    linhas = df["_linha"].to_numpy()
+    colunas = pd.Index(anos).get_indexer(df["ano"].to_numpy())
+    presentes = np.zeros((len(malha), len(anos)), dtype=bool)
+    presentes[linhas, colunas] = True
+
+    # Contagens são somadas (um município desmembrado cai na linha do de
+    # origem em malhas antigas); as taxas são recalculadas a partir delas
+    valores = {}
+    for col in df.columns:
+        if col == "n_nascidos_vivos" or col == "casos" or col.startswith("casos_"):
+            matriz = np.zeros((len(malha), len(anos)))
+            np.add.at(matriz, (linhas, colunas), df[col].cast(pl.Float64).to_numpy())
+            valores[col] = np.where(presentes, matriz, np.nan)
+
+    for col in [c for c in valores if c != "n_nascidos_vivos"]:
+        valores[f"taxa_por_{multiplicador}{col[len('casos'):]}"] = (
+            valores[col] / valores["n_nascidos_vivos"] * multiplicador
+        )
+
+    return PainelMunicipal(malha, anos, valores)
@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+import logging
+import polars as pl
+from pathlib import Path
+from .config import PASTA_PARCIAIS
+from .load import carregar, garantir_arquivos
+from .cache import impressao_digital
+from .indicadores import indicador_malformacao
+from .aggregate import agregar, combinar_parciais
+
+logger = logging.getLogger(__name__)
+
+
+def _pasta_parciais(cid, grao: list[str], filtros: dict, pasta: Path) -> Path:
+    chave = {"cid": cid, "grao": grao}
+    if filtros:
+        chave["filtros"] = filtros
+    conteudo = json.dumps(chave, sort_keys=True, default=str)
+    return Path(pasta) / hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+def _parcial_do_ano(
+    year: int,
+    cid,
+    grao: list[str],
+    filtros: dict,
+    pasta: Path
+) -> tuple[pl.DataFrame, bool]:
+    """
+    Lê o agregado parcial de um ano, recalculando-o se ainda não existir ou
+    se os arquivos de origem do ano mudaram. Retorna (parcial, recalculado).
+    """
+    arquivo = pasta / f"ano={year}.parquet"
+    arquivo_meta = pasta / f"ano={year}.json"
+    fontes = {str(a): impressao_digital(a) for a in garantir_arquivos([year])}
+
+    if arquivo.exists() and arquivo_meta.exists():
+        with open(arquivo_meta, encoding="utf-8") as f:
+            if json.load(f)["fontes"] == fontes:
+                return pl.read_parquet(arquivo), False
+
+    parcial = (
+        carregar([year], **filtros)
+        .pipe(indicador_malformacao, cid, [year])
+        .pipe(agregar, group_cols=grao)
+        .select(pl.exclude("^taxa_por_.*$"))
+        .collect()
+    )
+
+    tmp = arquivo.with_name(f"{arquivo.name}.{os.getpid()}.tmp")
+    parcial.write_parquet(tmp)
+    os.replace(tmp, arquivo)
+
+    with open(arquivo_meta, "w", encoding="utf-8") as f:
+        json.dump(
+            {"cid": cid, "grao": grao, "filtros": filtros, "fontes": fontes},
+            f, indent=2, default=str
+        )
+
+    return parcial, True
+
+
+def agregar_incremental(
+    anos: list[int],
+    cid: str | list[str] | dict[str, str | list[str]] | None,
+    group_cols: list[str],
+    multiplicador: int = 100_000,
+    pasta: Path = PASTA_PARCIAIS,
+    filtros: dict | None = None
+) -> pl.DataFrame:
+    """
+    Agrega o SINASC a partir de agregados parciais guardados por ano.
+
+    As contagens (n_nascidos_vivos e casos) são aditivas: cada ano é
+    agregado uma única vez no grão pedido (mais o ano) e gravado em disco.
+    Um intervalo qualquer de anos é respondido somando os parciais e
+    recalculando as taxas; só os anos sem parcial, ou cujos arquivos de
+    origem mudaram, são lidos de novo.
+
+    Parâmetros
+    ----------
+    anos : list[int]
+        Anos a incluir.
+    cid :
+        Prefixo(s) CID-10, como em `indicador_malformacao`.
+    group_cols : list[str]
+        Colunas de agrupamento do resultado (ex: ["ano", "REGIAO"]).
+    multiplicador : int, padrão 100.000
+        A constante pela qual multiplicar a taxa.
+    pasta : Path, padrão PASTA_PARCIAIS
+        Pasta onde os parciais são guardados.
+    filtros : dict | None
+        Filtros repassados a `carregar` (ufs, municipios, meses,
+        idade_mae); cada combinação tem seus próprios parciais.
+
+    Retorna
+    -------
+    pl.DataFrame
+        O mesmo resultado de `agregar` sobre todos os anos.
+    """
+    grao = list(dict.fromkeys(["ano", *group_cols]))
+    filtros = filtros or {}
+    destino = _pasta_parciais(cid, grao, filtros, pasta)
+    destino.mkdir(parents=True, exist_ok=True)
+
+    parciais = []
+    recalculados = []
+    for year in dict.fromkeys(anos):
+        parcial, recalculado = _parcial_do_ano(year, cid, grao, filtros, destino)
+        parciais.append(parcial)
+        if recalculado:
+            recalculados.append(year)
+
+    if recalculados:
+        logger.info(
+            "Partial aggregates recomputed for %s",
+            recalculados,
+            extra={"anos": recalculados}
+        )
+
+    return (
+        pl.concat(parciais)
+        .lazy()
+        .pipe(combinar_parciais, group_cols=group_cols, multiplicador=multiplicador)
+        .collect()
+    )
@@ -0,0 +1,123 @@
+import sys
+import json
+import time
+import logging
+import polars as pl
+import pyarrow.parquet as pq
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_pico_bytes() -> int | None:
+    """
+    Pico de memória residente do processo até agora (None fora de Unix).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+class Perfil:
+    """
+    Coleta de métricas de uma consulta ao SINASC, ativada ao passar uma
+    instância em `perfil=` para `carregar` ou `obter_taxa_sinasc`.
+
+    Registra, por etapa, o tempo de parede e o pico de memória residente do
+    processo; as linhas e bytes dos arquivos Parquet lidos; o plano
+    otimizado do polars; e a saída de `LazyFrame.profile()`, que detalha o
+    tempo de cada nó (scan, conversões de data, regex de CODANOMAL,
+    group-by...). Tudo pode ser exportado em JSON com `para_json`.
+    """
+
+    def __init__(self):
+        self.etapas = []
+        self.arquivos = []
+        self.linhas_lidas = 0
+        self.bytes_lidos = 0
+        self.plano = None
+        self.nos = []
+
+    @contextmanager
+    def etapa(self, nome: str, **detalhes):
+        """
+        Mede o bloco como uma etapa de nome `nome`.
+        """
+        pico_antes = _rss_pico_bytes()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            pico_depois = _rss_pico_bytes()
+            registro = {
+                "etapa": nome,
+                "segundos": duracao,
+                "rss_pico_bytes": pico_depois,
+                "rss_pico_aumento_bytes": (
+                    pico_depois - pico_antes if pico_depois is not None else None
+                ),
+                **detalhes,
+            }
+            self.etapas.append(registro)
+            logger.debug("stage finished", extra={"perfil": registro})
+
+    def registrar_arquivos(self, arquivos: list[Path]) -> None:
+        """
+        Soma linhas e bytes dos Parquets lidos pela consulta, a partir dos
+        metadados (sem ler os dados).
+        """
+        for arquivo in arquivos:
+            self.arquivos.append(str(arquivo))
+            self.linhas_lidas += pq.ParquetFile(arquivo).metadata.num_rows
+            self.bytes_lidos += Path(arquivo).stat().st_size
+
+    def coletar(self, lf: pl.LazyFrame) -> pl.DataFrame:
+        """
+        Executa o LazyFrame com `profile()`, guardando o plano otimizado e o
+        tempo de cada nó.
+        """
+        self.plano = lf.explain(optimized=True)
+
+        with self.etapa("coleta"):
+            df, nos = lf.profile()
+
+        self.nos = nos.to_dicts()
+        return df
+
+    def para_dict(self) -> dict:
+        return {
+            "etapas": self.etapas,
+            "segundos_total": sum(e["segundos"] for e in self.etapas),
+            "arquivos": self.arquivos,
+            "linhas_lidas": self.linhas_lidas,
+            "bytes_lidos": self.bytes_lidos,
+            "plano": self.plano,
+            "nos": self.nos,
+        }
+
+    def para_json(self, caminho: Path | None = None) -> str:
+        """
+        Serializa o perfil em JSON e, se `caminho` for dado, grava o arquivo.
+        """
+        conteudo = json.dumps(self.para_dict(), indent=2, ensure_ascii=False, default=str)
+
+        if caminho is not None:
+            Path(caminho).write_text(conteudo, encoding="utf-8")
+
+        return conteudo
+
+
+def medir(perfil: Perfil | None, nome: str, **detalhes):
+    """
+    `perfil.etapa(nome)` quando há perfil; caso contrário, não mede nada.
+    """
+    if perfil is None:
+        return nullcontext()
+    return perfil.etapa(nome, **detalhes)
@@ -0,0 +1,100 @@
+import logging
+import tempfile
+import polars as pl
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Callable
+from .load import garantir_arquivos
+from .aggregate import combinar_parciais
+
+logger = logging.getLogger(__name__)
+
+
+def estimar_memoria(arquivos: list[Path]) -> int:
+    """
+    Tamanho descomprimido dos Parquets, somado dos metadados dos row groups.
+    """
+    total = 0
+    for arquivo in arquivos:
+        metadata = pq.ParquetFile(arquivo).metadata
+        total += sum(
+            metadata.row_group(i).total_byte_size
+            for i in range(metadata.num_row_groups)
+        )
+    return total
+
+
+def _executar(lf: pl.LazyFrame, destino: Path | None) -> pl.DataFrame | Path:
+    if destino is not None:
+        lf.sink_parquet(destino)
+        return Path(destino)
+    return lf.collect(engine="streaming")
+
+
+def coletar_streaming(
+    consulta: Callable[[list[int]], pl.LazyFrame],
+    anos: list[int],
+    group_cols: list[str],
+    multiplicador: int = 100_000,
+    limite_memoria: int | None = None,
+    destino: Path | None = None
+) -> pl.DataFrame | Path:
+    """
+    Executa uma consulta agregada no motor de streaming do polars.
+
+    Se os dados dos anos pedidos couberem em `limite_memoria` (estimado pelo
+    tamanho descomprimido dos Parquets), a consulta roda numa só execução.
+    Caso contrário, roda ano a ano: cada agregado parcial vai para um
+    Parquet temporário e os parciais são somados no fim (ver
+    `combinar_parciais`), de modo que só um ano fica em memória por vez.
+
+    Parâmetros
+    ----------
+    consulta : Callable[[list[int]], pl.LazyFrame]
+        Monta o LazyFrame agregado (como `agregar`) para uma lista de anos.
+    anos : list[int]
+        Anos a incluir.
+    group_cols : list[str]
+        Colunas de agrupamento do resultado.
+    multiplicador : int, padrão 100.000
+        A constante pela qual multiplicar a taxa.
+    limite_memoria : int | None
+        Orçamento de memória em bytes (None: sem divisão por ano).
+    destino : Path | None
+        Se dado, o resultado é gravado neste Parquet em vez de devolvido.
+
+    Retorna
+    -------
+    pl.DataFrame | Path
+        O resultado, ou o caminho de `destino`.
+    """
+    if limite_memoria is None:
+        return _executar(consulta(anos), destino)
+
+    por_ano = {year: estimar_memoria(garantir_arquivos([year])) for year in anos}
+
+    if sum(por_ano.values()) <= limite_memoria:
+        return _executar(consulta(anos), destino)
+
+    for year, estimativa in por_ano.items():
+        if estimativa > limite_memoria:
+            logger.warning(
+                "SINASC %s alone exceeds the memory budget (%s > %s bytes)",
+                year, estimativa, limite_memoria,
+                extra={"ano": year}
+            )
+
+    pasta_tmp = Path(destino).parent if destino is not None else None
+    with tempfile.TemporaryDirectory(dir=pasta_tmp) as tmp:
+        partes = []
+        for year in anos:
+            parte = Path(tmp) / f"ano={year}.parquet"
+            consulta([year]).select(pl.exclude("^taxa_por_.*$")).sink_parquet(parte)
+            partes.append(parte)
+
+        lf = pl.scan_parquet(partes).pipe(
+            combinar_parciais,
+            group_cols=group_cols,
+            multiplicador=multiplicador
+        )
+        return _executar(lf, destino)
@@ -1,29 +1,94 @@
 import polars as pl
+from pathlib import Path
+from functools import partial
 
-from api.sinasc.load import carregar
-from api.sinasc.tempo import padronizar_tempo
+from api.sinasc.load import carregar, garantir_arquivos
+from api.sinasc.cache import CacheResultados, cache_padrao, impressao_digital
 from api.sinasc.indicadores import indicador_malformacao
-from api.sinasc.derive import derivar_variaveis
 from api.sinasc.aggregate import agregar
+from api.sinasc.parciais import agregar_incremental
+from api.sinasc.perfil import Perfil, medir
+from api.sinasc.streaming import coletar_streaming
 
 from api.analysis.spatial import juntar_com_geometria
 
 
+def _consulta(
+    anos: list[int],
+    cid,
+    group_cols: list[str],
+    multiplicador: int,
+    perfil: Perfil | None = None,
+    filtros: dict | None = None
+) -> pl.LazyFrame:
+    return (
+        carregar(anos, perfil=perfil, **(filtros or {}))
+        .pipe(indicador_malformacao, cid, anos)
+        .pipe(agregar, group_cols=group_cols, multiplicador=multiplicador)
+        .sort(group_cols)
+    )
+
+
 def obter_taxa_sinasc(
     anos: list[int],
-    cid: str | None = None,
+    cid: str | list[str] | dict[str, str | list[str]] | None = None,
     unidade_tempo: str = "ano",
     estratos: list[str] | None = None,
     multiplicador: int = 100_000,
-    retorno: str = "pandas"
+    retorno: str = "pandas",
+    cache: CacheResultados | bool = False,
+    incremental: bool = False,
+    perfil: Perfil | None = None,
+    motor: str = "memoria",
+    limite_memoria: int | None = None,
+    destino: str | Path | None = None,
+    ufs: list[str | int] | None = None,
+    municipios: list[str | int] | None = None,
+    meses: tuple[int, int] | int | None = None,
+    idade_mae: tuple[int, int] | int | None = None
 ):
     """
     Parâmetros
     ----------
+    cid :
+        Prefixo CID-10, lista de prefixos ou dicionário de grupos nomeados
+        (ver `indicador_malformacao`). Com vários CIDs, o resultado traz uma
+        coluna de casos e uma de taxa por CID, calculadas numa só leitura.
     retorno :
-        - 'pandas'    -> pandas.DataFrame
+        - 'pandas'    -> pandas.DataFrame (com dtypes do Arrow)
         - 'geopandas' -> geopandas.GeoDataFrame (se houver coluna de geometria)
         - 'polars'    -> polars.DataFrame
+        - 'lazy'      -> polars.LazyFrame ainda não executado, para compor
+                         filtros e joins que o polars leva até a leitura
+        - 'arrow'     -> pyarrow.Table, sem cópia dos dados
+    cache :
+        True (usa o cache da pasta padrão, `cache_padrao()`, cujos acertos e
+        falhas acumulam entre as chamadas) ou uma instância de
+        `CacheResultados`. O resultado agregado é reaproveitado enquanto os
+        parâmetros e os arquivos de origem dos anos pedidos não mudarem.
+    incremental :
+        Se True, monta o resultado a partir de agregados parciais por ano
+        (ver `agregar_incremental`), lendo apenas os anos novos ou alterados.
+    perfil :
+        Um `Perfil` a preencher com o tempo e a memória de cada etapa, os
+        arquivos lidos, o plano otimizado e a saída de `LazyFrame.profile()`.
+    motor :
+        - 'memoria'   -> executa com `collect()` no motor em memória
+        - 'streaming' -> usa o motor de streaming do polars (ver
+                         `coletar_streaming`)
+    limite_memoria :
+        Orçamento de memória em bytes para o motor de streaming; acima dele a
+        consulta é executada ano a ano.
+    destino :
+        Se dado, o resultado é gravado neste Parquet e a função devolve o
+        caminho em vez do DataFrame. Com motor='streaming' o resultado vai
+        direto para o arquivo, sem passar pela memória (com `cache`, o
+        arquivo é relido para guardar o resultado).
+    ufs, municipios, meses, idade_mae :
+        Restringem os nascimentos considerados (ver `filtrar_sinasc`): UFs
+        por código ou sigla, municípios por código IBGE, e intervalos
+        inclusivos de mês de nascimento e de idade da mãe. São aplicados
+        logo após a leitura, antes das variáveis derivadas.
     """
 
     if estratos is None:
@@ -32,30 +97,106 @@ def obter_taxa_sinasc(
     if unidade_tempo not in {"ano", "mes"}:
         raise ValueError("unidade_tempo deve ser 'ano' ou 'mes'")
 
-    group_cols = [unidade_tempo] + estratos
+    if motor not in {"memoria", "streaming"}:
+        raise ValueError("motor deve ser 'memoria' ou 'streaming'")
 
+    if retorno not in {"pandas", "geopandas", "polars", "lazy", "arrow"}:
+        raise ValueError("retorno deve ser 'pandas', 'geopandas', 'polars', 'lazy' ou 'arrow'")
 
-    # Pipeline principal
+    if retorno == "lazy" and destino is not None:
+        raise ValueError("destino não pode ser usado com retorno='lazy'")
 
-    lf = (
-        carregar(anos)
-        .pipe(padronizar_tempo)
-        .pipe(derivar_variaveis)
-        .pipe(indicador_malformacao, cid)
-        .pipe(agregar, group_cols=group_cols, multiplicador=multiplicador)
-        .sort(group_cols)
-    )
+    group_cols = [unidade_tempo] + estratos
 
-    df = lf.collect()
+    filtros = {
+        nome: valor
+        for nome, valor in {
+            "ufs": ufs,
+            "municipios": municipios,
+            "meses": meses,
+            "idade_mae": idade_mae,
+        }.items()
+        if valor is not None
+    }
+
+
+    if cache is True:
+        cache = cache_padrao()
+
+    df = None
+    if cache:
+        fontes = {
+            str(a): impressao_digital(a)
+            for a in garantir_arquivos(anos, perfil=perfil)
+        }
+        chave = cache.chave(
+            {
+                "anos": anos,
+                "cid": cid,
+                "unidade_tempo": unidade_tempo,
+                "estratos": estratos,
+                "multiplicador": multiplicador,
+                # Sem filtros, a chave continua a mesma de antes
+                **({"filtros": filtros} if filtros else {}),
+            },
+            fontes
+        )
+        with medir(perfil, "cache"):
+            df = cache.obter(chave)
+
+    if df is None:
+        if incremental:
+            with medir(perfil, "incremental"):
+                df = agregar_incremental(anos, cid, group_cols, multiplicador, filtros=filtros)
+        elif retorno == "lazy" and not cache:
+            # O motor (memória ou streaming) fica a cargo de quem coletar
+            return _consulta(anos, cid, group_cols, multiplicador, perfil=perfil, filtros=filtros)
+        elif motor == "streaming":
+            with medir(perfil, "streaming"):
+                resultado = coletar_streaming(
+                    partial(
+                        _consulta,
+                        cid=cid,
+                        group_cols=group_cols,
+                        multiplicador=multiplicador,
+                        filtros=filtros
+                    ),
+                    anos,
+                    group_cols,
+                    multiplicador=multiplicador,
+                    limite_memoria=limite_memoria,
+                    destino=destino
+                )
+
+            if destino is not None:
+                # O agregado é pequeno: relido do arquivo, vai também para o cache
+                if cache:
+                    cache.guardar(chave, pl.read_parquet(resultado), fontes)
+                return resultado
+            df = resultado
+        else:
+            # Pipeline principal
+
+            lf = _consulta(anos, cid, group_cols, multiplicador, perfil=perfil, filtros=filtros)
+
+            df = perfil.coletar(lf) if perfil is not None else lf.collect()
+
+        if cache:
+            cache.guardar(chave, df, fontes)
+
+    if destino is not None:
+        df.write_parquet(destino)
+        return Path(destino)
 
 
     if retorno == "polars":
         return df
 
-    df_pd = df.to_pandas()
+    if retorno == "lazy":
+        return df.lazy()
 
-    if retorno == "pandas":
-        return df_pd
+    if retorno == "arrow":
+        return df.to_arrow()
 
     if retorno == "geopandas":
         # Tenta identificar a coluna espacial nos estratos para passar para o join
@@ -71,6 +212,17 @@ def obter_taxa_sinasc(
         elif geo_col is None:
             geo_col = "codmunres"
             
-        return juntar_com_geometria(df_pd, coluna_codigo=geo_col)
-
-
+        # O join é feito direto do polars, sem passar antes pelo pandas
+        with medir(perfil, "geometria"):
+            return juntar_com_geometria(df, coluna_codigo=geo_col)
+
+    # Colunas apoiadas no Arrow: a conversão não copia os dados. Os
+    # estratos Enum/Categorical viram pd.Categorical, já que o dtype
+    # dictionary[pyarrow] quebra pivot e groupby no pandas
+    with medir(perfil, "to_pandas"):
+        df_pd = df.to_pandas(use_pyarrow_extension_array=True)
+        for col, tipo in df.schema.items():
+            if isinstance(tipo, (pl.Enum, pl.Categorical)):
+                df_pd[col] = df.get_column(col).to_pandas()
+
+    return df_pd
@@ -3,16 +3,22 @@ import polars as pl
 def padronizar_tempo(df: pl.LazyFrame) -> pl.LazyFrame:
     """
     Standardizes time-related variables.
+
+    Colunas já presentes no esquema canônico (DTNASC como Date, ano e mes)
+    são mantidas como estão, sem reprocessar as strings de data.
     """
-    return (
-        df
-        .with_columns(
+    schema = df.collect_schema()
+
+    if schema.get("DTNASC") != pl.Date:
+        df = df.with_columns(
             pl.col("DTNASC")
             .str.strptime(pl.Date, "%d%m%Y", strict=False)
-            .alias("birth_date")
-        )
-        .with_columns(
-            pl.col("birth_date").dt.year().alias("ano"),
-            pl.col("birth_date").dt.month().alias("mes"),
         )
-    )
\ No newline at end of file
+
+    colunas = [pl.col("DTNASC").alias("birth_date")]
+    if "ano" not in schema:
+        colunas.append(pl.col("DTNASC").dt.year().cast(pl.Int16).alias("ano"))
+    if "mes" not in schema:
+        colunas.append(pl.col("DTNASC").dt.month().cast(pl.Int8).alias("mes"))
+
+    return df.with_columns(colunas)
@@ -1,5 +1,170 @@
+import numpy as np
+import pandas as pd
+import shapely
+import mapclassify
 import geopandas as gpd
 import matplotlib.pyplot as plt
+from functools import lru_cache
+from matplotlib.path import Path
+from matplotlib.lines import Line2D
+from matplotlib.collections import PathCollection
+
+from api.analysis.vizinhanca import COLUNAS_CODIGO
+
+
+def caminhos_geometria(geometria: gpd.GeoSeries) -> list[Path]:
+    """
+    Um `Path` do matplotlib por geometria (Polygon ou MultiPolygon), com os
+    anéis de todos os polígonos e buracos num único caminho composto.
+
+    As coordenadas são extraídas de uma vez (`shapely.to_ragged_array`) e
+    cada caminho é uma fatia do mesmo array, sem cópia.
+    """
+    tipo, coords, offsets = shapely.to_ragged_array(np.asarray(geometria.values))
+    if tipo == shapely.GeometryType.POLYGON:
+        aneis, aneis_por_geometria = offsets
+    elif tipo == shapely.GeometryType.MULTIPOLYGON:
+        aneis, poligonos, geometrias = offsets
+        aneis_por_geometria = poligonos[geometrias]
+    else:
+        raise ValueError("A geometria deve ser de polígonos ou multipolígonos")
+
+    codigos = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    codigos[aneis[:-1]] = Path.MOVETO
+    codigos[aneis[1:] - 1] = Path.CLOSEPOLY
+
+    limites = aneis[aneis_por_geometria]
+    return [
+        Path(coords[inicio:fim], codigos[inicio:fim])
+        for inicio, fim in zip(limites[:-1], limites[1:])
+    ]
+
+
+class MapaMalha:
+    """
+    Geometria de uma malha pronta para mapas coropléticos.
+
+    Os caminhos dos polígonos, a extensão e o aspecto são calculados uma
+    única vez; cada mapa é uma `PathCollection` sobre esses mesmos
+    caminhos, da qual só as cores mudam de uma variável ou ano para outro
+    (ver `desenhar` e `colorir`). Os valores de cada mapa são alinhados às
+    linhas da malha pelo código (com `codigos`) ou pela posição.
+
+    Parâmetros
+    ----------
+    geometria : gpd.GeoSeries
+        A geometria da malha (uma linha por unidade).
+    codigos : array-like | None
+        Código de cada linha (ex.: 'code_muni'), para alinhar tabelas que
+        tragam só parte das unidades.
+    coluna_codigo : str | None
+        Nome da coluna de código nas tabelas a alinhar.
+    """
+
+    def __init__(self, geometria: gpd.GeoSeries, codigos=None, coluna_codigo: str | None = None):
+        self.caminhos = caminhos_geometria(geometria)
+        self.limites = geometria.total_bounds
+        self.codigos = pd.Index(codigos) if codigos is not None else None
+        self.coluna_codigo = coluna_codigo
+
+        # Mesmo aspecto que o geopandas usa para coordenadas geográficas
+        self.aspecto = "equal"
+        if geometria.crs is not None and geometria.crs.is_geographic:
+            y_medio = np.mean(self.limites[[1, 3]])
+            self.aspecto = 1 / np.cos(y_medio * np.pi / 180)
+
+    def __len__(self) -> int:
+        return len(self.caminhos)
+
+    def alinhar(self, gdf: pd.DataFrame, coluna: str) -> np.ndarray:
+        """
+        Valores de `coluna` na ordem das linhas da malha (NaN onde `gdf`
+        não tiver a unidade).
+        """
+        if self.codigos is not None and self.coluna_codigo in gdf.columns:
+            posicoes = self.codigos.get_indexer(gdf[self.coluna_codigo])
+            valores = np.full(len(self), np.nan, dtype=object if gdf[coluna].dtype == object else float)
+            valores[posicoes[posicoes >= 0]] = gdf[coluna].to_numpy()[posicoes >= 0]
+            return valores
+
+        if len(gdf) != len(self):
+            raise ValueError(
+                f"A tabela tem {len(gdf)} linhas e a malha {len(self)}; "
+                f"sem a coluna de código, as linhas devem ser as da malha"
+            )
+        return gdf[coluna].to_numpy()
+
+    def desenhar(
+        self,
+        ax,
+        cores: np.ndarray,
+        edgecolor: str = "black",
+        linewidth: float = 0.1
+    ) -> PathCollection:
+        """
+        Acrescenta ao `ax` uma `PathCollection` da malha com as cores de
+        preenchimento dadas (RGBA, uma por linha; alfa zero esconde a
+        unidade, inclusive a borda).
+        """
+        colecao = PathCollection(self.caminhos, edgecolors=edgecolor, linewidths=linewidth)
+        self.colorir(colecao, cores)
+
+        ax.add_collection(colecao, autolim=False)
+        x0, y0, x1, y1 = self.limites
+        ax.update_datalim([(x0, y0), (x1, y1)])
+        ax.autoscale_view()
+        ax.set_aspect(self.aspecto)
+        return colecao
+
+    @staticmethod
+    def colorir(colecao: PathCollection, cores: np.ndarray) -> None:
+        """
+        Troca as cores de uma `PathCollection` já desenhada, sem refazer os
+        caminhos.
+        """
+        cores = np.asarray(cores, dtype=float)
+        bordas = colecao.get_edgecolor()
+        if len(bordas) != len(cores):
+            bordas = np.broadcast_to(bordas[:1], cores.shape).copy()
+        bordas[:, 3] = np.where(cores[:, 3] > 0, 1.0, 0.0)
+
+        colecao.set_facecolor(cores)
+        colecao.set_edgecolor(bordas)
+
+
+@lru_cache(maxsize=8)
+def mapa_da_malha(ano: int = 2022, nivel: str = "municipio", simplificado: bool = True) -> MapaMalha:
+    """
+    O `MapaMalha` de uma malha do IBGE, montado uma vez por ano, nível e
+    simplificação.
+    """
+    from api.analysis.spatial import obter_geometria_municipios, obter_geometria_estados
+
+    ler = obter_geometria_municipios if nivel == "municipio" else obter_geometria_estados
+    coluna = COLUNAS_CODIGO[nivel]
+    malha = ler(ano=ano, simplificado=simplificado, colunas=[coluna])
+    return MapaMalha(malha.geometry, codigos=malha[coluna], coluna_codigo=coluna)
+
+
+def classificar(valores: np.ndarray, esquema: str = "quantiles", k: int = 4):
+    """
+    Classificação do mapclassify dos valores válidos (sem NaN), para
+    reaproveitar as mesmas classes em vários mapas.
+    """
+    valores = np.asarray(valores, dtype=float)
+    return mapclassify.classify(valores[np.isfinite(valores)], esquema, k=k)
+
+
+def _cores_classes(valores: np.ndarray, classes, cmap) -> np.ndarray:
+    # Cores como as do `gdf.plot(scheme=...)`: a classe i recebe
+    # cmap(i / (k - 1)); unidades sem valor ficam transparentes
+    valores = np.asarray(valores, dtype=float)
+    validos = np.isfinite(valores)
+    cores = np.zeros((len(valores), 4))
+    paleta = plt.get_cmap(cmap)(np.linspace(0, 1, len(classes.bins)))
+    cores[validos] = paleta[classes.find_bin(valores[validos])]
+    return cores
+
 
 def plotar_mapa_coropletico(
     gdf: gpd.GeoDataFrame,
@@ -7,11 +172,18 @@ def plotar_mapa_coropletico(
     ax,
     cmap: str = "Blues",
     titulo_legenda: str = "Quartis",
-    fmt: str = "{:.1f}"
+    fmt: str = "{:.1f}",
+    classes=None,
+    malha: MapaMalha | None = None
 ):
     """
     Plota um mapa coroplético estático usando quartis.
 
+    O resultado é o do `gdf.plot(scheme="quantiles", k=4)`, desenhado como
+    uma única `PathCollection` (ver `MapaMalha`). Com `malha` (de
+    `mapa_da_malha`, por exemplo), os caminhos dos polígonos são os já
+    montados para ela e não são refeitos a cada mapa.
+
     Parâmetros
     ----------
     gdf : geopandas.GeoDataFrame
@@ -26,15 +198,122 @@ def plotar_mapa_coropletico(
         Título da legenda do mapa.
     fmt : str, padrão "{:.1f}"
         Formato de string para os rótulos da legenda.
+    classes : mapclassify classifier | None
+        Classes a reaproveitar (o retorno de outro mapa ou de
+        `classificar`); None calcula os quartis de `coluna`.
+    malha : MapaMalha | None
+        Malha já montada (alinhada a `gdf` pelo código ou pela posição).
+
+    Retorna
+    -------
+    mapclassify classifier
+        As classes usadas, para repassar a outros mapas.
+    """
+    if malha is None:
+        malha = MapaMalha(gdf.geometry)
+    valores = malha.alinhar(gdf, coluna).astype(float)
+
+    if classes is None:
+        classes = classificar(valores)
+
+    malha.desenhar(ax, _cores_classes(valores, classes, cmap))
+
+    paleta = plt.get_cmap(cmap)(np.linspace(0, 1, len(classes.bins)))
+    marcadores = [
+        Line2D([0], [0], linestyle="none", marker="o", markersize=10, markerfacecolor=cor, markeredgewidth=0)
+        for cor in paleta
+    ]
+    rotulos = [c[1:-1] for c in classes.get_legend_classes(fmt)]
+    ax.legend(marcadores, rotulos, loc="lower right", title=titulo_legenda, numpoints=1)
+
+    return classes
+
+
+def plotar_mapa_categorico(
+    gdf: gpd.GeoDataFrame,
+    coluna: str,
+    ax,
+    cores: dict[str, str],
+    titulo_legenda: str | None = None,
+    edgecolor: str = "white",
+    malha: MapaMalha | None = None
+):
+    """
+    Plota um mapa de categorias (ex.: clusters LISA) com uma cor por
+    categoria, sobre os mesmos caminhos de `plotar_mapa_coropletico`.
+
+    Parâmetros
+    ----------
+    cores : dict[str, str]
+        Cor de cada categoria; unidades de outras categorias (ou sem valor)
+        não são desenhadas.
     """
-    gdf.plot(
-        column=coluna,
-        cmap=cmap,
-        scheme="quantiles",
-        k=4,
-        legend=True,
-        legend_kwds={'loc': 'lower right', 'title': titulo_legenda, 'fmt': fmt},
-        edgecolor='black',
-        linewidth=0.1,
-        ax=ax
-    )
\ No newline at end of file
+    from matplotlib.colors import to_rgba
+
+    if malha is None:
+        malha = MapaMalha(gdf.geometry)
+    valores = pd.Series(malha.alinhar(gdf, coluna))
+
+    rgba = {categoria: to_rgba(cor) for categoria, cor in cores.items()}
+    preenchimento = np.array([rgba.get(v, (0.0, 0.0, 0.0, 0.0)) for v in valores])
+    malha.desenhar(ax, preenchimento, edgecolor=edgecolor)
+
+    presentes = [c for c in cores if (valores == c).any()]
+    marcadores = [
+        Line2D([0], [0], linestyle="none", marker="o", markersize=10, markerfacecolor=rgba[c], markeredgewidth=0)
+        for c in presentes
+    ]
+    ax.legend(marcadores, presentes, loc="lower right", title=titulo_legenda, numpoints=1)
+
+
+def plotar_grade_mapas(
+    painel,
+    coluna: str,
+    anos: list[int] | None = None,
+    ncols: int = 3,
+    cmap: str = "Blues",
+    classes_comuns: bool = True,
+    titulo_legenda: str = "Quartis",
+    fmt: str = "{:.1f}",
+    tamanho: tuple[float, float] = (6, 6),
+    malha: MapaMalha | None = None
+):
+    """
+    Grade de mapas coropléticos (um por ano) de uma coluna de um
+    `PainelMunicipal`.
+
+    Os caminhos da malha são montados uma vez para a grade toda e cada
+    painel só recebe as suas cores; `malha` (na ordem das linhas do painel)
+    evita até essa montagem. Com `classes_comuns`, os quartis são os de
+    todos os anos juntos e as cores são comparáveis entre os painéis.
+
+    Retorna
+    -------
+    matplotlib.figure.Figure
+    """
+    anos = list(anos or painel.anos)
+    matriz = painel.matriz(coluna)[:, [painel.anos.index(ano) for ano in anos]]
+    if malha is None:
+        malha = MapaMalha(gpd.GeoSeries(painel.geometria, crs=painel.crs))
+
+    nrows = -(-len(anos) // ncols)
+    fig, axes = plt.subplots(
+        nrows, ncols, figsize=(tamanho[0] * ncols, tamanho[1] * nrows), squeeze=False
+    )
+
+    classes = classificar(matriz.ravel()) if classes_comuns else None
+    for i, ano in enumerate(anos):
+        ax = axes.flat[i]
+        gdf = pd.DataFrame({coluna: matriz[:, i]})
+        plotar_mapa_coropletico(
+            gdf, coluna, ax,
+            cmap=cmap, titulo_legenda=titulo_legenda, fmt=fmt,
+            classes=classes, malha=malha
+        )
+        ax.set_title(str(ano))
+        ax.axis("off")
+
+    for ax in axes.flat[len(anos):]:
+        ax.axis("off")
+
+    return fig
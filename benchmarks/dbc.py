@@ -0,0 +1,48 @@
+import os
+import time
+
+
+class ConversaoDBC:
+    """
+    Conversão DBC -> Parquet de um DNBR sintético com todos os campos, pelo
+    `dbc2parquet` do quadrosdesaude e pelo conversor nativo
+    (`api.sinasc.dbc.dbc_para_parquet`).
+    """
+    params = ["qds", "nativo"]
+    param_names = ["conversor"]
+    n = 200_000
+    timeout = 600
+
+    def setup_cache(self):
+        from benchmarks.sintetico import gerar_dnbr, gravar_dbc
+
+        caminho = os.path.abspath("DNBR2019.dbc")
+        gravar_dbc(gerar_dnbr(2019, self.n, completo=True), caminho)
+        return caminho
+
+    def _converter(self, caminho, conversor):
+        import quadrosdesaude as qds
+        from api.sinasc.config import TAMANHO_LOTE
+        from api.sinasc.dbc import dbc_para_parquet
+
+        destino = os.path.join(os.getcwd(), f"conversao_{conversor}")
+        os.makedirs(destino, exist_ok=True)
+        if conversor == "nativo":
+            dbc_para_parquet(caminho, os.path.join(destino, "DNBR2019.parquet"), TAMANHO_LOTE)
+        else:
+            qds.dbc2parquet(
+                caminho_dbc=caminho,
+                destino_parquet=destino,
+                pasta_temp_dbf=os.path.join(destino, "dbf"),
+                pasta_temp_parquet=os.path.join(destino, "parquet"),
+                tamanho_lote=TAMANHO_LOTE
+            )
+
+    def time_converter(self, caminho, conversor):
+        self._converter(caminho, conversor)
+
+    def track_registros_por_segundo(self, caminho, conversor):
+        inicio = time.perf_counter()
+        self._converter(caminho, conversor)
+        return self.n / (time.perf_counter() - inicio)
+    track_registros_por_segundo.unit = "registros/s"
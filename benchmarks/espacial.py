@@ -0,0 +1,40 @@
+import numpy as np
+import geopandas as gpd
+import libpysal
+from shapely.geometry import box
+
+
+def _grade(lado: int) -> libpysal.weights.W:
+    gdf = gpd.GeoDataFrame(geometry=[
+        box(i, j, i + 1, j + 1) for i in range(lado) for j in range(lado)
+    ])
+    w = libpysal.weights.Queen.from_dataframe(gdf, use_index=True, silence_warnings=True)
+    w.transform = "r"
+    return w
+
+
+class LisaVariasVariaveis:
+    """
+    LISA de várias variáveis (CID x ano) no motor compilado contra um
+    `esda.Moran_Local` por variável, numa grade do tamanho da malha municipal.
+    """
+    params = [1, 10]
+    param_names = ["variaveis"]
+    timeout = 600
+
+    def setup(self, variaveis):
+        from api.analysis.autocorrelacao import moran_local_matriz
+
+        self.w = _grade(75)
+        self.y = np.random.default_rng(0).gamma(2.0, 1.0, (self.w.n, variaveis))
+        # Compila os kernels fora da medição
+        moran_local_matriz(self.y[:10, :1], np.eye(10), permutacoes=9, semente=0)
+
+    def time_motor(self, variaveis):
+        from api.analysis.autocorrelacao import moran_local_matriz
+        moran_local_matriz(self.y, self.w, permutacoes=999, semente=0)
+
+    def time_esda(self, variaveis):
+        from esda.moran import Moran_Local
+        for c in range(self.y.shape[1]):
+            Moran_Local(self.y[:, c], self.w, permutations=999, seed=0)
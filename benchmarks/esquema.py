@@ -0,0 +1,42 @@
+import os
+
+
+class ConsultaPorEsquema:
+    """
+    Tempo por consulta de `obter_taxa_sinasc` lendo os DNBR{ano}.parquet
+    brutos (conversões a cada consulta) ou o armazenamento canônico.
+    """
+    params = (["bruto", "canonico"], [["REGIAO"], ["codmunres", "faixa_etaria_mae"]])
+    param_names = ["armazenamento", "estratos"]
+    anos = [2019, 2020]
+    n = 1_000_000
+    timeout = 600
+
+    def setup_cache(self):
+        from benchmarks.sintetico import gerar_dnbr
+
+        raiz = os.getcwd()
+        for armazenamento in self.params[0]:
+            os.chdir(os.path.join(raiz, armazenamento) if os.path.isdir(armazenamento) else self._criar(raiz, armazenamento))
+            from api.sinasc.config import PASTA_PARQUET
+            PASTA_PARQUET.mkdir(parents=True, exist_ok=True)
+            for ano in self.anos:
+                gerar_dnbr(ano, self.n).write_parquet(PASTA_PARQUET / f"DNBR{ano}.parquet")
+            if armazenamento == "canonico":
+                from api.sinasc.armazenamento import particionar
+                particionar(self.anos)
+        os.chdir(raiz)
+        return raiz
+
+    @staticmethod
+    def _criar(raiz, nome):
+        caminho = os.path.join(raiz, nome)
+        os.makedirs(caminho, exist_ok=True)
+        return caminho
+
+    def setup(self, raiz, armazenamento, estratos):
+        os.chdir(os.path.join(raiz, armazenamento))
+
+    def time_obter_taxa(self, raiz, armazenamento, estratos):
+        from api.sinasc import obter_taxa_sinasc
+        obter_taxa_sinasc(self.anos, cid="Q", estratos=estratos, retorno="polars")
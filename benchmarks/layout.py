@@ -0,0 +1,56 @@
+import os
+
+
+class LayoutOrdenado:
+    """
+    Tempo de consultas filtradas e tamanho em disco do armazenamento
+    canônico gravado na ordem da fonte ou ordenado por (CODMUNRES, DTNASC)
+    (ver `particionar(ordenado=True)`).
+    """
+    params = (
+        ["padrao", "ordenado"],
+        ["municipio", "municipio_mes", "uf"],
+    )
+    param_names = ["layout", "filtro"]
+    anos = [2019, 2020]
+    n = 1_000_000
+    timeout = 600
+
+    filtros = {
+        "municipio": {"municipios": [355030]},
+        "municipio_mes": {"municipios": [355030], "meses": (3, 4)},
+        "uf": {"ufs": ["RS"]},
+    }
+
+    def setup_cache(self):
+        from benchmarks.sintetico import gerar_dnbr
+
+        raiz = os.getcwd()
+        for layout in self.params[0]:
+            pasta = os.path.join(raiz, f"layout_{layout}")
+            os.makedirs(pasta, exist_ok=True)
+            os.chdir(pasta)
+            from api.sinasc.config import PASTA_PARQUET
+            from api.sinasc.armazenamento import particionar
+            PASTA_PARQUET.mkdir(parents=True, exist_ok=True)
+            for ano in self.anos:
+                gerar_dnbr(ano, self.n).write_parquet(PASTA_PARQUET / f"DNBR{ano}.parquet")
+            particionar(self.anos, ordenado=layout == "ordenado")
+        os.chdir(raiz)
+        return raiz
+
+    def setup(self, raiz, layout, filtro):
+        os.chdir(os.path.join(raiz, f"layout_{layout}"))
+
+    def time_carregar_filtrado(self, raiz, layout, filtro):
+        from api.sinasc.load import carregar
+        carregar(self.anos, **self.filtros[filtro]).collect()
+
+    def track_bytes(self, raiz, layout, filtro):
+        from api.sinasc.armazenamento import ler_manifesto
+        return sum(
+            a["bytes"]
+            for ano in ler_manifesto()["anos"].values()
+            for a in ano["arquivos"]
+        )
+    track_bytes.unit = "bytes"
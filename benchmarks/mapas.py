@@ -0,0 +1,70 @@
+import os
+
+
+class MapaMunicipal:
+    """
+    Mapa coroplético municipal (quartis) pelo `gdf.plot` do geopandas e pelo
+    `plotar_mapa_coropletico`, com e sem os caminhos já montados da malha;
+    e uma grade de quatro anos com as classes comuns.
+    """
+    params = ["geopandas", "coletivo", "malha_pronta"]
+    param_names = ["renderizador"]
+    anos = [2019, 2020, 2021, 2022]
+    n = 400_000
+    coluna = "taxa_por_100000"
+    timeout = 600
+
+    def setup_cache(self):
+        from benchmarks.sintetico import gravar_dnbr, importar_malhas_sinteticas
+        from api.sinasc.config import PASTA_PARQUET
+        from api.analysis.config import PASTA_MALHAS
+
+        for ano in self.anos:
+            gravar_dnbr(ano, self.n // len(self.anos), pasta=PASTA_PARQUET)
+        importar_malhas_sinteticas([2022], pasta=PASTA_MALHAS)
+        return os.getcwd()
+
+    def setup(self, raiz, renderizador):
+        import matplotlib
+        matplotlib.use("Agg")
+        from api.sinasc import obter_painel_municipal
+        from api.viz.maps import mapa_da_malha
+
+        os.chdir(raiz)
+        self.painel = obter_painel_municipal(self.anos, cid="Q")
+        gdf = self.painel.ano(self.anos[-1])
+        self.gdf = gdf[gdf[self.coluna].notna()]
+        self.malha = mapa_da_malha(2022) if renderizador == "malha_pronta" else None
+
+    def teardown(self, raiz, renderizador):
+        import matplotlib.pyplot as plt
+        plt.close("all")
+
+    def time_mapa(self, raiz, renderizador):
+        import matplotlib.pyplot as plt
+        from api.viz.maps import plotar_mapa_coropletico
+
+        fig, ax = plt.subplots(figsize=(8, 8))
+        if renderizador == "geopandas":
+            self.gdf.plot(
+                column=self.coluna, cmap="Blues", scheme="quantiles", k=4, legend=True,
+                edgecolor="black", linewidth=0.1, ax=ax
+            )
+        else:
+            plotar_mapa_coropletico(self.gdf, self.coluna, ax, malha=self.malha)
+        fig.canvas.draw()
+
+    def time_grade(self, raiz, renderizador):
+        import matplotlib.pyplot as plt
+        from api.viz.maps import plotar_grade_mapas
+
+        if renderizador == "geopandas":
+            fig, axes = plt.subplots(2, 2, figsize=(12, 12))
+            for ax, (ano, gdf) in zip(axes.flat, self.painel):
+                gdf.plot(
+                    column=self.coluna, cmap="Blues", scheme="quantiles", k=4, legend=True,
+                    edgecolor="black", linewidth=0.1, ax=ax
+                )
+        else:
+            fig = plotar_grade_mapas(self.painel, self.coluna, ncols=2)
+        fig.canvas.draw()
@@ -0,0 +1,141 @@
+import os
+
+# Total de registros (divididos entre os anos) e anos de cada armazenamento
+LINHAS = [1_000_000, 10_000_000, 50_000_000]
+ANOS = list(range(2015, 2025))
+ANO_ESPACIAL = 2024
+COLUNA_TAXA = "taxa_por_100000"
+
+
+def _preparar(raiz: str) -> str:
+    """
+    Cria (uma vez) uma pasta por tamanho com os DNBR{ano}.parquet sintéticos,
+    as malhas sintéticas de 2022 e a tabela larga do painel municipal, que
+    os benchmarks de tendência e espaciais leem prontos.
+    """
+    from benchmarks.sintetico import gravar_dnbr, importar_malhas_sinteticas
+
+    raiz = os.path.abspath(raiz)
+    for linhas in LINHAS:
+        pasta = os.path.join(raiz, f"sinasc_{linhas}")
+        os.makedirs(pasta, exist_ok=True)
+        os.chdir(pasta)
+        if os.path.exists("painel.parquet"):
+            continue
+
+        from api.sinasc.config import PASTA_PARQUET
+        from api.analysis.config import PASTA_MALHAS
+
+        for ano in ANOS:
+            gravar_dnbr(ano, linhas // len(ANOS), pasta=PASTA_PARQUET)
+        importar_malhas_sinteticas([2022], pasta=PASTA_MALHAS)
+
+        from api.sinasc import obter_painel_municipal
+        largo = obter_painel_municipal(ANOS, cid="Q").largo(COLUNA_TAXA)
+        largo.rename(columns=str).to_parquet("painel.parquet")
+
+    os.chdir(raiz)
+    return raiz
+
+
+class Carga:
+    """
+    Leitura e agregação do SINASC sintético, sem o cache de resultados.
+    """
+    params = LINHAS
+    param_names = ["linhas"]
+    timeout = 1800
+
+    def setup_cache(self):
+        return _preparar(os.getcwd())
+
+    def setup(self, raiz, linhas):
+        os.chdir(os.path.join(raiz, f"sinasc_{linhas}"))
+
+    def time_carregar(self, raiz, linhas):
+        from api.sinasc.load import carregar
+        carregar(ANOS).select("ano", "mes", "codmunres", "faixa_etaria_mae", "CODANOMAL").collect()
+
+    def time_agregar(self, raiz, linhas):
+        from api.sinasc.load import carregar
+        from api.sinasc.aggregate import agregar
+        from api.sinasc.indicadores import indicador_malformacao
+        (
+            carregar(ANOS)
+            .pipe(indicador_malformacao, "Q", ANOS)
+            .pipe(agregar, group_cols=["ano", "codmunres"])
+            .collect()
+        )
+
+    def peakmem_agregar(self, raiz, linhas):
+        self.time_agregar(raiz, linhas)
+
+
+class TaxaPorRetorno:
+    """
+    `obter_taxa_sinasc` por município em cada modo de `retorno`.
+    """
+    params = (LINHAS, ["polars", "pandas", "geopandas", "lazy", "arrow"])
+    param_names = ["linhas", "retorno"]
+    timeout = 1800
+
+    def setup_cache(self):
+        return _preparar(os.getcwd())
+
+    def setup(self, raiz, linhas, retorno):
+        os.chdir(os.path.join(raiz, f"sinasc_{linhas}"))
+
+    def time_obter_taxa(self, raiz, linhas, retorno):
+        from api.sinasc import obter_taxa_sinasc
+        resultado = obter_taxa_sinasc(ANOS, cid="Q", estratos=["codmunres"], retorno=retorno)
+        if retorno == "lazy":
+            resultado.collect()
+
+
+class AnaliseMunicipal:
+    """
+    Tendências (10 anos) e análise espacial (um ano) sobre o painel
+    municipal agregado do SINASC sintético.
+    """
+    params = LINHAS
+    param_names = ["linhas"]
+    timeout = 1800
+
+    def setup_cache(self):
+        return _preparar(os.getcwd())
+
+    def setup(self, raiz, linhas):
+        import geopandas as gpd
+        from api.analysis.spatial import criar_matriz_vizinhanca
+
+        os.chdir(os.path.join(raiz, f"sinasc_{linhas}"))
+        largo = gpd.read_parquet("painel.parquet")
+        largo.columns = [int(c) if c.isdigit() else c for c in largo.columns]
+
+        self.tabela = largo.set_index("code_muni")[ANOS].dropna()
+        self.gdf = largo[largo[ANO_ESPACIAL].notna()].rename(columns={ANO_ESPACIAL: COLUNA_TAXA})
+        self.w = criar_matriz_vizinhanca(self.gdf, metodo="queen", ano_malha=2022)
+
+    def time_regressao_linear(self, raiz, linhas):
+        from api.analysis.trends import calcular_regressao_linear
+        calcular_regressao_linear(self.tabela)
+
+    def time_mann_kendall(self, raiz, linhas):
+        from api.analysis.trends import calcular_mann_kendall
+        calcular_mann_kendall(self.tabela)
+
+    def time_vizinhanca_geometria(self, raiz, linhas):
+        from api.analysis.spatial import criar_matriz_vizinhanca
+        criar_matriz_vizinhanca(self.gdf, metodo="queen")
+
+    def time_vizinhanca_cache(self, raiz, linhas):
+        from api.analysis.spatial import criar_matriz_vizinhanca
+        criar_matriz_vizinhanca(self.gdf, metodo="queen", ano_malha=2022)
+
+    def time_moran_global(self, raiz, linhas):
+        from api.analysis.spatial import calcular_moran_global
+        calcular_moran_global(self.gdf, COLUNA_TAXA, self.w, semente=0)
+
+    def time_lisa(self, raiz, linhas):
+        from api.analysis.spatial import calcular_lisa_local
+        calcular_lisa_local(self.gdf, COLUNA_TAXA, self.w, semente=0)
@@ -0,0 +1,51 @@
+import os
+import asyncio
+
+
+async def _pedir(app, caminho: str, query: bytes) -> int:
+    mensagens = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    await app({"type": "http", "method": "GET", "path": caminho, "query_string": query}, receive, send)
+    return mensagens[0]["status"]
+
+
+class ConsultaServico:
+    """
+    Latência de uma consulta municipal ao `ServicoSinasc`: com os anos ainda
+    por carregar, com os dados já em memória e repetida (cache de respostas).
+    """
+    params = ["fria", "quente", "cache"]
+    param_names = ["estado"]
+    anos = [2019, 2020]
+    n = 1_000_000
+    timeout = 600
+    query = b"anos=2019-2020&cid=Q&estratos=codmunres&formato=arrow"
+
+    def setup_cache(self):
+        from benchmarks.sintetico import gravar_dnbr, importar_malhas_sinteticas
+        from api.sinasc.config import PASTA_PARQUET
+        from api.analysis.config import PASTA_MALHAS
+
+        for ano in self.anos:
+            gravar_dnbr(ano, self.n, pasta=PASTA_PARQUET)
+        importar_malhas_sinteticas([2022], pasta=PASTA_MALHAS)
+        return os.getcwd()
+
+    def setup(self, raiz, estado):
+        from api.servico import ServicoSinasc
+
+        os.chdir(raiz)
+        self.app = ServicoSinasc(anos=self.anos)
+        if estado != "fria":
+            self.app.aquecer()
+        if estado == "cache":
+            asyncio.run(_pedir(self.app, "/taxas", self.query))
+
+    def time_consulta(self, raiz, estado):
+        asyncio.run(_pedir(self.app, "/taxas", self.query))
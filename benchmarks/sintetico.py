@@ -0,0 +1,411 @@
+import numpy as np
+import polars as pl
+import geopandas as gpd
+import pyarrow.parquet as pq
+from pathlib import Path
+from functools import lru_cache
+from shapely.geometry import box
+from api.sinasc.config import PASTA_PARQUET
+from api.sinasc.dictionaries import (
+    DE_UF_CODIGO_PARA_SIGLA,
+    DE_UF_SIGLA_PARA_NOME,
+    DE_UF_SIGLA_PARA_REGIAO,
+    REGIOES,
+)
+
+# Por UF: número de municípios, nascidos vivos por ano (aprox., em
+# milhares) e código da capital, que concentra a maior parte dos nascimentos
+UFS_SINTETICAS = {
+    "11": (52, 27, 110020), "12": (22, 16, 120040), "13": (62, 77, 130260),
+    "14": (15, 12, 140010), "15": (144, 135, 150140), "16": (16, 14, 160030),
+    "17": (139, 25, 172100), "21": (217, 110, 211130), "22": (224, 48, 221100),
+    "23": (184, 125, 230440), "24": (167, 45, 240810), "25": (223, 57, 250750),
+    "26": (185, 135, 261160), "27": (102, 50, 270430), "28": (75, 33, 280030),
+    "29": (417, 200, 292740), "31": (853, 260, 310620), "32": (78, 55, 320530),
+    "33": (92, 210, 330455), "35": (645, 590, 355030), "41": (399, 155, 410690),
+    "42": (295, 100, 420540), "43": (497, 135, 431490), "50": (79, 45, 500270),
+    "51": (141, 58, 510340), "52": (246, 100, 520870), "53": (1, 40, 530010),
+}
+
+# Códigos CID-10 frequentes em CODANOMAL e seus pesos relativos
+CODIGOS_ANOMALIA = {
+    "Q699": 18, "Q668": 8, "Q660": 5, "Q359": 3, "Q369": 3, "Q379": 4,
+    "Q000": 2, "Q059": 3, "Q039": 4, "Q02": 2, "Q210": 2, "Q249": 3,
+    "Q909": 5, "Q549": 4, "Q539": 3, "Q170": 4, "Q828": 3, "Q793": 2,
+    "Q792": 2, "Q899": 3, "Q897": 2, "D180": 4, "Q381": 2, "Q27": 1,
+}
+
+# Quantos códigos um CODANOMAL preenchido traz (1 a 4)
+_CODIGOS_POR_REGISTRO = [0.75, 0.18, 0.05, 0.02]
+
+# Colunas categóricas do DNBR (completo) e seus valores possíveis
+_CATEGORICAS = {
+    "ORIGEM": (["1"], None),
+    "LOCNASC": (["1", "2", "3", "4", "5"], [0.98, 0.007, 0.008, 0.004, 0.001]),
+    "ESTCIVMAE": (["1", "2", "3", "4", "5", "9"], [0.3, 0.3, 0.01, 0.02, 0.35, 0.02]),
+    "ESCMAE": (["1", "2", "3", "4", "5", "9"], [0.01, 0.05, 0.2, 0.55, 0.17, 0.02]),
+    "GESTACAO": (["1", "2", "3", "4", "5", "6", "9"], [0.002, 0.008, 0.02, 0.08, 0.85, 0.03, 0.01]),
+    "GRAVIDEZ": (["1", "2", "3", "9"], [0.975, 0.02, 0.001, 0.004]),
+    "PARTO": (["1", "2", "9"], [0.43, 0.568, 0.002]),
+    "CONSULTAS": (["1", "2", "3", "4", "9"], [0.02, 0.06, 0.18, 0.72, 0.02]),
+    "SEXO": (["1", "2", "0"], [0.511, 0.488, 0.001]),
+    "RACACOR": (["1", "2", "3", "4", "5"], [0.35, 0.06, 0.005, 0.58, 0.005]),
+    "ESCMAE2010": (["0", "1", "2", "3", "4", "5", "9"], [0.005, 0.03, 0.14, 0.55, 0.08, 0.18, 0.015]),
+    "RACACORMAE": (["1", "2", "3", "4", "5"], [0.35, 0.07, 0.005, 0.57, 0.005]),
+    "TPMETESTIM": (["1", "2", "9"], [0.6, 0.38, 0.02]),
+    "TPAPRESENT": (["1", "2", "3", "9"], [0.94, 0.04, 0.005, 0.015]),
+    "STTRABPART": (["1", "2", "3", "9"], [0.2, 0.5, 0.25, 0.05]),
+    "STCESPARTO": (["1", "2", "3", "9"], [0.6, 0.2, 0.15, 0.05]),
+    "TPNASCASSI": (["1", "2", "3", "4", "9"], [0.75, 0.22, 0.01, 0.01, 0.01]),
+    "TPFUNCRESP": (["1", "2", "3", "4", "5"], [0.2, 0.7, 0.02, 0.06, 0.02]),
+    "TPDOCRESP": (["1", "2", "3", "4", "5"], [0.1, 0.2, 0.1, 0.5, 0.1]),
+    "STDNEPIDEM": (["0", "1"], [0.99, 0.01]),
+    "STDNNOVA": (["1"], None),
+    "CODPAISRES": (["1"], None),
+    "TPROBSON": ([str(g) for g in range(1, 11)], None),
+    "PARIDADE": (["0", "1"], [0.4, 0.6]),
+    "KOTELCHUCK": (["1", "2", "3", "4", "5", "9"], [0.05, 0.1, 0.2, 0.4, 0.2, 0.05]),
+}
+
+# Colunas reais do DNBR (a partir de 2011) que não têm gerador próprio:
+# gravadas vazias, como vêm nos anos em que não são preenchidas
+_VAZIAS = ["CODCART", "NUMREGCART", "DTREGCART", "SERIESCMAE", "ESCMAEAGR1", "DTDECLARAC"]
+
+
+def digito_verificador(codigos: np.ndarray) -> np.ndarray:
+    """
+    Dígito verificador dos códigos de município de 6 dígitos do IBGE.
+    """
+    codigos = np.asarray(codigos, dtype=np.int64)
+    digitos = (codigos // 10 ** np.arange(5, -1, -1)[:, None]) % 10
+    produtos = digitos * np.array([1, 2, 1, 2, 1, 2])[:, None]
+    soma = (produtos // 10 + produtos % 10).sum(axis=0)
+    return (10 - soma % 10) % 10
+
+
+@lru_cache(maxsize=1)
+def municipios_sinteticos() -> pl.DataFrame:
+    """
+    Municípios sintéticos (código de 6 dígitos, UF e peso nos nascimentos).
+
+    São 5.570 municípios, com a contagem real de cada UF; os códigos das
+    capitais são os reais e os demais seguem a UF (UU0010, UU0020...). Os
+    nascimentos de cada UF se concentram na capital e decaem com o posto
+    do município (lei de Zipf), como na distribuição real.
+    """
+    rng = np.random.default_rng(0)
+    codigos, ufs, pesos = [], [], []
+
+    for uf, (n, nascimentos, capital) in UFS_SINTETICAS.items():
+        outros = [c for c in int(uf) * 10_000 + 10 * np.arange(1, n + 1) if c != capital][:n - 1]
+        postos = np.concatenate([[1], rng.permutation(np.arange(2, n + 1))])
+        peso = 1.0 / postos ** 1.1
+        codigos += [capital, *outros]
+        ufs += [uf] * n
+        pesos += list(nascimentos * peso / peso.sum())
+
+    return pl.DataFrame({
+        "codigo": np.array(codigos, dtype=np.int32),
+        "codufres": ufs,
+        "peso": np.array(pesos) / np.sum(pesos),
+    }).sort("codigo")
+
+
+def _escolher(rng, valores: list[str], n: int, p=None) -> pl.Series:
+    return pl.Series(valores, dtype=pl.Utf8).gather(rng.choice(len(valores), n, p=p))
+
+
+def _numeros(valores: np.ndarray, largura: int) -> pl.Series:
+    return pl.Series(valores).cast(pl.Utf8).str.zfill(largura)
+
+
+def _vazias(n: int) -> pl.Series:
+    return pl.repeat("", n, dtype=pl.Utf8, eager=True)
+
+
+def _codanomal(rng, idanomal: np.ndarray) -> pl.Series:
+    """
+    CODANOMAL: códigos CID-10 concatenados sem separador (ex: "Q699Q381")
+    nos registros com IDANOMAL = "1"; vazio nos demais.
+    """
+    n = len(idanomal)
+    com_anomalia = np.flatnonzero(idanomal == "1")
+    # Uma pequena parte dos registros com anomalia não informa o código
+    com_anomalia = com_anomalia[rng.random(len(com_anomalia)) > 0.03]
+
+    codigos = list(CODIGOS_ANOMALIA)
+    pesos = np.array(list(CODIGOS_ANOMALIA.values()), dtype=float)
+    quantidades = rng.choice(4, len(com_anomalia), p=_CODIGOS_POR_REGISTRO) + 1
+    sorteados = rng.choice(len(codigos), (len(com_anomalia), 4), p=pesos / pesos.sum())
+
+    sorteios = pl.DataFrame({
+        "quantidade": quantidades,
+        **{f"codigo_{k}": pl.Series(codigos).gather(sorteados[:, k]) for k in range(4)},
+    })
+    preenchidos = sorteios.select(pl.concat_str(
+        [pl.when(pl.col("quantidade") > k).then(pl.col(f"codigo_{k}")) for k in range(4)],
+        ignore_nulls=True
+    )).to_series()
+
+    return _vazias(n).scatter(com_anomalia, preenchidos).alias("CODANOMAL")
+
+
+def gerar_dnbr(ano: int, n: int, semente: int = 0, completo: bool = False) -> pl.DataFrame:
+    """
+    Gera um DNBR{ano} sintético, com todas as colunas como texto, como saem
+    da conversão DBC -> Parquet.
+
+    Os formatos seguem os arquivos reais: CODMUNRES com 6 dígitos,
+    distribuído entre os municípios de `municipios_sinteticos`; DTNASC como
+    DDMMAAAA, com sazonalidade; IDADEMAE com 2 dígitos; IDANOMAL 1/2/9 e
+    CODANOMAL com um ou mais códigos concatenados.
+
+    Parâmetros
+    ----------
+    ano : int
+        Ano dos nascimentos.
+    n : int
+        Número de registros.
+    semente : int, padrão 0
+        Semente do sorteio; o mesmo (ano, n, semente) gera o mesmo arquivo.
+    completo : bool, padrão False
+        Se True, gera também as demais colunas do DNBR (estabelecimento,
+        parto, peso, Apgar...); senão, só as usadas pelo pipeline.
+
+    Retorna
+    -------
+    pl.DataFrame
+    """
+    return _gerar(np.random.default_rng([semente, ano]), ano, n, completo)
+
+
+def _gerar(rng: np.random.Generator, ano: int, n: int, completo: bool) -> pl.DataFrame:
+    municipios = municipios_sinteticos()
+
+    codmunres = municipios["codigo"].to_numpy()[
+        rng.choice(municipios.height, n, p=municipios["peso"].to_numpy())
+    ]
+
+    dias_no_ano = 366 if ano % 4 == 0 and (ano % 100 != 0 or ano % 400 == 0) else 365
+    dia = np.arange(dias_no_ano)
+    # Mais nascimentos entre março e maio
+    sazonalidade = 1 + 0.08 * np.cos(2 * np.pi * (dia - 100) / dias_no_ano)
+    dtnasc = (
+        np.datetime64(f"{ano}-01-01")
+        + rng.choice(dias_no_ano, n, p=sazonalidade / sazonalidade.sum())
+    )
+
+    idademae = np.clip(np.round(rng.normal(27, 6.5, n)), 10, 55).astype(np.int64)
+    idanomal = rng.choice(np.array(["1", "2", "9"]), n, p=[0.009, 0.971, 0.02])
+
+    df = pl.DataFrame({
+        "CODMUNRES": pl.Series(codmunres).cast(pl.Utf8),
+        "DTNASC": pl.Series(dtnasc).dt.strftime("%d%m%Y"),
+        "IDADEMAE": _numeros(idademae, 2),
+        "IDANOMAL": pl.Series(idanomal, dtype=pl.Utf8),
+        "CODANOMAL": _codanomal(rng, idanomal),
+    })
+
+    if not completo:
+        return df
+
+    outras = {nome: _escolher(rng, valores, n, p) for nome, (valores, p) in _CATEGORICAS.items()}
+    peso = np.clip(rng.normal(3200, 550, n), 300, 6000).astype(np.int64)
+    semanas = np.clip(np.round(rng.normal(38.5, 2.0, n)), 22, 44).astype(np.int64)
+    cadastro = dtnasc + rng.integers(1, 60, n)
+
+    outras.update({
+        "CODESTAB": _numeros(rng.integers(2_000_000, 9_999_999, n), 7),
+        # A maioria nasce no município de residência
+        "CODMUNNASC": pl.Series(np.where(
+            rng.random(n) < 0.85, codmunres, municipios["codigo"].to_numpy()[rng.integers(0, municipios.height, n)]
+        )).cast(pl.Utf8),
+        "CODOCUPMAE": _numeros(rng.integers(100_000, 999_999, n), 6),
+        "QTDFILVIVO": _numeros(rng.poisson(0.9, n), 2),
+        "QTDFILMORT": _numeros(rng.poisson(0.15, n), 2),
+        "HORANASC": pl.Series(rng.integers(0, 24, n)).cast(pl.Utf8).str.zfill(2)
+        + pl.Series(rng.integers(0, 60, n)).cast(pl.Utf8).str.zfill(2),
+        "APGAR1": _numeros(np.clip(rng.normal(8.2, 1.2, n), 0, 10).astype(np.int64), 2),
+        "APGAR5": _numeros(np.clip(rng.normal(9.2, 0.8, n), 0, 10).astype(np.int64), 2),
+        "PESO": _numeros(peso, 4),
+        "DTCADASTRO": pl.Series(cadastro).dt.strftime("%d%m%Y"),
+        "NUMEROLOTE": _numeros(rng.integers(1, 99_999_999, n), 8),
+        "VERSAOSIST": _escolher(rng, ["3.2.01", "3.2.02", "3.2.03"], n),
+        "DTRECEBIM": pl.Series(cadastro + rng.integers(0, 30, n)).dt.strftime("%d%m%Y"),
+        "DIFDATA": _numeros(rng.integers(1, 90, n), 3),
+        "DTRECORIGA": _vazias(n),
+        "NATURALMAE": _numeros(800 + rng.integers(11, 53, n), 3),
+        "CODMUNNATU": pl.Series(municipios["codigo"].to_numpy()[rng.integers(0, municipios.height, n)]).cast(pl.Utf8),
+        "CODUFNATU": _escolher(rng, list(UFS_SINTETICAS), n),
+        "DTNASCMAE": pl.Series(dtnasc - 365 * idademae - rng.integers(0, 365, n)).dt.strftime("%d%m%Y"),
+        "QTDGESTANT": _numeros(rng.poisson(1.1, n), 2),
+        "QTDPARTNOR": _numeros(rng.poisson(0.5, n), 2),
+        "QTDPARTCES": _numeros(rng.poisson(0.5, n), 2),
+        "IDADEPAI": _numeros(np.clip(np.round(rng.normal(30, 7, n)), 14, 80).astype(np.int64), 2),
+        "DTULTMENST": pl.Series(dtnasc - 7 * semanas).dt.strftime("%d%m%Y"),
+        "SEMAGESTAC": _numeros(semanas, 2),
+        "CONSPRENAT": _numeros(rng.poisson(8, n), 2),
+        "MESPRENAT": _numeros(rng.integers(1, 6, n), 2),
+        "CONTADOR": pl.Series(np.arange(1, n + 1)).cast(pl.Utf8),
+        **{nome: _vazias(n) for nome in _VAZIAS},
+    })
+
+    return df.with_columns(**outras)
+
+
+def gravar_dnbr(
+    ano: int,
+    n: int,
+    pasta: Path = PASTA_PARQUET,
+    tamanho_lote: int = 1_000_000,
+    semente: int = 0,
+    completo: bool = False
+) -> Path:
+    """
+    Grava um DNBR{ano}.parquet sintético em `pasta`, gerado e gravado em
+    lotes de `tamanho_lote` registros (memória limitada para n grande).
+
+    Retorna
+    -------
+    Path
+        O arquivo gravado.
+    """
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    destino = pasta / f"DNBR{ano}.parquet"
+    tmp = destino.with_name(f"{destino.name}.tmp")
+
+    writer = None
+    try:
+        for lote, inicio in enumerate(range(0, n, tamanho_lote)):
+            rng = np.random.default_rng([semente, ano, lote])
+            tabela = _gerar(rng, ano, min(tamanho_lote, n - inicio), completo).to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, tabela.schema)
+            writer.write_table(tabela)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    tmp.replace(destino)
+    return destino
+
+
+def _bits_little_endian(valores: np.ndarray, n_bits: int) -> np.ndarray:
+    return ((valores[:, None] >> np.arange(n_bits)) & 1).astype(np.uint8)
+
+
+def gravar_dbc(df: pl.DataFrame, caminho) -> None:
+    """
+    Grava `df` (colunas de texto) como um .dbc do DATASUS: o cabeçalho do
+    DBF, 4 bytes de CRC (não conferidos) e os registros comprimidos no
+    formato PKWARE implode, aqui só com literais não codificados seguidos
+    do código de fim (o que basta para o descompressor).
+    """
+    if any(len(c) > 10 for c in df.columns):
+        raise ValueError("Nomes de campo do DBF têm no máximo 10 caracteres")
+
+    larguras = [max(1, int(df[c].str.len_bytes().max() or 0)) for c in df.columns]
+    n = df.height
+
+    cabecalho = bytearray(32)
+    cabecalho[0] = 0x03
+    cabecalho[4:8] = n.to_bytes(4, "little")
+    cabecalho[8:10] = (32 + 32 * len(df.columns) + 1).to_bytes(2, "little")
+    cabecalho[10:12] = (1 + sum(larguras)).to_bytes(2, "little")
+    for coluna, largura in zip(df.columns, larguras):
+        campo = bytearray(32)
+        campo[:len(coluna)] = coluna.encode("latin1")
+        campo[11:12] = b"C"
+        campo[16] = largura
+        cabecalho += campo
+    cabecalho += b"\r"
+
+    registros = np.full((n, 1 + sum(larguras)), 0x20, dtype=np.uint8)
+    posicao = 1
+    for coluna, largura in zip(df.columns, larguras):
+        valores = np.char.encode(df[coluna].fill_null("").to_numpy().astype(str), "latin1")
+        bloco = valores.astype(f"S{largura}").view(np.uint8).reshape(n, largura)
+        registros[:, posicao:posicao + largura] = np.where(bloco == 0, 0x20, bloco)
+        posicao += largura
+    dados = np.append(registros.ravel(), np.uint8(0x1A))
+
+    # Cada literal: bit 0 e os 8 bits do byte; fim: bit 1, o código do
+    # comprimento 519 (sete bits 0, invertidos) e 8 bits extras 1
+    literais = np.hstack([np.zeros((len(dados), 1), np.uint8), _bits_little_endian(dados, 8)])
+    fim = np.array([1] + [0] * 7 + [1] * 8, dtype=np.uint8)
+    fluxo = np.packbits(np.concatenate([literais.ravel(), fim]), bitorder="little")
+
+    with open(caminho, "wb") as f:
+        f.write(bytes(cabecalho))
+        f.write(b"\0\0\0\0")
+        f.write(bytes([0, 6]))
+        f.write(fluxo.tobytes())
+
+
+def gerar_malha_municipios(lado: float = 0.5) -> gpd.GeoDataFrame:
+    """
+    Malha municipal sintética com as colunas do geobr, uma célula quadrada
+    por município de `municipios_sinteticos`.
+
+    As células preenchem, linha a linha e na ordem dos códigos, uma grade
+    quadrada sobre o Brasil; cada UF fica numa faixa contígua, vizinha das
+    UFs de códigos próximos.
+    """
+    municipios = municipios_sinteticos()
+    n = municipios.height
+    colunas = int(np.ceil(np.sqrt(n)))
+    i = np.arange(n)
+    x = -74.0 + (i % colunas) * lado
+    y = 5.0 - (i // colunas + 1) * lado
+
+    codigos = municipios["codigo"].to_numpy()
+    siglas = [DE_UF_CODIGO_PARA_SIGLA[uf] for uf in municipios["codufres"]]
+    regioes = [DE_UF_SIGLA_PARA_REGIAO[s] for s in siglas]
+
+    return gpd.GeoDataFrame(
+        {
+            "code_muni": (codigos * 10 + digito_verificador(codigos)).astype(float),
+            "name_muni": [f"Município {c}" for c in codigos],
+            "code_state": (codigos // 10_000).astype(float),
+            "abbrev_state": siglas,
+            "name_state": [DE_UF_SIGLA_PARA_NOME[s] for s in siglas],
+            "code_region": [float(REGIOES.index(r) + 1) for r in regioes],
+            "name_region": regioes,
+        },
+        geometry=[box(a, b, a + lado, b + lado) for a, b in zip(x, y)],
+        crs="EPSG:4674"
+    )
+
+
+def gerar_malha_estados(municipios: gpd.GeoDataFrame | None = None) -> gpd.GeoDataFrame:
+    """
+    Malha de UFs sintética: a união das células de cada UF da malha
+    municipal sintética, com as colunas do geobr.
+    """
+    if municipios is None:
+        municipios = gerar_malha_municipios()
+
+    return (
+        municipios
+        .drop(columns=["code_muni", "name_muni"])
+        .dissolve(by="code_state", as_index=False)
+    )
+
+
+def importar_malhas_sinteticas(anos: list[int], pasta: Path) -> None:
+    """
+    Importa as malhas sintéticas (municípios e UFs) como as malhas dos
+    anos pedidos no armazenamento de geometrias em `pasta`, para que as
+    consultas com geometria rodem sem acesso ao geobr.
+
+    A pasta é obrigatória para que as malhas falsas nunca caiam, por
+    engano, no armazenamento usado em produção.
+    """
+    from api.analysis.malhas import importar_malha
+
+    municipios = gerar_malha_municipios()
+    estados = gerar_malha_estados(municipios)
+    for ano in anos:
+        importar_malha(ano, "municipio", origem=municipios, pasta=pasta)
+        importar_malha(ano, "uf", origem=estados, pasta=pasta)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+
+def _regressao_loop(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Implementação anterior de `calcular_regressao_linear` (um OLS do
+    statsmodels por grupo, sem os pontos ausentes), mantida como referência
+    de comparação.
+    """
+    import statsmodels.api as sm
+
+    results = []
+    years = df.columns.map(int).values
+    X = sm.add_constant(years)
+
+    for group in df.index:
+        res = sm.OLS(df.loc[group].astype(float).values, X, missing="drop").fit()
+        ic = res.conf_int()
+        results.append({
+            "Grupo": group,
+            "Intercepto": res.params[0],
+            "Inclinacao": res.params[1],
+            "Inclinacao IC inferior": ic[1, 0],
+            "Inclinacao IC superior": ic[1, 1],
+            "R^2": res.rsquared,
+            "p-valor": res.pvalues[1],
+        })
+
+    return pd.DataFrame(results)
+
+
+class RegressaoLinear:
+    """
+    `calcular_regressao_linear` vetorizada contra o laço por grupo.
+    """
+    params = [5, 5_570, 5_570 * 10]
+    param_names = ["grupos"]
+    timeout = 600
+
+    def setup(self, grupos):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame(
+            rng.gamma(2.0, 100.0, (grupos, 10)),
+            columns=list(range(2015, 2025))
+        )
+
+    def time_vetorizada(self, grupos):
+        from api.analysis.trends import calcular_regressao_linear
+        calcular_regressao_linear(self.df)
+
+    def time_loop_statsmodels(self, grupos):
+        _regressao_loop(self.df)
+
+
+class MannKendall:
+    """
+    Motor compilado de Mann-Kendall contra `mk.original_test` linha a linha.
+    """
+    params = [5, 5_570, 5_570 * 10]
+    param_names = ["grupos"]
+    timeout = 600
+
+    def setup(self, grupos):
+        from api.analysis.trends import calcular_mann_kendall
+
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame(
+            rng.gamma(2.0, 100.0, (grupos, 10)),
+            columns=list(range(2015, 2025))
+        )
+        # Compila o kernel fora da medição
+        calcular_mann_kendall(self.df.head(2))
+
+    def time_compilado(self, grupos):
+        from api.analysis.trends import calcular_mann_kendall
+        calcular_mann_kendall(self.df)
+
+    def time_compilado_hamed_rao(self, grupos):
+        from api.analysis.trends import calcular_mann_kendall
+        calcular_mann_kendall(self.df, metodo="hamed_rao")
+
+    def time_loop_pymannkendall(self, grupos):
+        import pymannkendall as mk
+        self.df.apply(lambda row: mk.original_test(row.astype(float)), axis=1).apply(pd.Series)
@@ -1,10 +1,10 @@
 import pandas as pd
-from api.sinasc import obter_taxa_sinasc
+from api.sinasc import obter_taxa_sinasc, obter_painel_municipal
 import matplotlib.pyplot as plt
 from api.analysis.trends import calcular_regressao_linear, calcular_mann_kendall
 from api.viz.trends import plotar_grafico_tendencia, plotar_grade_tendencia
 from api.analysis.spatial import criar_matriz_vizinhanca, calcular_moran_global, calcular_lisa_local
-from api.viz.maps import plotar_mapa_coropletico
+from api.viz.maps import plotar_mapa_coropletico, plotar_mapa_categorico, mapa_da_malha
 
 # Definir parâmetros da análise
 anos = list(range(2015, 2025))
@@ -58,21 +58,20 @@ plotar_grade_tendencia(tabela_temporal, resultados_regressao, titulo_grafico)
 
 anos_espacial = [2015, 2020, 2024]
 
-for ano in anos_espacial:
-    print(f"\n--- Iniciando análise espacial para o ano de {ano}... ---")
+# Uma única consulta para todos os anos; a malha é carregada uma vez
+painel = obter_painel_municipal(anos_espacial, cid=cid_prefixo)
+
+# Os caminhos dos polígonos são montados uma vez para todos os mapas
+malha_mapas = mapa_da_malha(2022)
 
-    gdf = obter_taxa_sinasc(
-        anos=[ano],
-        cid=cid_prefixo,
-        estratos=["codmunres"],
-        retorno="geopandas"
-    )
+for ano, gdf in painel:
+    print(f"\n--- Iniciando análise espacial para o ano de {ano}... ---")
 
     gdf_analise = gdf[gdf['n_nascidos_vivos'].notna()].copy()
     print(f"{len(gdf_analise)} municípios com dados encontrados.")
 
     if not gdf_analise.empty:
-        w = criar_matriz_vizinhanca(gdf_analise, metodo="queen")
+        w = criar_matriz_vizinhanca(gdf_analise, metodo="queen", ano_malha=2022)
 
         moran_i, moran_p = calcular_moran_global(gdf_analise, col_taxa, w)
         print(f"I de Moran Global ({ano}): {moran_i:.4f} (p-valor: {moran_p:.4f})")
@@ -88,7 +87,8 @@ for ano in anos_espacial:
             gdf_lisa,
             coluna=col_taxa,
             ax=axes[0],
-            titulo_legenda="Taxa por 100k (Quartis)"
+            titulo_legenda="Taxa por 100k (Quartis)",
+            malha=malha_mapas
         )
         axes[0].set_title(f"Mapa de Taxa Bruta por Município ({ano})")
         axes[0].axis('off')
@@ -101,16 +101,13 @@ for ano in anos_espacial:
             'Alto-Baixo': '#fdae61'
         }
 
-        # Mapeamento manual de cores para o plot do Geopandas
-        gdf_lisa.plot(
-            column='lisa_cluster',
-            categorical=True,
-            legend=True,
-            legend_kwds={'title': "Clusters LISA", 'loc': 'lower right'},
+        plotar_mapa_categorico(
+            gdf_lisa,
+            coluna='lisa_cluster',
             ax=axes[1],
-            edgecolor='white',
-            linewidth=0.1,
-            # Note: passed colors must match the order of categories if using categorical
+            cores=cluster_colors,
+            titulo_legenda="Clusters LISA",
+            malha=malha_mapas
         )
         axes[1].set_title(f"Mapa de Clusters LISA ({ano})")
         axes[1].axis('off')
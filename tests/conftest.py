@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from benchmarks.sintetico import gravar_dnbr, importar_malhas_sinteticas
+
+ANOS = [2019, 2020, 2021]
+LINHAS_POR_ANO = 20_000
+
+
+@pytest.fixture(scope="session")
+def raiz_dados(tmp_path_factory):
+    """
+    Pasta de trabalho com DNBR sintéticos de `ANOS` e as malhas sintéticas
+    de 2022. Os caminhos de dados do projeto são relativos ao diretório
+    corrente, então a sessão inteira roda dentro dela.
+    """
+    from api.sinasc.config import PASTA_PARQUET
+    from api.analysis.config import PASTA_MALHAS
+
+    raiz = tmp_path_factory.mktemp("dados")
+    anterior = os.getcwd()
+    os.chdir(raiz)
+    try:
+        for ano in ANOS:
+            gravar_dnbr(ano, LINHAS_POR_ANO, pasta=PASTA_PARQUET)
+        importar_malhas_sinteticas([2022], pasta=PASTA_MALHAS)
+        yield raiz
+    finally:
+        os.chdir(anterior)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from api.analysis.autocorrelacao import moran_global_matriz, moran_local_matriz
+from benchmarks.sintetico import gerar_malha_municipios
+
+PERMUTACOES = 99
+SEMENTE = 7
+
+
+@pytest.fixture(scope="module", params=["queen", "knn"])
+def pesos(request):
+    libpysal = pytest.importorskip("libpysal")
+    malha = gerar_malha_municipios()
+    if request.param == "queen":
+        w = libpysal.weights.Queen.from_dataframe(malha, use_index=False, silence_warnings=True)
+    else:
+        w = libpysal.weights.KNN.from_dataframe(malha, k=6, use_index=False)
+    w.transform = "r"
+    return w
+
+
+@pytest.fixture(scope="module")
+def variaveis(pesos):
+    return np.random.default_rng(1).gamma(2.0, 1.0, (pesos.n, 3))
+
+
+def test_moran_local_igual_ao_esda(pesos, variaveis):
+    esda = pytest.importorskip("esda")
+
+    resultado = moran_local_matriz(variaveis, pesos, permutacoes=PERMUTACOES, semente=SEMENTE)
+
+    for c in range(variaveis.shape[1]):
+        esperado = esda.Moran_Local(variaveis[:, c], pesos, permutations=PERMUTACOES, seed=SEMENTE)
+        np.testing.assert_allclose(resultado["Is"][:, c], esperado.Is, rtol=1e-10, atol=1e-12)
+        np.testing.assert_array_equal(resultado["q"][:, c], esperado.q)
+        np.testing.assert_array_equal(resultado["p_sim"][:, c], esperado.p_sim)
+
+
+def test_moran_global_igual_ao_esda(pesos, variaveis):
+    esda = pytest.importorskip("esda")
+
+    resultado = moran_global_matriz(variaveis, pesos, permutacoes=PERMUTACOES, semente=SEMENTE)
+
+    for c in range(variaveis.shape[1]):
+        # esda.Moran não recebe semente: sorteia do estado global
+        np.random.seed(SEMENTE)
+        esperado = esda.Moran(variaveis[:, c], pesos, permutations=PERMUTACOES)
+        np.testing.assert_allclose(resultado["I"][c], esperado.I, rtol=1e-10)
+        np.testing.assert_allclose(resultado["EI"][c], esperado.EI)
+        assert resultado["p_sim"][c] == esperado.p_sim
+        np.testing.assert_allclose(resultado["EI_sim"][c], esperado.EI_sim, rtol=1e-10)
@@ -0,0 +1,63 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import polars as pl
+
+from api.sinasc.cache import CacheResultados, cache_padrao
+from api.sinasc.taxas import obter_taxa_sinasc
+
+from tests.conftest import ANOS
+
+
+def test_cache_padrao_acumula_entre_chamadas(raiz_dados):
+    antes = cache_padrao().estatisticas()
+
+    primeira = obter_taxa_sinasc(ANOS, cid="Q05", estratos=["REGIAO"], retorno="polars", cache=True)
+    segunda = obter_taxa_sinasc(ANOS, cid="Q05", estratos=["REGIAO"], retorno="polars", cache=True)
+
+    depois = cache_padrao().estatisticas()
+    assert depois["falhas"] - antes["falhas"] == 1
+    assert depois["acertos"] - antes["acertos"] == 1
+    assert segunda.equals(primeira)
+
+
+def _guardar_varias(pasta: Path, processo: int, quantidade: int) -> None:
+    cache = CacheResultados(pasta)
+    for i in range(quantidade):
+        chave = CacheResultados.chave({"processo": processo, "i": i}, {})
+        cache.guardar(chave, pl.DataFrame({"i": [i]}), {})
+        assert cache.obter(chave) is not None
+
+
+def test_cache_compartilhado_entre_processos(tmp_path):
+    processos, quantidade = 4, 25
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processos, mp_context=contexto) as pool:
+        list(pool.map(_guardar_varias, [tmp_path] * processos, range(processos), [quantidade] * processos))
+
+    # Nenhuma gravação do índice se perdeu
+    cache = CacheResultados(tmp_path)
+    assert cache.estatisticas()["entradas"] == processos * quantidade
+    assert len(list(tmp_path.glob("*.parquet"))) == processos * quantidade
+
+
+def test_acerto_nao_regrava_o_indice_e_conta_no_lru(tmp_path):
+    df = pl.DataFrame({"x": range(1000)})
+    cache = CacheResultados(tmp_path)
+    for chave in ("a", "b"):
+        cache.guardar(chave, df, {})
+    indice = tmp_path / CacheResultados.ARQUIVO_INDICE
+    antes = indice.stat()
+
+    time.sleep(0.01)
+    assert cache.obter("a").equals(df)
+    depois = indice.stat()
+    assert (depois.st_ino, depois.st_mtime_ns) == (antes.st_ino, antes.st_mtime_ns)
+
+    # "a" foi usada depois de "b": é "b" que sai quando o limite estoura
+    cache.limite_bytes = 2 * (tmp_path / "a.parquet").stat().st_size
+    cache.guardar("c", df, {})
+    assert cache.obter("a") is not None
+    assert cache.obter("b") is None
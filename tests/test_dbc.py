@@ -0,0 +1,45 @@
+import polars as pl
+import pytest
+
+from api.sinasc.dbc import dbc_para_parquet
+from benchmarks.sintetico import gerar_dnbr, gravar_dbc
+
+LINHAS = 30_000
+TAMANHO_LOTE = 7_000
+
+
+@pytest.fixture(scope="module")
+def dbc(tmp_path_factory):
+    """
+    DNBR sintético com todos os campos (64), alguns textos com acentos
+    (gravados em latin1, como no DATASUS) e campos em branco.
+    """
+    linha = pl.int_range(pl.len())
+    df = gerar_dnbr(2019, LINHAS, completo=True).with_columns(
+        CODANOMAL=pl.when(linha % 97 == 0).then(pl.lit("Ação ñ çã É")).otherwise(pl.col("CODANOMAL")),
+        ESCMAE=pl.when(linha % 13 == 0).then(pl.lit("")).otherwise(pl.col("ESCMAE")),
+    )
+    caminho = tmp_path_factory.mktemp("dbc") / "DNBR2019.dbc"
+    gravar_dbc(df, caminho)
+    return caminho, df
+
+
+def test_dbc_para_parquet_igual_ao_quadrosdesaude(dbc, tmp_path):
+    qds = pytest.importorskip("quadrosdesaude")
+    caminho, df = dbc
+
+    assert dbc_para_parquet(caminho, tmp_path / "nativo.parquet", TAMANHO_LOTE) == LINHAS
+    (tmp_path / "qds").mkdir()
+    assert qds.dbc2parquet(
+        caminho_dbc=str(caminho),
+        destino_parquet=str(tmp_path / "qds"),
+        pasta_temp_dbf=str(tmp_path / "dbf"),
+        pasta_temp_parquet=str(tmp_path / "parquet"),
+        tamanho_lote=TAMANHO_LOTE
+    )
+
+    nativo = pl.read_parquet(tmp_path / "nativo.parquet")
+    referencia = pl.read_parquet(tmp_path / "qds" / "DNBR2019.parquet")
+    assert nativo.shape == (LINHAS, 64)
+    assert nativo.equals(referencia)
+    assert nativo.equals(df)
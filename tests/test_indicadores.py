@@ -0,0 +1,63 @@
+import polars as pl
+import pytest
+
+from api.sinasc.armazenamento import particionar
+from api.sinasc.config import PASTA_PARQUET
+from api.sinasc.indicadores import indicador_malformacao
+from api.sinasc.load import carregar
+from api.sinasc.taxas import obter_taxa_sinasc
+from benchmarks.sintetico import gravar_dnbr
+
+ANOS = [2019, 2020, 2021]
+LINHAS = 5_000
+CIDS = {"q": "Q", "cardio": "Q20-Q28", "pe": ["Q66", "Q69"], "spina": "Q05", "d18": "D18"}
+
+# Códigos do capítulo Q fora dos blocos de BLOCOS_CAPITULO_Q
+FORA_DOS_BLOCOS = ["Q08", "Q469", "Q19Q699", "D180Q29"]
+
+
+@pytest.fixture(scope="module")
+def canonico(tmp_path_factory):
+    """
+    Armazenamento canônico (com o índice de anomalias) de `ANOS` numa
+    pasta própria, para não mudar o caminho de leitura dos outros testes.
+    """
+    raiz = tmp_path_factory.mktemp("canonico")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(raiz)
+        for ano in ANOS:
+            arquivo = gravar_dnbr(ano, LINHAS, pasta=PASTA_PARQUET, semente=ano)
+            df = pl.read_parquet(arquivo)
+            linhas = df.with_row_index().filter(pl.col("IDANOMAL") == "1")["index"][:len(FORA_DOS_BLOCOS)]
+            df.with_columns(
+                CODANOMAL=df["CODANOMAL"].scatter(linhas, FORA_DOS_BLOCOS)
+            ).write_parquet(arquivo)
+        particionar(ANOS)
+        yield raiz
+
+
+def test_indice_so_le_os_anos_pedidos(canonico):
+    plano = obter_taxa_sinasc([2021], cid="Q20", retorno="lazy").explain()
+
+    assert "ano=2021/anomalias.parquet" in plano
+    assert "ano=2019" not in plano and "ano=2020" not in plano
+
+
+@pytest.mark.parametrize("anos", [[2020], [2019, 2021]])
+def test_indice_igual_a_regex(canonico, anos):
+    df = carregar(anos)
+    chaves = ["ano", "id_nascimento"]
+
+    indexado = indicador_malformacao(df, CIDS, anos).select(*chaves, pl.col("^casos_.*$"))
+    regex = indicador_malformacao(df, CIDS).select(*chaves, pl.col("^casos_.*$"))
+
+    esperado = regex.sort(chaves).collect()
+    assert esperado["casos_cardio"].sum() > 0
+    assert indexado.sort(chaves).collect().equals(esperado)
+
+
+def test_capitulo_q_conta_codigos_fora_dos_blocos(canonico):
+    df = carregar([2020]).filter(pl.col("CODANOMAL").is_in(FORA_DOS_BLOCOS))
+
+    casos = df.pipe(indicador_malformacao, "Q", [2020]).collect()["casos"]
+    assert casos.to_list() == [1] * len(FORA_DOS_BLOCOS)
@@ -0,0 +1,160 @@
+import os
+import errno
+import threading
+from ftplib import FTP
+
+import polars as pl
+import pytest
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.filesystems import AbstractedFS
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+
+from api.sinasc import load
+from api.sinasc.config import PASTA_DBC, PASTA_PARQUET
+from benchmarks.sintetico import gerar_dnbr, gravar_dbc
+
+ANOS_FTP = [2017, 2018, 2019]
+LINHAS = 5_000
+DIRETORIO = "/DNRES"
+
+
+class _FS(AbstractedFS):
+    def chdir(self, path):
+        # O original faz os.chdir: como o servidor roda no processo dos
+        # testes, mudaria por um instante a pasta de onde saem os caminhos
+        # relativos (data/dbc, data/parquet) dos downloads em andamento
+        if not os.path.isdir(path):
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+        self.cwd = self.fs2ftp(path)
+
+
+class _Handler(FTPHandler):
+    abstracted_fs = _FS
+
+    retomadas: list[int] = []
+
+    def ftp_REST(self, line):
+        # Guarda de onde cada download foi retomado
+        self.retomadas.append(int(line))
+        return super().ftp_REST(line)
+
+
+@pytest.fixture(scope="module")
+def ftp(tmp_path_factory):
+    """
+    Servidor FTP local (anônimo) com um DNBR{ano}.dbc sintético por ano de
+    `ANOS_FTP` em `DIRETORIO`. Devolve (porta, pasta dos .dbc, handler).
+    """
+    raiz = tmp_path_factory.mktemp("ftp")
+    pasta = raiz / DIRETORIO.strip("/")
+    pasta.mkdir()
+    for ano in ANOS_FTP:
+        gravar_dbc(gerar_dnbr(ano, LINHAS), pasta / f"DNBR{ano}.dbc")
+
+    autorizador = DummyAuthorizer()
+    autorizador.add_anonymous(str(raiz))
+    handler = type("Handler", (_Handler,), {"authorizer": autorizador, "retomadas": []})
+    servidor = ThreadedFTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=servidor.serve_forever, kwargs={"timeout": 0.1}, daemon=True)
+    thread.start()
+    try:
+        yield servidor.address[1], pasta, handler
+    finally:
+        servidor.close_all()
+        thread.join()
+
+
+@pytest.fixture
+def pasta_trabalho(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    PASTA_DBC.mkdir(parents=True)
+    PASTA_PARQUET.mkdir(parents=True)
+    return tmp_path
+
+
+def test_baixar_dbc_retoma_download_parcial(ftp, pasta_trabalho):
+    porta, pasta, handler = ftp
+    origem = (pasta / "DNBR2017.dbc").read_bytes()
+    metade = len(origem) // 2
+    parcial = PASTA_DBC / "DNBR2017.dbc.part"
+    parcial.write_bytes(origem[:metade])
+
+    dbc = load._baixar_dbc(2017, "127.0.0.1", porta, DIRETORIO)
+
+    assert handler.retomadas[-1] == metade
+    assert dbc.read_bytes() == origem
+    assert not parcial.exists()
+
+
+def test_baixar_dbc_descarta_parcial_maior_que_o_remoto(ftp, pasta_trabalho):
+    porta, pasta, handler = ftp
+    origem = (pasta / "DNBR2018.dbc").read_bytes()
+    (PASTA_DBC / "DNBR2018.dbc.part").write_bytes(origem + b"lixo")
+    retomadas = len(handler.retomadas)
+
+    dbc = load._baixar_dbc(2018, "127.0.0.1", porta, DIRETORIO)
+
+    assert len(handler.retomadas) == retomadas
+    assert dbc.read_bytes() == origem
+
+
+def test_baixar_dbc_incompleto_nao_publica_o_arquivo(ftp, pasta_trabalho, monkeypatch):
+    porta, pasta, _ = ftp
+
+    class FTPTamanhoMaior(FTP):
+        def size(self, nome):
+            return super().size(nome) + 10
+
+    monkeypatch.setattr(load, "FTP", FTPTamanhoMaior)
+    with pytest.raises(IOError, match="Download incompleto"):
+        load._baixar_dbc(2019, "127.0.0.1", porta, DIRETORIO)
+
+    # O nome final só aparece com o arquivo completo (os.replace do .part)
+    assert not (PASTA_DBC / "DNBR2019.dbc").exists()
+    assert (PASTA_DBC / "DNBR2019.dbc.part").stat().st_size == (pasta / "DNBR2019.dbc").stat().st_size
+
+
+def test_ingerir_baixa_e_converte_em_paralelo(ftp, pasta_trabalho):
+    porta, _, _ = ftp
+    etapas = []
+    parametros = dict(
+        max_downloads=2,
+        max_conversoes=2,
+        progresso=lambda ano, etapa: etapas.append((ano, etapa)),
+        host="127.0.0.1",
+        porta=porta,
+        diretorio=DIRETORIO
+    )
+
+    parquets = load.ingerir(ANOS_FTP, **parametros)
+
+    assert sorted(parquets) == ANOS_FTP
+    for ano in ANOS_FTP:
+        assert [e for a, e in etapas if a == ano] == ["baixado", "convertido"]
+        df = pl.read_parquet(parquets[ano])
+        assert df.height == LINHAS
+        assert df["CODMUNRES"].to_list() == gerar_dnbr(ano, LINHAS)["CODMUNRES"].to_list()
+    assert not list(PASTA_DBC.glob("*.part"))
+
+    etapas.clear()
+    assert load.ingerir(ANOS_FTP, **parametros) == parquets
+    assert etapas == [(ano, "existente") for ano in ANOS_FTP]
+
+
+def test_ingerir_reune_as_falhas(ftp, pasta_trabalho):
+    porta, _, _ = ftp
+    etapas = []
+
+    with pytest.raises(RuntimeError, match="2016"):
+        load.ingerir(
+            [2016, 2017],
+            progresso=lambda ano, etapa: etapas.append((ano, etapa)),
+            host="127.0.0.1",
+            porta=porta,
+            diretorio=DIRETORIO
+        )
+
+    assert (2016, "falha") in etapas
+    assert (2017, "convertido") in etapas
+    assert (PASTA_PARQUET / "DNBR2017.parquet").exists()
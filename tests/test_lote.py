@@ -0,0 +1,76 @@
+import json
+
+import polars as pl
+import pytest
+
+from api.lote import ARQUIVO_CONCLUIDO, ARQUIVO_RELATORIO, executar_lote, expandir_trabalhos
+from api.sinasc.taxas import obter_taxa_sinasc
+from tests.conftest import ANOS
+
+
+def test_particao_separa_opcoes_e_grupos_de_cid():
+    trabalhos = expandir_trabalhos({
+        "padrao": {"anos": "2019-2021", "estratos": ["codmunres"], "espacial": True},
+        "grade": {"metodo_vizinhanca": ["queen", "knn"], "semente": [0, 1]},
+    })
+    assert len({t["particao"] for t in trabalhos}) == 4
+
+    padrao, = expandir_trabalhos({"trabalhos": [{"anos": 2020}]})
+    assert padrao["particao"].endswith("/filtros=todos/opcoes=padrao")
+
+    cids = [{"a": "Q20-Q28"}, {"a": ["Q66", "Q69"]}, {"a": "Q0", "b": "Q1"}]
+    particoes = [
+        t["particao"].split("/")[0]
+        for t in expandir_trabalhos({"padrao": {"anos": 2020}, "grade": {"cid": cids}})
+    ]
+    assert particoes == ["cid=a_Q20-Q28", "cid=a_Q66,Q69", "cid=a_Q0+b_Q1"]
+
+
+def test_trabalhos_na_mesma_particao_sao_rejeitados():
+    with pytest.raises(ValueError, match="gravariam em"):
+        expandir_trabalhos({"trabalhos": [{"anos": 2020, "cid": "Q"}, {"anos": [2020], "cid": "Q"}]})
+
+
+def _situacoes(relatorio: dict) -> dict[str, str]:
+    return {t["particao"]: t["situacao"] for t in relatorio["trabalhos"]}
+
+
+def test_executar_lote_em_processos(raiz_dados, tmp_path):
+    manifesto = {
+        "padrao": {"anos": ANOS},
+        "grade": {"cid": ["Q0", "Q6"], "estratos": [["REGIAO"], ["faixa_etaria_mae"]]},
+    }
+
+    relatorio = executar_lote(manifesto, saida=tmp_path, processos=2)
+
+    situacoes = _situacoes(relatorio)
+    assert len(situacoes) == 4 and set(situacoes.values()) == {"concluido"}
+    assert relatorio["processos"] == 2
+    with open(tmp_path / ARQUIVO_RELATORIO, encoding="utf-8") as f:
+        assert json.load(f) == relatorio
+
+    for trabalho in relatorio["trabalhos"]:
+        particao = tmp_path / trabalho["particao"]
+        assert {"taxas.parquet", "regressao.parquet", ARQUIVO_CONCLUIDO} <= {p.name for p in particao.iterdir()}
+        esperado = obter_taxa_sinasc(
+            ANOS,
+            cid=trabalho["trabalho"]["cid"],
+            estratos=trabalho["trabalho"]["estratos"],
+            retorno="polars"
+        )
+        assert pl.read_parquet(particao / "taxas.parquet").equals(esperado)
+    assert not (tmp_path / ".tmp").exists()
+
+    # Nada mudou: tudo é pulado
+    assert set(_situacoes(executar_lote(manifesto, saida=tmp_path, processos=2)).values()) == {"pulado"}
+
+    # Só os trabalhos com especificação nova são refeitos
+    manifesto["grade"]["cid"] = ["Q0", "Q3"]
+    situacoes = _situacoes(executar_lote(manifesto, saida=tmp_path, processos=2))
+    assert sorted(situacoes.values()) == ["concluido", "concluido", "pulado", "pulado"]
+    assert all((s == "pulado") == p.startswith("cid=Q0/") for p, s in situacoes.items())
+
+    manifesto["padrao"]["multiplicador"] = 1000
+    situacoes = _situacoes(executar_lote(manifesto, saida=tmp_path, processos=2))
+    assert set(situacoes.values()) == {"concluido"}
+    assert all(not p.endswith("opcoes=padrao") for p in situacoes)
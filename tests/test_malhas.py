@@ -0,0 +1,89 @@
+import numpy as np
+import geopandas as gpd
+import shapely
+from shapely.geometry import LineString
+
+from api.analysis.malhas import caminho_malha, importar_malha, ler_malha
+from benchmarks.sintetico import gerar_malha_municipios, importar_malhas_sinteticas
+
+
+def test_malha_importada_e_lida_com_colunas(tmp_path):
+    importar_malhas_sinteticas([2020], pasta=tmp_path)
+    for nivel in ("municipio", "uf"):
+        for tolerancia in (0, 0.001, 0.01):
+            assert caminho_malha(2020, nivel, tolerancia, tmp_path).exists()
+
+    malha = ler_malha(2020, "municipio", colunas=["code_muni", "code_state"], pasta=tmp_path)
+    assert list(malha.columns) == ["code_muni", "code_state", "geometry"]
+    assert malha["code_muni"].dtype == np.int32
+    assert malha["code_state"].dtype == np.int32
+    assert malha["code_muni"].is_monotonic_increasing
+
+    origem = gerar_malha_municipios()
+    assert sorted(malha["code_muni"]) == sorted(origem["code_muni"].astype(int))
+    assert malha.crs == origem.crs
+
+    estados = ler_malha(2020, "uf", tolerancia=0.01, colunas=["code_state"], pasta=tmp_path)
+    assert estados["code_state"].dtype == np.int32
+    assert set(estados["code_state"]) == set(malha["code_state"])
+
+
+def _tijolos(passo: float = 0.01, amplitude: float = 0.002, desnivel: float = 0.005) -> gpd.GeoDataFrame:
+    """
+    Duas fileiras de células, como tijolos, num retângulo 2 x 2. Cada
+    junção da linha do meio é canto das células de um lado e fica quase
+    alinhada (a `desnivel` da reta) na borda da célula do outro lado. As
+    fronteiras são serrilhadas (vértices a cada `passo`, deslocados até
+    `amplitude`), com os mesmos vértices dos dois lados, como numa malha
+    real.
+    """
+    rng = np.random.default_rng(0)
+
+    def aresta(inicio, fim, serrilhada=True):
+        t = np.linspace(0, 1, int(round(np.hypot(*np.subtract(fim, inicio)) / passo)) + 1)
+        pontos = np.outer(1 - t, inicio) + np.outer(t, fim)
+        if serrilhada:
+            pontos[1:-1] += rng.uniform(-amplitude, amplitude, (len(t) - 2, 2))
+        return LineString(pontos)
+
+    meio = [(0, 1), (0.5, 1 + desnivel), (1, 1 - desnivel), (1.5, 1 + desnivel), (2, 1)]
+    arestas = [aresta(a, b) for a, b in zip(meio, meio[1:])]
+    arestas += [aresta(a, b, serrilhada=False) for a, b in [
+        ((0, 0), (1, 0)), ((1, 0), (2, 0)),
+        ((0, 2), (0.5, 2)), ((0.5, 2), (1.5, 2)), ((1.5, 2), (2, 2)),
+        ((0, 0), (0, 1)), ((0, 1), (0, 2)), ((2, 0), (2, 1)), ((2, 1), (2, 2)),
+    ]]
+    arestas += [aresta((1, 0), meio[2]), aresta(meio[1], (0.5, 2)), aresta(meio[3], (1.5, 2))]
+
+    celulas = shapely.get_parts(shapely.polygonize(arestas))
+    centros = shapely.get_coordinates(shapely.centroid(celulas))
+    celulas = celulas[np.lexsort([centros[:, 0], centros[:, 1]])]
+    return gpd.GeoDataFrame(
+        {
+            "code_muni": [1100015 + 10 * i for i in range(len(celulas))],
+            "code_state": [11] * len(celulas),
+        },
+        geometry=list(celulas),
+        crs="EPSG:4674"
+    )
+
+
+def test_malha_simplificada_mantem_as_fronteiras(tmp_path):
+    original = _tijolos()
+    importar_malha(2000, "municipio", origem=original, tolerancias=(0.01,), pasta=tmp_path)
+    simplificada = ler_malha(2000, "municipio", tolerancia=0.01, pasta=tmp_path)
+
+    antes = original.geometry.values
+    depois = simplificada.geometry.values
+    assert len(depois) == len(antes) == 5
+    assert shapely.get_num_coordinates(depois).sum() < shapely.get_num_coordinates(antes).sum() / 5
+
+    # Sem buracos nem sobreposições: as células continuam cobrindo o retângulo
+    assert np.isclose(shapely.union_all(depois).area, 4)
+    assert np.isclose(shapely.area(depois).sum(), 4)
+
+    # Vizinhas continuam dividindo uma fronteira (as mais curtas têm 0,5)
+    for i in range(len(antes)):
+        for j in range(i + 1, len(antes)):
+            if antes[i].intersection(antes[j]).length > 0:
+                assert depois[i].intersection(depois[j]).length > 0.45
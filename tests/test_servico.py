@@ -0,0 +1,142 @@
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+import pyarrow as pa
+import pytest
+from starlette.testclient import TestClient
+
+from api.servico import ServicoSinasc
+from api.sinasc import obter_taxa_sinasc
+from tests.conftest import ANOS
+
+CONSULTA = "anos=2019-2021&cid=Q&estratos=codmunres"
+
+
+@pytest.fixture(scope="module")
+def servico(raiz_dados):
+    return ServicoSinasc(anos=ANOS[:1])
+
+
+@pytest.fixture(scope="module")
+def cliente(servico):
+    with TestClient(servico) as cliente:
+        yield cliente
+
+
+def _tabela(resposta) -> pl.DataFrame:
+    tipo = resposta.headers["content-type"]
+    if tipo == "application/vnd.apache.arrow.stream":
+        return pl.from_arrow(pa.ipc.open_stream(io.BytesIO(resposta.content)).read_all())
+    assert tipo == "application/json"
+    return pl.DataFrame(resposta.json())
+
+
+@pytest.mark.parametrize("formato", ["json", "arrow"])
+def test_taxas_iguais_a_obter_taxa_sinasc(cliente, formato):
+    resposta = cliente.get(f"/taxas?{CONSULTA}&formato={formato}")
+    assert resposta.status_code == 200
+
+    esperado = obter_taxa_sinasc(ANOS, cid="Q", estratos=["codmunres"], retorno="polars")
+    obtido = _tabela(resposta)
+    assert obtido.columns == esperado.columns
+    assert obtido["casos"].to_list() == esperado["casos"].to_list()
+    assert obtido["taxa_por_100000"].to_list() == pytest.approx(esperado["taxa_por_100000"].to_list())
+
+
+def test_taxas_geojson(cliente):
+    resposta = cliente.get(f"/taxas?{CONSULTA}&formato=geojson")
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"] == "application/geo+json"
+
+    geojson = resposta.json()
+    assert geojson["type"] == "FeatureCollection"
+    assert geojson["features"]
+    assert {"code_muni", "taxa_por_100000"} <= set(geojson["features"][0]["properties"])
+
+
+@pytest.mark.parametrize("formato", ["json", "arrow"])
+@pytest.mark.parametrize("teste", ["regressao", "mann_kendall"])
+def test_tendencias(cliente, formato, teste):
+    resposta = cliente.get(f"/tendencias?anos=2019-2021&cid=Q&estratos=REGIAO&teste={teste}&formato={formato}")
+    assert resposta.status_code == 200
+    tabela = _tabela(resposta)
+    assert "Grupo" in tabela.columns
+    assert tabela.height == 5  # uma série por região
+
+
+@pytest.mark.parametrize("formato,tabela", [("json", "moran"), ("arrow", "lisa"), ("geojson", "lisa")])
+def test_espacial(cliente, formato, tabela):
+    resposta = cliente.get(f"/espacial?anos=2019-2020&cid=Q&tabela={tabela}&permutacoes=99&formato={formato}")
+    assert resposta.status_code == 200
+
+    if formato == "geojson":
+        assert resposta.json()["features"]
+    elif tabela == "moran":
+        assert set(_tabela(resposta)["ano"].to_list()) == {2019, 2020}
+    else:
+        assert "code_muni" in _tabela(resposta).columns
+
+
+def test_consultas_simultaneas_calculam_uma_vez(raiz_dados):
+    servico = ServicoSinasc()
+    consultar = servico.consultar_taxas
+
+    def lento(p):
+        time.sleep(0.5)
+        return consultar(p)
+
+    servico.consultar_taxas = lento
+    with TestClient(servico) as cliente:
+        with ThreadPoolExecutor(8) as pool:
+            respostas = list(pool.map(lambda _: cliente.get(f"/taxas?{CONSULTA}"), range(8)))
+        repetida = cliente.get(f"/taxas?{CONSULTA}")
+
+    assert {r.status_code for r in respostas} == {200}
+    assert len({r.content for r in respostas + [repetida]}) == 1
+    assert servico.calculos == 1
+    assert servico.deduplicadas == 7
+    assert servico.acertos == 1
+
+
+@pytest.mark.parametrize("rota,consulta", [
+    ("/taxas", "cid=Q"),
+    ("/taxas", "anos=2019&estratos=foo"),
+    ("/taxas", "anos=abc"),
+    ("/taxas", "anos=2019&formato=xml"),
+    ("/taxas", "anos=2019&ufs=XX"),
+    ("/taxas", "anos=2019&desconhecido=1"),
+    ("/taxas", "anos=2019&formato=geojson&estratos=REGIAO"),
+    ("/tendencias", "anos=2019-2021&formato=geojson"),
+    ("/espacial", "anos=2019&estratos=REGIAO"),
+    ("/espacial", "anos=2019&metodo=rook"),
+])
+def test_parametros_invalidos(cliente, rota, consulta):
+    resposta = cliente.get(f"{rota}?{consulta}")
+    assert resposta.status_code == 400
+    assert set(resposta.json()) == {"erro"}
+
+
+def test_erro_interno_nao_vaza_detalhes(raiz_dados):
+    servico = ServicoSinasc()
+
+    def quebrado(p):
+        raise KeyError("detalhe interno")
+
+    servico._taxas = quebrado
+    with TestClient(servico, raise_server_exceptions=False) as cliente:
+        resposta = cliente.get(f"/taxas?{CONSULTA}")
+
+    assert resposta.status_code == 500
+    assert resposta.json() == {"erro": "erro interno"}
+
+
+def test_rotas_auxiliares(cliente):
+    saude = cliente.get("/saude")
+    assert saude.status_code == 200
+    assert ANOS[0] in json.loads(saude.content)["anos_carregados"]
+
+    assert cliente.get("/inexistente").status_code == 404
+    assert cliente.post(f"/taxas?{CONSULTA}").status_code == 405
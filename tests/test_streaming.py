@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from api.sinasc import obter_taxa_sinasc
+from api.sinasc.cache import CacheResultados
+from api.sinasc.config import PASTA_PARQUET
+from benchmarks.sintetico import gravar_dnbr
+from tests.conftest import ANOS
+
+LINHAS_GRANDES = 1_000_000
+
+# Roda uma consulta num processo novo e imprime o quanto o pico de memória
+# residente subiu durante ela, em KiB (o pico é zerado antes, via
+# /proc/self/clear_refs). Com motor='streaming', o orçamento é o maior
+# ano: os anos não cabem juntos e a consulta roda ano a ano
+_CONSULTA = """
+import sys, json
+from api.sinasc import obter_taxa_sinasc
+from api.sinasc.load import garantir_arquivos
+from api.sinasc.streaming import estimar_memoria
+
+def status(campo):
+    with open("/proc/self/status") as f:
+        return next(int(linha.split()[1]) for linha in f if linha.startswith(campo))
+
+parametros = json.loads(sys.argv[1])
+if parametros.get("motor") == "streaming":
+    parametros["limite_memoria"] = max(estimar_memoria([a]) for a in garantir_arquivos(parametros["anos"]))
+
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+antes = status("VmRSS:")
+df = obter_taxa_sinasc(**parametros, cid="Q", estratos=["codmunres"], retorno="polars")
+print(status("VmHWM:") - antes)
+df.write_parquet(sys.argv[2])
+"""
+
+
+def test_streaming_com_destino_guarda_no_cache(raiz_dados, tmp_path):
+    cache = CacheResultados(tmp_path / "cache")
+    destino = tmp_path / "taxas.parquet"
+    parametros = dict(anos=ANOS, cid="Q", estratos=["REGIAO"], cache=cache)
+
+    caminho = obter_taxa_sinasc(**parametros, retorno="polars", motor="streaming", destino=destino)
+    assert caminho == destino
+    assert cache.estatisticas()["entradas"] == 1
+
+    df = obter_taxa_sinasc(**parametros, retorno="polars")
+    assert cache.acertos == 1
+    assert df.equals(pl.read_parquet(destino))
+
+
+@pytest.fixture(scope="module")
+def raiz_grande(tmp_path_factory):
+    raiz = tmp_path_factory.mktemp("streaming")
+    for ano in ANOS:
+        gravar_dnbr(ano, LINHAS_GRANDES, pasta=raiz / PASTA_PARQUET)
+    return raiz
+
+
+def _consultar(raiz: Path, **parametros) -> tuple[pl.DataFrame, int]:
+    saida = raiz / f"{parametros.get('motor', 'memoria')}.parquet"
+    ambiente = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[1])}
+    processo = subprocess.run(
+        [sys.executable, "-c", _CONSULTA, json.dumps({"anos": ANOS, **parametros}), str(saida)],
+        cwd=raiz,
+        env=ambiente,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return pl.read_parquet(saida), int(processo.stdout.split()[-1])
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="lê o pico de memória em /proc")
+def test_streaming_ano_a_ano_limita_a_memoria(raiz_grande):
+    em_memoria, pico_memoria = _consultar(raiz_grande)
+    por_ano, pico_por_ano = _consultar(raiz_grande, motor="streaming")
+
+    assert por_ano.equals(em_memoria)
+    # Só um ano fica em memória por vez: o pico fica bem abaixo do da
+    # execução com os três anos juntos
+    assert pico_por_ano < pico_memoria / 2
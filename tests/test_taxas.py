@@ -0,0 +1,27 @@
+import pandas as pd
+import polars as pl
+
+from api.sinasc import obter_taxa_sinasc
+from tests.conftest import ANOS
+
+
+def test_pandas_estratos_enum_viram_categorical(raiz_dados):
+    df = obter_taxa_sinasc(ANOS, cid="Q", estratos=["REGIAO"], retorno="pandas")
+
+    assert isinstance(df["REGIAO"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["taxa_por_100000"].dtype, pd.ArrowDtype)
+
+    largo = df.pivot(index="REGIAO", columns="ano", values="taxa_por_100000")
+    assert list(largo.columns) == ANOS
+    assert set(largo.index) <= set(df["REGIAO"].cat.categories)
+
+
+def test_pandas_igual_ao_polars(raiz_dados):
+    estratos = ["REGIAO", "faixa_etaria_mae"]
+    df_pl = obter_taxa_sinasc(ANOS, cid="Q", estratos=estratos, retorno="polars")
+    df_pd = obter_taxa_sinasc(ANOS, cid="Q", estratos=estratos, retorno="pandas")
+
+    assert list(df_pd.columns) == df_pl.columns
+    for col in estratos:
+        assert df_pd[col].astype(str).tolist() == df_pl[col].cast(pl.String).to_list()
+    assert df_pd["taxa_por_100000"].tolist() == df_pl["taxa_por_100000"].to_list()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.analysis.mannkendall import mann_kendall_matriz
+from api.analysis.trends import calcular_regressao_linear
+from benchmarks.tendencias import _regressao_loop
+
+# Nome de cada saída de `mann_kendall_matriz` no resultado do pymannkendall
+_CAMPOS_PYMANNKENDALL = {
+    "tendencia": "trend",
+    "s": "s",
+    "var_s": "var_s",
+    "z": "z",
+    "p": "p",
+    "tau": "Tau",
+    "inclinacao": "slope",
+    "intercepto": "intercept",
+}
+
+
+def _series(linhas: int = 300, periodos: int = 12) -> np.ndarray:
+    """
+    Contagens pequenas (muitos empates) com tendências de inclinação
+    aleatória, ~10% de NaNs e uma série constante.
+    """
+    rng = np.random.default_rng(0)
+    y = np.round(rng.integers(0, 6, (linhas, periodos)) + np.arange(periodos) * rng.normal(0, 0.3, (linhas, 1)))
+    y[rng.random(y.shape) < 0.1] = np.nan
+    y[0] = 3.0
+    return y
+
+
+@pytest.mark.parametrize("metodo, teste", [
+    ("original", "original_test"),
+    ("hamed_rao", "hamed_rao_modification_test"),
+])
+def test_mann_kendall_igual_ao_pymannkendall(metodo, teste):
+    pymannkendall = pytest.importorskip("pymannkendall")
+    y = _series()
+
+    resultado = mann_kendall_matriz(y, metodo=metodo)
+    with np.errstate(invalid="ignore"):
+        esperados = [getattr(pymannkendall, teste)(serie) for serie in y]
+
+    for campo, atributo in _CAMPOS_PYMANNKENDALL.items():
+        esperado = np.array([getattr(e, atributo) for e in esperados])
+        if campo == "var_s" and metodo == "hamed_rao":
+            # Na série constante a autocorrelação é 0/0: o pymannkendall
+            # soma o NaN na correção, aqui a variância fica sem correção
+            assert np.isnan(esperado[0]) and resultado[campo][0] == 0
+            esperado[0] = 0
+        if campo == "tendencia":
+            np.testing.assert_array_equal(resultado[campo], esperado)
+        else:
+            np.testing.assert_allclose(
+                resultado[campo], esperado.astype(float), rtol=1e-12, atol=1e-12, equal_nan=True,
+                err_msg=campo
+            )
+
+
+def test_regressao_linear_igual_ao_statsmodels():
+    pytest.importorskip("statsmodels")
+    rng = np.random.default_rng(0)
+    anos = list(range(2015, 2025))
+    y = rng.gamma(2.0, 100.0, (200, len(anos))) + np.arange(len(anos)) * rng.normal(0, 20, (200, 1))
+    # Até dois anos ausentes por série e uma série que começa em zero
+    y[rng.random(y.shape) < 0.1] = np.nan
+    y[np.arange(0, 200, 7), rng.integers(0, len(anos), 29)] = np.nan
+    y[1, 0] = 0.0
+    df = pd.DataFrame(y, columns=anos)
+    df = df[df.isna().sum(axis=1) <= 2]
+
+    resultado = calcular_regressao_linear(df)
+    esperado = _regressao_loop(df)
+
+    np.testing.assert_array_equal(resultado["Grupo"], esperado["Grupo"])
+    for coluna in ("Intercepto", "Inclinacao"):
+        np.testing.assert_allclose(resultado[coluna], esperado[coluna], rtol=1e-9)
+    # Colunas arredondadas na saída (2 casas; 5 no p-valor)
+    for coluna, casas in [("Inclinacao IC inferior", 2), ("Inclinacao IC superior", 2), ("R^2", 2), ("p-valor", 5)]:
+        np.testing.assert_allclose(resultado[coluna], esperado[coluna], atol=0.5 * 10 ** -casas + 1e-9)
+
+    linha = df.index.get_loc(1)
+    assert resultado["Valor Inicial"].iloc[linha] == 0
+    assert np.isnan(resultado["Variacao(%)"].iloc[linha])
+    assert np.isfinite(resultado["Inclinacao"].iloc[linha])